@@ -1,29 +1,272 @@
 import streamlit as st
-from pypdf import PdfReader
-import google.generativeai as genai
-import io
-import pandas as pd
-from datetime import datetime, timedelta
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from datetime import date, datetime, timedelta
 import hashlib
 import re
 import requests
 import time
 import base64
-from supabase import create_client, Client 
 import os
+import importlib
+import importlib.util
+import shutil
+import tempfile
+import random
+import threading
+import gzip
+import json
+import mmap
+import uuid
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Schwere Abhängigkeiten erst bei Bedarf laden - die Login-Seite braucht keine davon
+IMPORT_TIMES = {}
+
+class LazyModule:
+    """Modul-Platzhalter, der beim ersten Attributzugriff importiert"""
+    
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+    
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    IMPORT_TIMES[self._name] = time.perf_counter() - started
+                    self._module = module
+        return self._module
+    
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+pd = LazyModule('pandas')
+genai = LazyModule('google.generativeai')
+pypdf = LazyModule('pypdf')
+supabase_lib = LazyModule('supabase')
+LAZY_MODULES = [pd, pypdf, supabase_lib, genai]
+
+def warm_up_imports():
+    """Schwere Module im Hintergrund vorladen, während die Seite schon steht"""
+    if any(module._module is None for module in LAZY_MODULES):
+        return start_warm_up()
+    return None
+
+@st.cache_resource
+def start_warm_up():
+    """Einmal pro Prozess: Hintergrund-Thread zum Vorladen starten"""
+    def load_all():
+        for module in LAZY_MODULES:
+            try:
+                module.load()
+            except Exception:
+                pass  # Fehler zeigt sich später beim eigentlichen Zugriff
+    
+    thread = threading.Thread(target=load_all, name="jl-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+def get_config(key: str, default=None, cast=None):
+    """Lese Einstellung aus Secrets oder Umgebungsvariablen (mit Default)"""
+    value = None
+    try:
+        value = st.secrets.get(key)
+    except Exception:
+        pass
+    if value is None:
+        value = os.getenv(key)
+    if value is None:
+        return default
+
+    if cast is bool and isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'ja', 'on')
+    if cast is not None:
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            return default
+    return value
+
+def get_local_cache_dir(*parts) -> str:
+    """Lokales Cache-Verzeichnis (lokale Ersatz-Speicher, Replays, Snapshots)"""
+    path = os.path.join(get_config("LOCAL_CACHE_DIR", ".jl_cache"), *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+class SilentUI:
+    """Ersatz für st ohne Browser-Sitzung: Ausgaben, Spinner und Container werden verworfen"""
+    
+    def __getattr__(self, name):
+        return self
+    
+    def __call__(self, *args, **kwargs):
+        return self
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+SILENT_UI = SilentUI()
+
+def ui():
+    """st in einer Streamlit-Sitzung, sonst (Backfill-Thread, Skripte) stille Ausgabe"""
+    return st if get_script_run_ctx() is not None else SILENT_UI
+
+def record_session_metric(key: str, entry: dict):
+    """Messwert fürs Dashboard merken - nur in einer Browser-Sitzung"""
+    if get_script_run_ctx() is not None:
+        st.session_state.setdefault(key, []).append(entry)
+
+# Performance-Messung: Stufen-Zeiten und Token pro Lauf (= pro Ausgabe)
+_current_perf_run = contextvars.ContextVar('jl_perf_run', default=None)
+
+def begin_perf_run(label: str, source: str):
+    """Neuen Messlauf beginnen - gibt ein Token für end_perf_run zurück"""
+    run = {
+        'run_id': str(uuid.uuid4()),
+        'label': label,
+        'source': source,
+        'started_at': datetime.now().isoformat(),
+        'status': 'ok',
+        '_t0': time.perf_counter(),
+        'spans': [],
+        'llm_calls': [],
+    }
+    return _current_perf_run.set(run)
+
+def end_perf_run(token, status: str = None):
+    """Messlauf beenden und speichern"""
+    run = _current_perf_run.get()
+    _current_perf_run.reset(token)
+    if run is None:
+        return
+    if status:
+        run['status'] = status
+    run['duration_ms'] = round((time.perf_counter() - run.pop('_t0')) * 1000, 1)
+    run['totals'] = summarize_llm_calls(run['llm_calls'])
+    save_perf_run(run)
+
+@contextmanager
+def perf_run(label: str, source: str):
+    """Messlauf als Kontextmanager"""
+    token = begin_perf_run(label, source)
+    status = None
+    try:
+        yield _current_perf_run.get()
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        end_perf_run(token, status)
+
+@contextmanager
+def perf_span(stage: str, **meta):
+    """Dauer einer Stufe im aktuellen Messlauf festhalten (ohne Lauf: keine Wirkung)"""
+    run = _current_perf_run.get()
+    start = time.perf_counter()
+    try:
+        yield meta
+    finally:
+        if run is not None:
+            run['spans'].append({
+                'stage': stage,
+                'offset_ms': round((start - run['_t0']) * 1000, 1),
+                'duration_ms': round((time.perf_counter() - start) * 1000, 1),
+                **meta,
+            })
+
+def record_llm_call(model_name: str, latency: float, prompt_tokens: int, output_tokens: int,
+                    cached_tokens: int = 0, retries: int = 0, stream: bool = False):
+    """Einzelnen Gemini-Aufruf im aktuellen Messlauf festhalten"""
+    run = _current_perf_run.get()
+    if run is None:
+        return
+    run['llm_calls'].append({
+        'model': model_name,
+        'latency_ms': round(latency * 1000, 1),
+        'prompt_tokens': prompt_tokens,
+        'output_tokens': output_tokens,
+        'cached_tokens': cached_tokens,
+        'retries': retries,
+        'stream': stream,
+    })
+
+def summarize_llm_calls(calls: list) -> dict:
+    """Token-Summen und geschätzte Kosten eines Laufs"""
+    prompt_tokens = sum(call['prompt_tokens'] for call in calls)
+    output_tokens = sum(call['output_tokens'] for call in calls)
+    price_in = get_config("GEMINI_PRICE_INPUT_PER_1M", 0.075, float)
+    price_out = get_config("GEMINI_PRICE_OUTPUT_PER_1M", 0.30, float)
+    return {
+        'llm_calls': len(calls),
+        'prompt_tokens': prompt_tokens,
+        'output_tokens': output_tokens,
+        'cached_tokens': sum(call['cached_tokens'] for call in calls),
+        'retries': sum(call['retries'] for call in calls),
+        'llm_ms': round(sum(call['latency_ms'] for call in calls), 1),
+        'cost_usd': round(prompt_tokens / 1e6 * price_in + output_tokens / 1e6 * price_out, 5),
+    }
+
+def save_perf_run(run: dict):
+    """Messlauf in Supabase (jl_perf_runs) oder lokal als JSON Lines ablegen"""
+    try:
+        if get_config("PERF_STORE", "supabase") == 'local':
+            with open(os.path.join(get_local_cache_dir('perf'), 'runs.jsonl'), 'a') as f:
+                f.write(json.dumps(run) + "\n")
+        else:
+            init_supabase().table('jl_perf_runs').insert(run).execute()
+    except Exception as e:
+        # Messung darf die eigentliche Analyse nie stören
+        ui().caption(f"⏱️ Messdaten nicht gespeichert: {e}")
+
+def load_perf_runs(days: int = 30):
+    """Gespeicherte Messläufe der letzten Tage laden"""
+    since = (datetime.now() - timedelta(days=days)).isoformat()
+    
+    if get_config("PERF_STORE", "supabase") == 'local':
+        path = os.path.join(get_local_cache_dir('perf'), 'runs.jsonl')
+        rows = []
+        if os.path.exists(path):
+            with open(path) as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+        rows = [row for row in rows if row['started_at'] >= since]
+    else:
+        response = init_supabase().table('jl_perf_runs').select("*").gte(
+            'started_at', since
+        ).order('started_at', desc=True).limit(500).execute()
+        rows = response.data or []
+    
+    return rows
 
 # Supabase Setup
 @st.cache_resource
-def init_supabase() -> Client:
+def init_supabase() -> "Client":
     """Initialisiere Supabase Client mit Caching"""
-    url = st.secrets.get("SUPABASE_URL", os.getenv("SUPABASE_URL"))
-    key = st.secrets.get("SUPABASE_KEY", os.getenv("SUPABASE_KEY"))
+    url = get_config("SUPABASE_URL")
+    key = get_config("SUPABASE_KEY")
     
     if not url or not key:
         st.error("❌ Supabase Credentials fehlen! Bitte in Secrets hinzufügen.")
         st.stop()
     
-    return create_client(url, key)
+    return supabase_lib.create_client(url, key)
 
 # Konfiguration mit Fallback
 def get_credentials():
@@ -32,82 +275,295 @@ def get_credentials():
     except:
         return {"jl_team": "junge_liberale_2025"}  # Fallback für Testing
 
-TEAM_CREDENTIALS = get_credentials()
-
 # Neue Database-Funktionen mit Supabase
-def save_analysis_to_db(pdf_name: str, analysis_text: str, full_text: str) -> bool:
-    """Speichere Analyse in Supabase"""
+def parse_pdf_date(pdf_name: str):
+    """Extrahiere Datum aus PDF-Name (falls vorhanden) als YYYY-MM-DD"""
+    date_match = re.search(r'(\d{1,2})[-._](\d{1,2})[-._](\d{2,4})', pdf_name)
+    if not date_match:
+        return None
+    
+    day, month, year = date_match.groups()
+    if len(year) == 2:
+        year = '20' + year
+    return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+
+# Länge der Textvorschau in jl_articles (Listen-Abfragen bleiben klein)
+TEXT_PREVIEW_CHARS = 500
+
+# Spalten für Listen-Abfragen - ohne komplette Texte
+ARTICLE_LIST_COLUMNS = (
+    "id, article_hash, created_at, pdf_name, pdf_date, analysis, full_text, "
+    "highest_priority_count, high_priority_count"
+)
+
+def build_article_record(pdf_name: str, analysis_text: str, full_text: str) -> dict:
+    """Baue den Datensatz für jl_articles aus einer Analyse"""
+    # Eindeutige ID basierend auf Text-Hash
+    article_hash = hashlib.md5(full_text.encode()).hexdigest()[:32]
+    
+    return {
+        'article_hash': article_hash,
+        'pdf_name': pdf_name,
+        'pdf_date': parse_pdf_date(pdf_name),
+        'analysis': analysis_text,
+        # Nur Vorschau in jl_articles - der komplette Text liegt komprimiert in jl_article_texts
+        'full_text': full_text[:TEXT_PREVIEW_CHARS],
+        # Zähle Prioritäten
+        'highest_priority_count': analysis_text.count('🔥'),
+        'high_priority_count': analysis_text.count('⚡'),
+        'metadata': {
+            'text_length': len(full_text),
+            'analysis_length': len(analysis_text),
+            'import_source': 'streamlit_app'
+        }
+    }
+
+def write_secondary_index(label: str, write, records: list):
+    """Nebenindex schreiben - ein Fehler wird nur gemeldet, die Analyse selbst ist schon gespeichert"""
+    try:
+        write(records)
+    except Exception as e:
+        ui().warning(f"⚠️ {label} nicht aktualisiert: {e}")
+
+def save_analysis_to_db(pdf_name: str, analysis_text: str, full_text: str, profile_results: dict = None) -> bool:
+    """Speichere Analyse in Supabase (im Mehrprofil-Modus zusätzlich die Analysen aller Profile)"""
     try:
         supabase = init_supabase()
         
-        # Eindeutige ID basierend auf Text-Hash
-        article_hash = hashlib.md5(full_text.encode()).hexdigest()[:32]
-        
-        # Zähle Prioritäten
-        highest_priority = analysis_text.count('🔥')
-        high_priority = analysis_text.count('⚡')
-        
-        # Extrahiere Datum aus PDF-Name (falls vorhanden)
-        pdf_date = None
-        date_match = re.search(r'(\d{1,2})[-._](\d{1,2})[-._](\d{2,4})', pdf_name)
-        if date_match:
-            day, month, year = date_match.groups()
-            if len(year) == 2:
-                year = '20' + year
-            try:
-                pdf_date = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-            except:
-                pass
-        
         # Daten für Insert
-        data = {
-            'article_hash': article_hash,
-            'pdf_name': pdf_name,
-            'pdf_date': pdf_date,
-            'analysis': analysis_text,
-            'full_text': full_text[:10000] if len(full_text) > 10000 else full_text,  # Limit für Performance
-            'highest_priority_count': highest_priority,
-            'high_priority_count': high_priority,
-            'metadata': {
-                'text_length': len(full_text),
-                'analysis_length': len(analysis_text),
-                'import_source': 'streamlit_app'
-            }
-        }
+        data = build_article_record(pdf_name, analysis_text, full_text)
         
         # Upsert (Insert oder Update wenn bereits vorhanden)
-        result = supabase.table('jl_articles').upsert(
-            data, 
-            on_conflict='article_hash'
-        ).execute()
+        with perf_span('db_write', table='jl_articles', rows=1):
+            result = supabase.table('jl_articles').upsert(
+                data, 
+                on_conflict='article_hash'
+            ).execute()
+        
+        # Kompletten Text komprimiert ablegen - fehlt er, bleibt die Vorschau in jl_articles
+        with perf_span('db_write', table='jl_article_texts', rows=1):
+            write_secondary_index("Volltext-Speicher", store_full_texts,
+                                  [build_text_record(data['article_hash'], full_text)])
+        
+        # Personen, Parteien, Schulen ... für die Facetten-Suche indexieren
+        with perf_span('entity_index'):
+            write_secondary_index("Entitäten-Index", store_entities,
+                                  [build_entity_record(data['article_hash'], analysis_text)])
         
+        # Themen-Zeitreihe nach Erscheinungsdatum fortschreiben
+        with perf_span('theme_index'):
+            write_secondary_index("Themen-Zeitreihe", store_article_themes,
+                                  [build_theme_record(data['article_hash'], data['pdf_date'], analysis_text)])
+        
+        if profile_results:
+            with perf_span('db_write', table='jl_profile_analyses', rows=len(profile_results)):
+                write_secondary_index("Profil-Analysen", store_profile_analyses,
+                                      [build_profile_record(data['article_hash'], profile_results)])
+        
+        invalidate_article_stats()
         return True
         
     except Exception as e:
-        st.error(f"❌ Supabase Fehler: {str(e)}")
+        ui().error(f"❌ Supabase Fehler: {str(e)}")
         return False
 
+# Komprimierter Volltext-Speicher
+def compress_text(text: str) -> tuple:
+    """Text komprimieren - zstd wenn verfügbar, sonst gzip"""
+    raw = text.encode('utf-8')
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=10).compress(raw)
+    return 'gzip', gzip.compress(raw, compresslevel=6)
+
+def decompress_text(codec: str, data: bytes) -> str:
+    """Komprimierten Text wieder entpacken"""
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstandard ist nicht installiert - Text kann nicht entpackt werden")
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    return gzip.decompress(data).decode('utf-8')
+
+def build_text_record(article_hash: str, full_text: str) -> dict:
+    """Datensatz für jl_article_texts - Klartext, komprimiert wird beim Speichern"""
+    return {
+        'article_hash': article_hash,
+        'text': full_text,
+        'page_count': len(split_pages(full_text)),
+        'char_count': len(full_text),
+    }
+
+def decode_text_row(row: dict) -> str:
+    """Zeile aus jl_article_texts lesen - Klartext (body) oder Altbestand mit komprimierten Bytes"""
+    if row.get('body') is not None:
+        return row['body']
+    if row.get('data') is None:
+        return ""
+    return decompress_text(row['codec'], base64.b64decode(row['data']))
+
+def store_full_texts(records: list):
+    """Volltexte aus build_text_record speichern - Klartext an die RPC (Postgres komprimiert), lokal als zstd/gzip"""
+    if not records:
+        return
+    
+    if get_config("TEXT_STORE", "supabase") == 'local':
+        folder = get_local_cache_dir('texts')
+        for record in records:
+            codec, data = compress_text(record['text'])
+            path = os.path.join(folder, f"{record['article_hash']}.{codec}")
+            with open(path, 'wb') as f:
+                f.write(data)
+        return
+    
+    # Nur der Klartext geht über die Leitung - Postgres komprimiert ihn (TOAST) und baut den Suchindex
+    init_supabase().rpc('store_article_texts', {'p_rows': records}).execute()
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)
+def load_full_text(article_hash: str) -> str:
+    """Kompletten Text eines Artikels erst bei Bedarf laden"""
+    if get_config("TEXT_STORE", "supabase") == 'local':
+        folder = get_local_cache_dir('texts')
+        for codec in ('zstd', 'gzip'):
+            path = os.path.join(folder, f"{article_hash}.{codec}")
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    return decompress_text(codec, f.read())
+        return ""
+    
+    response = init_supabase().table('jl_article_texts').select("codec, data, body").eq(
+        'article_hash', article_hash
+    ).limit(1).execute()
+    
+    if not response.data:
+        return ""
+    return decode_text_row(response.data[0])
+
+def load_full_texts(article_hashes) -> dict:
+    """Komplette Texte vieler Artikel auf einmal: {article_hash: text}"""
+    if get_config("TEXT_STORE", "supabase") == 'local':
+        return {article_hash: load_full_text(article_hash) for article_hash in article_hashes}
+    
+    texts = {}
+    for hashes in chunked(article_hashes):
+        response = init_supabase().table('jl_article_texts').select("article_hash, codec, data, body").in_(
+            'article_hash', hashes
+        ).execute()
+        for row in response.data or []:
+            texts[row['article_hash']] = decode_text_row(row)
+    return texts
+
+class BulkUpserter:
+    """Puffert Datensätze und schreibt sie gebündelt per Upsert - mit Retry pro Batch"""
+    
+    def __init__(self, table: str = 'jl_articles', on_conflict: str = 'article_hash',
+                 batch_size: int = None, max_retries: int = None, progress_callback=None, sink=None):
+        self.table = table
+        # Optionale eigene Schreibfunktion für eine Batch (z.B. store_full_texts)
+        self.sink = sink
+        self.on_conflict = on_conflict
+        self.batch_size = batch_size or get_config("DB_BATCH_SIZE", 200, int)
+        self.max_retries = max_retries if max_retries is not None else get_config("DB_BATCH_RETRIES", 2, int)
+        self.progress_callback = progress_callback
+        self.buffer = []
+        self.written = 0
+        self.failed = []
+    
+    def add(self, record: dict):
+        """Datensatz puffern und bei voller Batch-Größe schreiben"""
+        self.buffer.append(record)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+    
+    def add_many(self, records: list):
+        for record in records:
+            self.add(record)
+    
+    def flush(self) -> dict:
+        """Alle gepufferten Datensätze schreiben und Bericht zurückgeben"""
+        # Doppelte Schlüssel in einem Upsert lehnt Postgres ab - der letzte gewinnt
+        deduplicated = {}
+        for record in self.buffer:
+            deduplicated[record.get(self.on_conflict)] = record
+        pending = list(deduplicated.values())
+        self.buffer = []
+        
+        for start in range(0, len(pending), self.batch_size):
+            self._write_batch(pending[start:start + self.batch_size], self.max_retries)
+            if self.progress_callback:
+                self.progress_callback(self.written, len(self.failed))
+        
+        if self.table == 'jl_articles' and self.sink is None and self.written:
+            invalidate_article_stats()
+        
+        return self.report()
+    
+    def _write_batch(self, batch: list, retries: int):
+        last_error = None
+        
+        for attempt in range(retries + 1):
+            try:
+                with perf_span('db_write', table=self.table if self.sink is None else self.sink.__name__,
+                               rows=len(batch), attempt=attempt):
+                    if self.sink is not None:
+                        self.sink(batch)
+                    else:
+                        init_supabase().table(self.table).upsert(batch, on_conflict=self.on_conflict).execute()
+                self.written += len(batch)
+                return
+            except Exception as e:
+                last_error = e
+                if attempt < retries:
+                    time.sleep(0.5 * 2 ** attempt)
+        
+        if len(batch) > 1:
+            # Batch halbieren, um die fehlerhaften Datensätze einzugrenzen
+            middle = len(batch) // 2
+            self._write_batch(batch[:middle], 0)
+            self._write_batch(batch[middle:], 0)
+        else:
+            record = batch[0]
+            self.failed.append({
+                'key': record.get(self.on_conflict),
+                'pdf_name': record.get('pdf_name', ''),
+                'error': str(last_error)
+            })
+    
+    def report(self) -> dict:
+        return {'written': self.written, 'failed': self.failed}
+
+def show_bulk_report(report: dict, label: str = "Datensätze"):
+    """Ergebnis eines gebündelten Schreibvorgangs anzeigen"""
+    if report['failed']:
+        st.warning(f"⚠️ {report['written']} {label} gespeichert, {len(report['failed'])} fehlgeschlagen")
+        with st.expander(f"❌ Fehlgeschlagene {label}"):
+            st.dataframe(pd.DataFrame(report['failed']), use_container_width=True)
+    else:
+        st.success(f"💾 {report['written']} {label} in Database gespeichert!")
+
+def articles_to_dataframe(rows: list):
+    """Artikel-Zeilen für die Anzeige aufbereiten"""
+    df = pd.DataFrame(rows)
+    # Formatiere Datum für Anzeige
+    df['datum'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%d %H:%M')
+    # Kürze full_text für Anzeige
+    df['volltext_kurz'] = df['full_text'].apply(
+        lambda x: x[:500] + "..." if x and len(x) >= 500 else x
+    )
+    return df[['id', 'article_hash', 'datum', 'pdf_name', 'analysis', 'volltext_kurz',
+              'highest_priority_count', 'high_priority_count', 'pdf_date']]
+
 def load_article_database():
     """Lade alle Artikel aus Supabase"""
     try:
         supabase = init_supabase()
         
-        # Hole alle Artikel, sortiert nach Datum
-        response = supabase.table('jl_articles').select("*").order(
+        # Hole alle Artikel (ohne komplette Texte), sortiert nach Datum
+        response = supabase.table('jl_articles').select(ARTICLE_LIST_COLUMNS).order(
             'created_at', desc=True
         ).execute()
         
         # Konvertiere zu DataFrame
         if response.data:
-            df = pd.DataFrame(response.data)
-            # Formatiere Datum für Anzeige
-            df['datum'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%d %H:%M')
-            # Kürze full_text für Anzeige
-            df['volltext_kurz'] = df['full_text'].apply(
-                lambda x: x[:500] + "..." if x and len(x) > 500 else x
-            )
-            return df[['id', 'datum', 'pdf_name', 'analysis', 'volltext_kurz', 
-                      'highest_priority_count', 'high_priority_count', 'pdf_date']]
+            return articles_to_dataframe(response.data)
         else:
             return pd.DataFrame()
             
@@ -115,66 +571,352 @@ def load_article_database():
         st.error(f"❌ Fehler beim Laden: {str(e)}")
         return pd.DataFrame()
 
-def search_articles(query: str, df=None):
-    """Durchsuche Artikel mit Volltextsuche"""
+# Gerankte Suche: Server-Funktion jl_search_articles, lokal ein Python-Ersatz mit derselben Semantik
+SEARCH_HEADLINE_WORDS = 35
+SEARCH_HEADLINE_FRAGMENTS = 2
+# Grobe Annäherung an den german-Stemmer von Postgres (nur für den lokalen Ersatz)
+GERMAN_SUFFIXES = ('ern', 'em', 'en', 'er', 'es', 'e', 's', 'n')
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_ranked_search(query: str, limit: int, offset: int = 0) -> list:
+    """Treffer mit Rang und Ausschnitt - nur die Spalten für die Ergebnisliste"""
+    if get_config("SEARCH_STORE", "supabase") == 'local':
+        return rank_articles_locally(load_search_candidates(get_config("SEARCH_LOCAL_CANDIDATES", 300, int)),
+                                     query, limit, offset)
+    response = init_supabase().rpc('jl_search_articles', {
+        'p_query': query, 'p_limit': limit, 'p_offset': offset
+    }).execute()
+    return response.data or []
+
+@st.cache_data(ttl=300, max_entries=1, show_spinner=False)
+def load_search_candidates(limit: int = 300) -> list:
+    """Neueste Artikelzeilen für den lokalen Ersatz - mit komplettem Text ('volltext') wie jl_article_texts"""
+    rows = init_supabase().table('jl_articles').select(ARTICLE_LIST_COLUMNS).order(
+        'created_at', desc=True
+    ).limit(limit).execute().data or []
     try:
-        supabase = init_supabase()
-        
-        if not query:
-            # Wenn keine Suche, gib alle zurück
-            return load_article_database()
-        
-        # Nutze PostgreSQL Volltextsuche
-        response = supabase.table('jl_articles').select("*").text_search(
-            'search_vector', 
-            query,
-            config='german'  # Deutsche Sprachkonfiguration
-        ).order('created_at', desc=True).execute()
-        
-        if response.data:
-            df = pd.DataFrame(response.data)
-            df['datum'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%d %H:%M')
-            df['volltext_kurz'] = df['full_text'].apply(
-                lambda x: x[:500] + "..." if x and len(x) > 500 else x
-            )
-            return df
-        else:
-            return pd.DataFrame()
-            
+        texts = load_full_texts([row['article_hash'] for row in rows])
+    except Exception:
+        texts = {}  # Volltexte nicht erreichbar - dann zählt wenigstens die Vorschau
+    for row in rows:
+        row['volltext'] = texts.get(row['article_hash']) or row.get('full_text')
+    return rows
+
+def search_articles(query: str):
+    """Gerankte Volltextsuche mit hervorgehobenen Ausschnitten"""
+    if not query:
+        # Wenn keine Suche, gib alle zurück
+        return load_article_database()
+    
+    limit = get_config("SEARCH_LIMIT", 100, int)
+    try:
+        rows = fetch_ranked_search(query, limit)
     except Exception as e:
-        st.error(f"❌ Suchfehler: {str(e)}")
-        # Fallback auf lokale Suche wenn df übergeben wurde
-        if df is not None and not df.empty:
-            mask = df['analysis'].str.contains(query, case=False, na=False) | \
-                   df['pdf_name'].str.contains(query, case=False, na=False)
-            return df[mask]
+        # z.B. Migration noch nicht eingespielt: gleiche Rangfolge in Python
+        st.warning(f"⚠️ Server-Suche nicht verfügbar, suche lokal: {e}")
+        try:
+            rows = rank_articles_locally(load_search_candidates(get_config("SEARCH_LOCAL_CANDIDATES", 300, int)),
+                                         query, limit)
+        except Exception as e:
+            st.error(f"❌ Suchfehler: {str(e)}")
+            return pd.DataFrame()
+    
+    return search_results_to_dataframe(rows)
+
+def search_results_to_dataframe(rows: list):
+    """Suchtreffer für die Anzeige aufbereiten (Reihenfolge = Rang)"""
+    if not rows:
         return pd.DataFrame()
+    df = pd.DataFrame(rows)
+    df['datum'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%d %H:%M')
+    # Ausschnitt einzeilig und ohne Markdown-Überschriften
+    df['headline'] = df['headline'].fillna('').apply(lambda text: " ".join(re.sub(r'#+\s*', '', text).split()))
+    df.attrs['total_count'] = int(rows[0].get('total_count') or len(rows))
+    return df[['id', 'article_hash', 'datum', 'pdf_name', 'headline', 'rank',
+               'highest_priority_count', 'high_priority_count', 'pdf_date']]
+
+def with_analysis(df):
+    """Suchtreffer für den Export um die Analyse ergänzen (Reihenfolge bleibt)"""
+    if df.empty or 'analysis' in df.columns:
+        return df
+    articles = load_articles_by_hashes(df['article_hash'].tolist())
+    analyses = dict(zip(articles['article_hash'], articles['analysis'])) if not articles.empty else {}
+    return df.assign(analysis=df['article_hash'].map(analyses))
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def load_article_analysis(article_hash: str) -> str:
+    """Analyse eines Suchtreffers erst bei Bedarf laden"""
+    response = init_supabase().table('jl_articles').select("analysis").eq(
+        'article_hash', article_hash
+    ).limit(1).execute()
+    return response.data[0]['analysis'] if response.data else ""
+
+def stem_word(word: str) -> str:
+    word = word.lower().replace('ß', 'ss')
+    for suffix in GERMAN_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+def parse_websearch_query(query: str) -> list:
+    """websearch_to_tsquery nachgebaut: Klauseln (UND) aus Alternativen (or), Phrasen, -Ausschluss"""
+    clauses = []
+    alternative = False
+    for match in re.finditer(r'(-?)"([^"]*)"?|(\S+)', query):
+        negate, phrase, word = match.group(1), match.group(2), match.group(3)
+        if word and word.lower() == 'or':
+            alternative = bool(clauses)
+            continue
+        if word and word.startswith('-'):
+            negate, word = '-', word[1:]
+        stems = tuple(stem_word(token) for token in re.findall(r'\w+', phrase if phrase is not None else word))
+        if not stems:
+            continue
+        if alternative and not negate and not clauses[-1]['negate']:
+            clauses[-1]['alternatives'].append(stems)
+        else:
+            clauses.append({'negate': bool(negate), 'alternatives': [stems]})
+        alternative = False
+    return clauses
+
+def stem_positions(text: str) -> dict:
+    positions = {}
+    for index, token in enumerate(re.findall(r'\w+', text or "")):
+        positions.setdefault(stem_word(token), []).append(index)
+    return positions
+
+def phrase_count(positions: dict, stems: tuple) -> int:
+    """Vorkommen einer Wortfolge (Einzelwort = Phrase der Länge 1)"""
+    starts = positions.get(stems[0], [])
+    return sum(1 for start in starts
+               if all(start + offset in positions.get(stem, ()) for offset, stem in enumerate(stems[1:], 1)))
 
-def get_article_stats():
-    """Hole Statistiken aus der View"""
+def local_rank(positions: dict, clauses: list):
+    """Rang wie ts_rank (ohne Normierung) - None, wenn die Anfrage nicht passt"""
+    score = 0.0
+    for clause in clauses:
+        counts = [phrase_count(positions, stems) for stems in clause['alternatives']]
+        if clause['negate']:
+            if any(counts):
+                return None
+            continue
+        if not any(counts):
+            return None
+        score += sum(0.1 * (1 - 0.5 ** count) for count in counts)
+    return score
+
+def local_headline(text: str, clauses: list) -> str:
+    """ts_headline nachgebaut: bis zu zwei Ausschnitte um Treffer, Treffer **fett**"""
+    words = (text or "").split()
+    wanted = {stem for clause in clauses if not clause['negate']
+              for stems in clause['alternatives'] for stem in stems}
+    hits = [index for index, word in enumerate(words)
+            if any(stem_word(token) in wanted for token in re.findall(r'\w+', word))]
+    if not hits:
+        return " ".join(words[:SEARCH_HEADLINE_WORDS])
+    
+    fragments, covered_until = [], -1
+    for hit in hits:
+        if hit <= covered_until or len(fragments) == SEARCH_HEADLINE_FRAGMENTS:
+            continue
+        start = max(0, hit - SEARCH_HEADLINE_WORDS // (2 * SEARCH_HEADLINE_FRAGMENTS))
+        end = min(len(words), start + SEARCH_HEADLINE_WORDS // SEARCH_HEADLINE_FRAGMENTS)
+        fragments.append(" ".join(f"**{word}**" if index in hits else word
+                                  for index, word in zip(range(start, end), words[start:end])))
+        covered_until = end
+    return " … ".join(fragments)
+
+def rank_articles_locally(rows: list, query: str, limit: int, offset: int = 0) -> list:
+    """Python-Ersatz für jl_search_articles - gleiche Spalten, Analyse zählt doppelt so viel wie der Volltext"""
+    clauses = parse_websearch_query(query)
+    if not any(not clause['negate'] for clause in clauses):
+        return []
+    
+    ranked = []
+    for row in rows:
+        analysis_rank = local_rank(stem_positions(row.get('analysis')), clauses)
+        text_rank = local_rank(stem_positions(row.get('volltext', row.get('full_text'))), clauses)
+        if analysis_rank is None and text_rank is None:
+            continue
+        ranked.append((round((analysis_rank or 0) + 0.5 * (text_rank or 0), 6), row))
+    
+    ranked.sort(key=lambda item: (item[0], item[1].get('created_at') or ''), reverse=True)
+    return [{
+        'id': row.get('id'),
+        'article_hash': row['article_hash'],
+        'created_at': row.get('created_at'),
+        'pdf_name': row.get('pdf_name'),
+        'pdf_date': row.get('pdf_date'),
+        'highest_priority_count': row.get('highest_priority_count'),
+        'high_priority_count': row.get('high_priority_count'),
+        'rank': rank,
+        'headline': local_headline(f"{row.get('analysis') or ''}\n{row.get('volltext') or row.get('full_text') or ''}",
+                                   clauses),
+        'total_count': len(ranked),
+    } for rank, row in ranked[offset:offset + limit]]
+
+# Zählwerte für Metriken - zentral, kurz gecacht und ohne Artikelzeilen zu laden
+STATS_DAYS = 90
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_article_counts(days: int = STATS_DAYS) -> dict:
+    """Zählwerte per RPC holen, sonst per Head-Requests (nur Anzahl, keine Zeilen)"""
+    supabase = init_supabase()
+    
     try:
-        supabase = init_supabase()
-        
-        # Gesamtstatistiken
-        total_response = supabase.table('jl_articles').select(
-            "count"
-        ).execute()
-        
-        # Statistiken nach Datum
-        stats_response = supabase.table('jl_article_stats').select("*").execute()
-        
+        counts = supabase.rpc('jl_article_counts', {'p_days': days}).execute().data
+        if counts:
+            return counts
+    except Exception:
+        pass  # Funktion noch nicht angelegt - Head-Requests reichen für die Kernzahlen
+    
+    # 'estimated' nutzt die Planner-Statistik statt count(*) - für sehr große Tabellen
+    mode = get_config("STATS_COUNT_MODE", "exact")
+    
+    def head_count(column=None):
+        query = supabase.table('jl_articles').select("id", count=mode, head=True)
+        if column:
+            query = query.gt(column, 0)
+        return query.execute().count or 0
+    
+    latest = supabase.table('jl_articles').select("created_at").order(
+        'created_at', desc=True
+    ).limit(1).execute()
+    
+    return {
+        'total': head_count(),
+        'pdfs': None,
+        'last_created_at': latest.data[0]['created_at'] if latest.data else None,
+        'highest_articles': head_count('highest_priority_count'),
+        'high_articles': head_count('high_priority_count'),
+        'highest_mentions': None,
+        'high_mentions': None,
+        'daily': supabase.table('jl_article_stats').select("*").execute().data or [],
+    }
+
+def invalidate_article_stats():
+    """Nach Schreibzugriffen aufrufen, damit Metriken sofort stimmen"""
+    fetch_article_counts.clear()
+    count_new_articles.clear()
+    load_new_articles.clear()
+    fetch_ranked_search.clear()
+    load_search_candidates.clear()
+    load_digest_sources.clear()
+
+def get_article_stats() -> dict:
+    """Gesamt-, Tages- und Prioritäts-Zahlen für alle Tabs"""
+    try:
+        counts = fetch_article_counts()
         return {
-            'total_count': total_response.count if hasattr(total_response, 'count') else 0,
-            'daily_stats': pd.DataFrame(stats_response.data) if stats_response.data else pd.DataFrame()
+            'total_count': counts['total'],
+            'pdf_count': counts['pdfs'],
+            'last_created_at': counts['last_created_at'],
+            'priority': {
+                'highest_articles': counts['highest_articles'],
+                'high_articles': counts['high_articles'],
+                'highest_mentions': counts['highest_mentions'],
+                'high_mentions': counts['high_mentions'],
+            },
+            'daily_stats': pd.DataFrame(counts['daily']),
         }
         
     except Exception as e:
         st.error(f"❌ Statistik-Fehler: {str(e)}")
-        return {'total_count': 0, 'daily_stats': pd.DataFrame()}
+        return {
+            'total_count': 0, 'pdf_count': None, 'last_created_at': None,
+            'priority': {'highest_articles': 0, 'high_articles': 0, 'highest_mentions': None, 'high_mentions': None},
+            'daily_stats': pd.DataFrame(),
+        }
+
+# "Neu seit deinem letzten Besuch": Wasserstand pro Nutzer + Delta-Abfragen
+FEED_PAGE_SIZE = 20
+FEED_FIRST_VISIT_DAYS = 7
+
+def watermarks_path() -> str:
+    return os.path.join(get_local_cache_dir('index'), 'watermarks.json')
+
+def load_watermark(username: str):
+    """Zuletzt gesehenes created_at des Nutzers (ISO-String) oder None"""
+    if get_config("WATERMARK_STORE", "supabase") == 'local':
+        if not os.path.exists(watermarks_path()):
+            return None
+        with open(watermarks_path()) as f:
+            return json.load(f).get(username)
+    
+    response = init_supabase().table('jl_user_watermarks').select("last_seen_at").eq(
+        'username', username
+    ).limit(1).execute()
+    return response.data[0]['last_seen_at'] if response.data else None
+
+def save_watermark(username: str, last_seen_at: str):
+    """Wasserstand des Nutzers speichern"""
+    if get_config("WATERMARK_STORE", "supabase") == 'local':
+        watermarks = {}
+        if os.path.exists(watermarks_path()):
+            with open(watermarks_path()) as f:
+                watermarks = json.load(f)
+        watermarks[username] = last_seen_at
+        with open(watermarks_path(), 'w') as f:
+            json.dump(watermarks, f)
+        return
+    
+    init_supabase().table('jl_user_watermarks').upsert({
+        'username': username,
+        'last_seen_at': last_seen_at,
+        'updated_at': datetime.now().astimezone().isoformat(),
+    }, on_conflict='username').execute()
+
+def get_feed_since() -> str:
+    """Wasserstand der aktuellen Session - einmal pro Login aus der DB gelesen"""
+    if 'feed_since' not in st.session_state:
+        username = st.session_state.get('username', 'User')
+        try:
+            since = load_watermark(username)
+        except Exception as e:
+            st.caption(f"ℹ️ Wasserstand nicht lesbar: {e}")
+            since = None
+        if not since:
+            # Erster Besuch: die letzten Tage als "neu" zeigen
+            since = (datetime.now() - timedelta(days=FEED_FIRST_VISIT_DAYS)).astimezone().isoformat()
+        st.session_state['feed_since'] = since
+    return st.session_state['feed_since']
+
+@st.cache_data(ttl=60, show_spinner=False)
+def count_new_articles(since: str, only_highest: bool = False) -> int:
+    """Anzahl neuer Artikel - Head-Request auf dem created_at-Index"""
+    query = init_supabase().table('jl_articles').select("id", count='exact', head=True).gt('created_at', since)
+    if only_highest:
+        query = query.gt('highest_priority_count', 0)
+    return query.execute().count or 0
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_new_articles(since: str, cursor: tuple = None, only_highest: bool = False,
+                      limit: int = FEED_PAGE_SIZE) -> list:
+    """Eine Seite neuer Artikel (neueste zuerst); cursor = (created_at, id) der letzten Zeile"""
+    query = init_supabase().table('jl_articles').select(ARTICLE_LIST_COLUMNS).gt('created_at', since)
+    if cursor:
+        # Keyset über (created_at, id) - Zeilen mit gleichem Zeitstempel gehen an der Seitengrenze nicht verloren
+        created_at, row_id = cursor
+        query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id})')
+    if only_highest:
+        query = query.gt('highest_priority_count', 0)
+    return query.order('created_at', desc=True).order('id', desc=True).limit(limit).execute().data or []
+
+def new_articles_badge() -> str:
+    """Zusatz für den Tab-Titel, z.B. ' (3 neu)'"""
+    try:
+        count = count_new_articles(get_feed_since())
+    except Exception:
+        return ""
+    return f" ({count} neu)" if count else ""
 
-def check_duplicate(pdf_name: str) -> bool:
-    """Prüfe ob PDF bereits analysiert wurde"""
+def check_duplicate(pdf_name: str, md5_checksum: str = None) -> bool:
+    """Prüfe ob PDF bereits analysiert wurde (per Prüfsumme oder Name)"""
     try:
+        # Prüfsumme erkennt auch umbenannte Dateien
+        if md5_checksum and find_processed(md5_checksum):
+            return True
+        
         supabase = init_supabase()
         
         response = supabase.table('jl_articles').select("id").eq(
@@ -186,163 +928,2349 @@ def check_duplicate(pdf_name: str) -> bool:
     except Exception as e:
         return False
 
-# Migration Helper
-def migrate_from_csv_to_supabase():
-    """Migriere bestehende CSV-Daten zu Supabase"""
+# Single-Flight: jede Datei wird nur einmal gleichzeitig analysiert
+@st.cache_resource
+def get_flight_registry() -> dict:
+    """Prozessweite Registry laufender Analysen (über alle Sessions hinweg)"""
+    return {'lock': threading.Lock(), 'flights': {}}
+
+def single_flight(key: str, work, owner: str) -> tuple:
+    """work() nur einmal pro key ausführen - weitere Aufrufer warten auf dasselbe Ergebnis.
+    
+    Gibt (Ergebnis, leader) zurück; leader ist False, wenn das Ergebnis übernommen wurde.
+    """
+    registry = get_flight_registry()
+    with registry['lock']:
+        flight = registry['flights'].get(key)
+        leader = flight is None
+        if leader:
+            flight = {'event': threading.Event(), 'result': None, 'error': None,
+                      'owner': owner, 'started_at': time.time()}
+            registry['flights'][key] = flight
+    
+    if not leader:
+        with st.spinner(f"⏳ {flight['owner']} analysiert diese Datei gerade - warte auf das Ergebnis..."):
+            finished = flight['event'].wait(get_config("CLAIM_WAIT_SECONDS", 900, int))
+        if not finished:
+            st.warning("⚠️ Die parallele Analyse dauert zu lange - bitte später erneut versuchen.")
+            return None, False
+        if flight['error'] is not None:
+            st.error(f"❌ Die parallele Analyse ist fehlgeschlagen: {flight['error']}")
+            return None, False
+        return flight['result'], False
+    
     try:
-        # Versuche CSV zu laden
-        if os.path.exists('jl_artikel_database.csv'):
-            import pandas as pd
-            old_df = pd.read_csv('jl_artikel_database.csv')
-            
-            supabase = init_supabase()
-            migrated = 0
-            
-            progress_bar = st.progress(0)
-            status = st.empty()
-            
-            for idx, row in old_df.iterrows():
-                progress = (idx + 1) / len(old_df)
-                progress_bar.progress(progress)
-                status.text(f"Migriere {idx + 1}/{len(old_df)}: {row['pdf_name']}")
-                
-                try:
-                    # Bereite Daten vor
-                    data = {
-                        'article_hash': row.get('id', hashlib.md5(row['pdf_name'].encode()).hexdigest()[:32]),
-                        'pdf_name': row['pdf_name'],
-                        'analysis': row.get('analyse', row.get('analysis', '')),
-                        'full_text': row.get('volltext_kurz', '').replace('...', ''),
-                        'created_at': pd.to_datetime(row['datum']).isoformat() if 'datum' in row else None,
-                        'metadata': {'migrated_from_csv': True}
-                    }
-                    
-                    # Insert in Supabase
-                    supabase.table('jl_articles').upsert(
-                        data,
-                        on_conflict='article_hash'
-                    ).execute()
-                    
-                    migrated += 1
-                    
-                except Exception as e:
-                    st.warning(f"Fehler bei {row['pdf_name']}: {e}")
-            
-            progress_bar.progress(1.0)
-            status.text(f"✅ Migration abgeschlossen: {migrated}/{len(old_df)} Artikel")
+        flight['result'] = run_claimed(key, work, owner)
+        return flight['result'], True
+    except Exception as e:
+        flight['error'] = e
+        raise
+    finally:
+        flight['event'].set()
+        with registry['lock']:
+            registry['flights'].pop(key, None)
+
+def run_claimed(key: str, work, owner: str):
+    """Analyse mit Claim-Zeile in der DB - für mehrere Instanzen der App"""
+    if get_config("CLAIM_STORE", "supabase") == 'local':
+        return work()
+    
+    if not acquire_claim(key, owner):
+        # Eine andere Instanz arbeitet bereits an dieser Datei
+        return wait_for_claim(key)
+    
+    result = None
+    try:
+        result = work()
+        return result
+    finally:
+        release_claim(key, result)
+
+def acquire_claim(key: str, owner: str, ttl: int = None) -> bool:
+    """Claim-Zeile anlegen oder abgelaufene/fehlgeschlagene übernehmen"""
+    supabase = init_supabase()
+    now = datetime.now().astimezone()
+    claim = {
+        'file_key': key,
+        'claimed_by': owner,
+        'claimed_at': now.isoformat(),
+        'expires_at': (now + timedelta(seconds=ttl or get_config("CLAIM_TTL_SECONDS", 1800, int))).isoformat(),
+        'status': 'running',
+        'article_hash': None,
+    }
+    
+    try:
+        supabase.table('jl_analysis_claims').insert(claim).execute()
+        return True
+    except Exception as e:
+        if '23505' not in str(e):  # nicht "duplicate key" -> Claims nicht verfügbar, trotzdem arbeiten
+            st.caption(f"ℹ️ Claim nicht möglich: {e}")
+            return True
+    
+    # Bestehenden Claim übernehmen, wenn er abgelaufen oder fehlgeschlagen ist
+    taken = supabase.table('jl_analysis_claims').update(claim).eq('file_key', key).lt(
+        'expires_at', now.isoformat()
+    ).execute()
+    if taken.data:
+        return True
+    taken = supabase.table('jl_analysis_claims').update(claim).eq('file_key', key).eq(
+        'status', 'failed'
+    ).execute()
+    if taken.data:
+        return True
+    
+    # Erledigte Claims blockieren keine bewusste Neu-Analyse
+    taken = supabase.table('jl_analysis_claims').update(claim).eq('file_key', key).eq(
+        'status', 'done'
+    ).execute()
+    return bool(taken.data)
+
+def release_claim(key: str, result):
+    """Claim als erledigt oder fehlgeschlagen markieren"""
+    try:
+        init_supabase().table('jl_analysis_claims').update({
+            'status': 'done' if result else 'failed',
+            'article_hash': result['article_hash'] if result else None,
+        }).eq('file_key', key).execute()
+    except Exception as e:
+        st.caption(f"ℹ️ Claim nicht freigegeben: {e}")
+
+def wait_for_claim(key: str):
+    """Auf den Claim einer anderen Instanz warten und deren Ergebnis laden"""
+    supabase = init_supabase()
+    deadline = time.time() + get_config("CLAIM_WAIT_SECONDS", 900, int)
+    
+    with st.spinner("⏳ Diese Datei wird gerade auf einer anderen Instanz analysiert - warte auf das Ergebnis..."):
+        while time.time() < deadline:
+            response = supabase.table('jl_analysis_claims').select("*").eq('file_key', key).limit(1).execute()
+            claim = response.data[0] if response.data else None
             
-            # Backup alte CSV
-            os.rename('jl_artikel_database.csv', 'jl_artikel_database_backup.csv')
-            st.success(f"✅ {migrated} Artikel erfolgreich migriert!")
+            if not claim or claim['status'] == 'failed':
+                st.warning("⚠️ Die parallele Analyse ist fehlgeschlagen - bitte erneut starten.")
+                return None
+            if claim['status'] == 'done':
+                article = supabase.table('jl_articles').select("pdf_name, analysis, article_hash").eq(
+                    'article_hash', claim['article_hash']
+                ).limit(1).execute()
+                if article.data:
+                    row = article.data[0]
+                    return {'file_name': row['pdf_name'], 'analysis': row['analysis'],
+                            'article_hash': row['article_hash']}
+                return None
             
-    except Exception as e:
-        st.error(f"Migrationsfehler: {e}")
+            time.sleep(5)
+    
+    st.warning("⚠️ Die parallele Analyse dauert zu lange - bitte später erneut versuchen.")
+    return None
+
+# Index bereits verarbeiteter Dateien (MD5 wie in Drive's md5Checksum)
+def processed_index_path() -> str:
+    return os.path.join(get_local_cache_dir('index'), 'processed_files.json')
+
+def load_processed_index() -> dict:
+    """Alle bereits verarbeiteten Dateien: md5 -> Eintrag"""
+    if get_config("FILE_INDEX_STORE", "supabase") == 'local':
+        if not os.path.exists(processed_index_path()):
+            return {}
+        with open(processed_index_path()) as f:
+            return json.load(f)
+    
+    response = init_supabase().table('jl_processed_files').select(
+        "md5_checksum, size, pdf_name, article_hash"
+    ).execute()
+    return {row['md5_checksum']: row for row in response.data or []}
+
+def find_processed(md5_checksum: str, index: dict = None):
+    """Eintrag zu einer Prüfsumme oder None"""
+    if not md5_checksum:
+        return None
+    if index is not None:
+        return index.get(md5_checksum)
+    
+    if get_config("FILE_INDEX_STORE", "supabase") == 'local':
+        return load_processed_index().get(md5_checksum)
+    
+    response = init_supabase().table('jl_processed_files').select(
+        "md5_checksum, size, pdf_name, article_hash"
+    ).eq('md5_checksum', md5_checksum).limit(1).execute()
+    return response.data[0] if response.data else None
+
+def mark_processed(entries: list):
+    """Verarbeitete Dateien im Prüfsummen-Index vermerken"""
+    if not entries:
+        return
+    
+    if get_config("FILE_INDEX_STORE", "supabase") == 'local':
+        index = load_processed_index()
+        for entry in entries:
+            index[entry['md5_checksum']] = entry
+        with open(processed_index_path(), 'w') as f:
+            json.dump(index, f)
+        return
+    
+    init_supabase().table('jl_processed_files').upsert(entries, on_conflict='md5_checksum').execute()
+
+def processed_entry(pdf: "SpooledPdf", pdf_name: str, article_hash: str) -> dict:
+    """Index-Eintrag aus der heruntergeladenen (ausgelagerten) Datei"""
+    return {
+        'md5_checksum': pdf.md5,
+        'size': pdf.size,
+        'pdf_name': pdf_name,
+        'article_hash': article_hash,
+        'processed_at': datetime.now().isoformat(),
+    }
+
+def split_by_processed(files: list, index: dict) -> tuple:
+    """Dateiliste in neue und bereits verarbeitete Dateien aufteilen - vor jedem Download"""
+    new_files, skipped = [], []
+    for file in files:
+        match = find_processed(file.get('md5Checksum'), index)
+        # Größe zusätzlich prüfen, falls vorhanden
+        if match and (not file.get('size') or not match.get('size') or int(file['size']) == int(match['size'])):
+            skipped.append((file, match))
+        else:
+            new_files.append(file)
+    return new_files, skipped
+
+# Entitäten (Personen, Parteien, Schulen, ...) regelbasiert erkennen - ohne Modell/GPU
+ENTITY_TYPES = {
+    'person': '👤 Personen',
+    'partei': '🏛️ Parteien & Fraktionen',
+    'institution': '🏢 Gremien & Verwaltung',
+    'schule': '🏫 Schulen & Hochschulen',
+    'firma': '🏭 Unternehmen & Vereine',
+    'ort': '📍 Straßen & Plätze',
+}
+
+# Gazetteer: kanonischer Name -> Schreibweisen. Erweiterbar per JSON-Datei (ENTITY_GAZETTEER_FILE)
+ENTITY_GAZETTEER = {
+    'partei': {
+        'CDU': ['CDU', 'CDU-Fraktion', 'Christdemokraten'],
+        'CSU': ['CSU', 'CSU-Fraktion'],
+        'SPD': ['SPD', 'SPD-Fraktion', 'Sozialdemokraten'],
+        'FDP': ['FDP', 'FDP-Fraktion', 'Freie Demokraten'],
+        'Bündnis 90/Die Grünen': ['Bündnis 90/Die Grünen', 'Grüne', 'Grünen', 'Grünen-Fraktion'],
+        'Die Linke': ['Die Linke', 'Linke', 'Linken', 'Linksfraktion'],
+        'AfD': ['AfD', 'AfD-Fraktion'],
+        'Freie Wähler': ['Freie Wähler', 'Freien Wähler'],
+        'Volt': ['Volt'],
+        'Junge Liberale': ['Junge Liberale', 'Jungen Liberalen', 'JuLis', 'Julis'],
+        'Junge Union': ['Junge Union', 'Jungen Union'],
+        'Jusos': ['Jusos'],
+    },
+    'institution': {
+        'Stadtrat': ['Stadtrat', 'Stadtrats', 'Stadtratssitzung'],
+        'Gemeinderat': ['Gemeinderat', 'Gemeinderats'],
+        'Kreistag': ['Kreistag', 'Kreistags'],
+        'Landtag': ['Landtag', 'Landtags'],
+        'Stadtverwaltung': ['Stadtverwaltung', 'Rathaus'],
+        'Bauausschuss': ['Bauausschuss', 'Bauausschusses'],
+        'Finanzausschuss': ['Finanzausschuss', 'Finanzausschusses'],
+    },
+}
+
+PERSON_ROLES = (
+    r"Oberbürgermeister(?:in)?|Bürgermeister(?:in)?|Landrat|Landrätin|Stadtrat|Stadträtin|"
+    r"Gemeinderat|Gemeinderätin|Ratsherr|Ratsfrau|Kämmerer|Kämmerin|Dezernent(?:in)?|"
+    r"Beigeordnete[rn]?|Ortsvorsteher(?:in)?|Fraktionsvorsitzende[rn]?|Fraktionschef(?:in)?|"
+    r"Schulleiter(?:in)?|Geschäftsführer(?:in)?|Abgeordnete[rn]?|Minister(?:in)?|"
+    r"Polizeipräsident(?:in)?|Vorsitzende[rn]?|Sprecher(?:in)?|Herr|Frau"
+)
+NAME_TOKEN = r"[A-ZÄÖÜ][a-zäöüß]+(?:-[A-ZÄÖÜ][a-zäöüß]+)?"
+PERSON_PATTERN = re.compile(
+    rf"\b(?:{PERSON_ROLES})\s+(?:\([^)]{{1,30}}\)\s+)?(?:Dr\.\s+|Prof\.\s+)*"
+    rf"({NAME_TOKEN}(?:\s+(?:von\s+|van\s+|de\s+)?{NAME_TOKEN}))\b"
+)
+SCHOOL_KINDS = (
+    r"Gymnasium|Realschule|Grundschule|Gesamtschule|Hauptschule|Oberschule|Förderschule|"
+    r"Gemeinschaftsschule|Berufsschule|Berufskolleg|Hochschule|Universität"
+)
+SCHOOL_PATTERNS = [
+    # Goethe-Gymnasium, Albert-Schweitzer-Realschule
+    re.compile(rf"\b((?:[A-ZÄÖÜ][\wäöüß.]*-)+(?:{SCHOOL_KINDS}))\b"),
+    # Grundschule am Park, Grundschule Am Park, Universität Bonn
+    re.compile(rf"\b((?:{SCHOOL_KINDS})\s+(?:(?i:am|an\s+der|im|in\s+der)\s+)?[A-ZÄÖÜ][\wäöüß-]+)"),
+]
+# Verhältniswörter, mit denen ein Schulname nicht enden darf ("Grundschule Am")
+SCHOOL_NAME_PREPOSITIONS = {'am', 'an', 'im', 'in', 'der'}
+COMPANY_PATTERN = re.compile(
+    r"\b((?:[A-ZÄÖÜ0-9][\w&äöüß-]*\s+){1,4}?)(GmbH & Co\. KG|GmbH|gGmbH|AG|KG|SE|eG|e\.\s?V\.)(?![\w])"
+)
+STREET_PATTERNS = [
+    # Hauptstraße, Lindenallee, Rathausplatz
+    re.compile(r"\b([A-ZÄÖÜ][\wäöüß-]*(?:straße|strasse|str\.|allee|gasse|ufer|weg|platz|ring|damm))(?![\w])"),
+    # Kölner Straße, Neuer Markt, Alte Brücke
+    re.compile(r"\b([A-ZÄÖÜ][a-zäöüß]+(?:er|e)\s+(?:Straße|Str\.|Weg|Allee|Platz|Gasse|Ring|Damm|Ufer|Markt|Brücke))(?![\w])"),
+]
+# Gattungswörter, die wie Straßen/Namen aussehen, aber keine sind
+ENTITY_STOPWORDS = {
+    'radweg', 'fußweg', 'gehweg', 'rückweg', 'ausweg', 'heimweg', 'schulweg', 'umweg', 'zufahrtsweg',
+    'parkplatz', 'spielplatz', 'arbeitsplatz', 'sportplatz', 'stellplatz', 'bauplatz', 'festplatz',
+    'ausbildungsplatz', 'kitaplatz', 'studienplatz', 'sitzplatz', 'schulplatz', 'damm', 'ring',
+    'die', 'der', 'das', 'den', 'dem', 'des', 'ein', 'eine', 'einer', 'laut', 'bei', 'von', 'mit',
+    'für', 'und', 'auch', 'stadt', 'gemeinde', 'sitzung', 'antrag', 'haushalt', 'rat', 'titel',
+    'zusammenfassung', 'relevanz', 'seite', 'priorität', 'neue', 'neuer', 'neues',
+}
+
+@st.cache_resource
+def get_entity_gazetteer() -> dict:
+    """Gazetteer laden und als Regex pro Typ kompilieren (Alias -> kanonischer Name)"""
+    gazetteer = {entity_type: dict(entries) for entity_type, entries in ENTITY_GAZETTEER.items()}
+    
+    extra_file = get_config("ENTITY_GAZETTEER_FILE")
+    if extra_file and os.path.exists(extra_file):
+        with open(extra_file, encoding='utf-8') as f:
+            for entity_type, entries in json.load(f).items():
+                gazetteer.setdefault(entity_type, {}).update(entries)
+    
+    compiled = {}
+    for entity_type, entries in gazetteer.items():
+        aliases = {alias: name for name, alias_list in entries.items() for alias in [name, *alias_list]}
+        # Längste Schreibweise zuerst, damit "FDP-Fraktion" nicht als "FDP" + Rest zählt
+        pattern = "|".join(re.escape(alias) for alias in sorted(aliases, key=len, reverse=True))
+        compiled[entity_type] = (re.compile(rf"(?<![\w-])({pattern})(?![\w])"), aliases)
+    return compiled
+
+def normalize_entity_name(entity_type: str, name: str) -> str:
+    name = re.sub(r"\s+", " ", name).strip(" ,-")
+    if entity_type == 'ort':
+        name = re.sub(r"(?i)str\.$", "straße", name).replace("Str.", "Straße")
+    return name
+
+def extract_entities(text: str) -> list:
+    """Entitäten aus einer Analyse: [{key, type, name, mentions}]"""
+    if not text:
+        return []
+    # Markdown-Auszeichnung stört die Muster
+    clean = re.sub(r"[*_#>`|]", " ", text)
+    found = {}
+    
+    def add(entity_type: str, name: str):
+        name = normalize_entity_name(entity_type, name)
+        if len(name) < 2 or name.lower() in ENTITY_STOPWORDS:
+            return
+        key = f"{entity_type}:{name.lower()}"
+        entry = found.setdefault(key, {'key': key, 'type': entity_type, 'name': name, 'mentions': 0})
+        entry['mentions'] += 1
+    
+    for entity_type, (pattern, aliases) in get_entity_gazetteer().items():
+        for match in pattern.finditer(clean):
+            add(entity_type, aliases[match.group(1)])
+    
+    for match in PERSON_PATTERN.finditer(clean):
+        tokens = match.group(1).split()
+        # "Bürgermeister Stadt Köln" ist keine Person
+        if not any(token.lower() in ENTITY_STOPWORDS for token in tokens):
+            add('person', match.group(1))
+    
+    for pattern in SCHOOL_PATTERNS:
+        for match in pattern.finditer(clean):
+            last_word = match.group(1).split()[-1].lower()
+            if last_word not in SCHOOL_NAME_PREPOSITIONS and last_word not in ENTITY_STOPWORDS:
+                add('schule', match.group(1))
+    
+    for match in COMPANY_PATTERN.finditer(clean):
+        words = match.group(1).split()
+        while words and words[0].lower() in ENTITY_STOPWORDS:
+            words = words[1:]
+        if words:
+            add('firma', " ".join(words + [match.group(2)]))
+    
+    for pattern in STREET_PATTERNS:
+        for match in pattern.finditer(clean):
+            add('ort', match.group(1))
+    
+    return sorted(found.values(), key=lambda entry: (-entry['mentions'], entry['key']))
+
+def build_entity_record(article_hash: str, analysis_text: str) -> dict:
+    """Datensatz für den Entitäten-Index eines Artikels"""
+    return {'article_hash': article_hash, 'entities': extract_entities(analysis_text)}
+
+def entity_index_path() -> str:
+    return os.path.join(get_local_cache_dir('index'), 'entities.json')
+
+def load_local_entity_index() -> dict:
+    """Lokaler Index: entity_key -> {type, name, articles: {article_hash: mentions}}"""
+    if not os.path.exists(entity_index_path()):
+        return {}
+    with open(entity_index_path(), encoding='utf-8') as f:
+        return json.load(f)
+
+def store_entities(records: list):
+    """Entitäten pro Artikel ersetzen (Supabase-RPC oder lokaler Ersatz)"""
+    if not records:
+        return
+    
+    if get_config("ENTITY_STORE", "supabase") == 'local':
+        index = load_local_entity_index()
+        hashes = {record['article_hash'] for record in records}
+        for entry in index.values():
+            for article_hash in hashes & entry['articles'].keys():
+                del entry['articles'][article_hash]
+        for record in records:
+            for entity in record['entities']:
+                entry = index.setdefault(entity['key'], {'type': entity['type'], 'name': entity['name'], 'articles': {}})
+                entry['articles'][record['article_hash']] = entity['mentions']
+        index = {key: entry for key, entry in index.items() if entry['articles']}
+        with open(entity_index_path(), 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+    else:
+        init_supabase().rpc('store_article_entities', {'p_rows': records}).execute()
+    
+    load_entity_facets.clear()
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_entity_facets(limit: int = 500) -> list:
+    """Facetten: [{entity_key, entity_type, name, article_count, mentions}], häufigste zuerst"""
+    if get_config("ENTITY_STORE", "supabase") == 'local':
+        facets = [{
+            'entity_key': key,
+            'entity_type': entry['type'],
+            'name': entry['name'],
+            'article_count': len(entry['articles']),
+            'mentions': sum(entry['articles'].values()),
+        } for key, entry in load_local_entity_index().items()]
+        return sorted(facets, key=lambda facet: -facet['article_count'])[:limit]
+    
+    response = init_supabase().table('jl_entity_facets').select("*").order(
+        'article_count', desc=True
+    ).limit(limit).execute()
+    return response.data or []
+
+# Lange .in_()-Listen landen in der URL - Proxy und PostgREST lehnen zu lange Anfragen ab
+IN_FILTER_CHUNK = 150
+
+def chunked(values, size: int = IN_FILTER_CHUNK) -> list:
+    """Werte in Stücke für einzelne .in_()-Abfragen teilen"""
+    values = list(values)
+    return [values[start:start + size] for start in range(0, len(values), size)]
+
+def find_articles_by_entities(entity_keys: list) -> set:
+    """Artikel, die alle gewählten Entitäten erwähnen - reine Index-Abfrage"""
+    if not entity_keys:
+        return set()
+    
+    if get_config("ENTITY_STORE", "supabase") == 'local':
+        index = load_local_entity_index()
+        postings = [set(index.get(key, {}).get('articles', {})) for key in entity_keys]
+    else:
+        # Seitenweise, da häufige Entitäten mehr Zeilen haben als PostgREST pro Antwort liefert
+        rows, page_size = [], 1000
+        for keys in chunked(entity_keys):
+            start = 0
+            while True:
+                response = init_supabase().table('jl_entities').select("entity_key, article_hash").in_(
+                    'entity_key', keys
+                ).order('entity_key').order('article_hash').range(start, start + page_size - 1).execute()
+                rows.extend(response.data or [])
+                if len(response.data or []) < page_size:
+                    break
+                start += page_size
+        postings = [
+            {row['article_hash'] for row in rows if row['entity_key'] == key}
+            for key in entity_keys
+        ]
+    return set.intersection(*postings)
+
+def load_articles_by_hashes(article_hashes):
+    """Artikel-Liste für bekannte Hashes (ohne das ganze Archiv zu laden)"""
+    if not article_hashes:
+        return pd.DataFrame()
+    rows = []
+    for hashes in chunked(article_hashes):
+        rows.extend(init_supabase().table('jl_articles').select(ARTICLE_LIST_COLUMNS).in_(
+            'article_hash', hashes
+        ).execute().data or [])
+    return articles_to_dataframe(rows) if rows else pd.DataFrame()
+
+def rebuild_entity_index(page_size: int = 500) -> dict:
+    """Entitäten für alle gespeicherten Artikel neu erkennen (z.B. nach Gazetteer-Änderung)"""
+    supabase = init_supabase()
+    writer = BulkUpserter(sink=store_entities)
+    start = 0
+    while True:
+        response = supabase.table('jl_articles').select("article_hash, analysis").order(
+            'id'
+        ).range(start, start + page_size - 1).execute()
+        rows = response.data or []
+        for row in rows:
+            writer.add(build_entity_record(row['article_hash'], row['analysis'] or ""))
+        if len(rows) < page_size:
+            break
+        start += page_size
+    return writer.flush()
+
+# Themen-Zeitreihe nach Erscheinungsdatum: Erwähnungen pro Ausgabe, Tagessummen werden beim Speichern fortgeschrieben
+THEME_KEYWORDS = {
+    'Kommunalpolitik': ['Stadtrat', 'Bürgermeister', 'Gemeinderat', 'Kommune'],
+    'Verkehr': ['Verkehr', 'ÖPNV', 'Mobilität', 'Straße', 'Radweg'],
+    'Digitalisierung': ['Digital', 'Internet', 'Online', 'IT'],
+    'Bildung': ['Schule', 'Bildung', 'Universität', 'Studium'],
+    'Wirtschaft': ['Wirtschaft', 'Unternehmen', 'Gewerbe', 'Arbeitsplätze'],
+    'Umwelt': ['Umwelt', 'Klima', 'Nachhaltigkeit', 'Energie']
+}
+# Auffälligkeit: Erwähnungen pro Ausgabe in der letzten Woche gegenüber dem Schnitt der Wochen davor
+THEME_SPIKE_FACTOR = 3.0
+THEME_SPIKE_WINDOW_WEEKS = 4
+THEME_SPIKE_MIN_MENTIONS = 3
+
+def theme_keyword_pattern(keyword: str):
+    """Abkürzungen (IT, ÖPNV) nur als ganzes Wort in Großschreibung, sonst Wortanfang ohne Groß/Klein (Schule -> Schulen)"""
+    if keyword.isupper():
+        return re.compile(rf"\b{re.escape(keyword)}\b")
+    return re.compile(rf"\b{re.escape(keyword)}\w*", re.IGNORECASE)
+
+THEME_PATTERNS = {theme: [theme_keyword_pattern(keyword) for keyword in keywords]
+                  for theme, keywords in THEME_KEYWORDS.items()}
+
+def theme_mentions(analysis_text: str) -> dict:
+    """Erwähnungen pro Thema in einer Analyse (nur Themen mit Treffern)"""
+    counts = {theme: sum(len(pattern.findall(analysis_text or "")) for pattern in patterns)
+              for theme, patterns in THEME_PATTERNS.items()}
+    return {theme: count for theme, count in counts.items() if count}
+
+def build_theme_record(article_hash: str, issue_date, analysis_text: str) -> dict:
+    """Datensatz für jl_article_themes - ohne Erscheinungsdatum wird er nicht gespeichert"""
+    return {'article_hash': article_hash, 'issue_date': issue_date, 'themes': theme_mentions(analysis_text)}
+
+def theme_index_path() -> str:
+    return os.path.join(get_local_cache_dir('index'), 'themes.json')
+
+def apply_theme_delta(daily: dict, issue_date: str, themes: dict, sign: int):
+    """Tagessummen fortschreiben: {Datum: {Thema: [Erwähnungen, Ausgaben]}}, '*' zählt alle Ausgaben"""
+    day = daily.setdefault(issue_date, {})
+    for theme, mentions in {**themes, '*': 0}.items():
+        entry = day.setdefault(theme, [0, 0])
+        entry[0] += sign * mentions
+        entry[1] += sign
+        if entry == [0, 0]:
+            del day[theme]
+    if not day:
+        del daily[issue_date]
+
+def store_article_themes(records: list):
+    """Themen pro Ausgabe ersetzen - die Tagessummen folgen per Trigger (lokal: per Delta)"""
+    records = [record for record in records if record.get('issue_date')]
+    if not records:
+        return
+    
+    if get_config("THEME_STORE", "supabase") == 'local':
+        index = {'articles': {}, 'daily': {}}
+        if os.path.exists(theme_index_path()):
+            with open(theme_index_path(), encoding='utf-8') as f:
+                index = json.load(f)
+        for record in records:
+            old = index['articles'].get(record['article_hash'])
+            if old:
+                apply_theme_delta(index['daily'], old['issue_date'], old['themes'], -1)
+            apply_theme_delta(index['daily'], record['issue_date'], record['themes'], 1)
+            index['articles'][record['article_hash']] = {'issue_date': record['issue_date'], 'themes': record['themes']}
+        with open(theme_index_path(), 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+    else:
+        init_supabase().table('jl_article_themes').upsert(records, on_conflict='article_hash').execute()
+    
+    fetch_theme_series.clear()
+
+def theme_series_arrays(daily: dict) -> dict:
+    """Dichte Tages-Arrays ab dem ersten Erscheinungsdatum (dieselbe Form wie jl_theme_series)"""
+    if not daily:
+        return {'start': None, 'issues': [], 'themes': {}}
+    first = datetime.strptime(min(daily), '%Y-%m-%d').date()
+    days = (datetime.strptime(max(daily), '%Y-%m-%d').date() - first).days + 1
+    issues = [0] * days
+    themes = {}
+    for issue_date, day in daily.items():
+        offset = (datetime.strptime(issue_date, '%Y-%m-%d').date() - first).days
+        for theme, (mentions, count) in day.items():
+            if theme == '*':
+                issues[offset] = count
+            else:
+                themes.setdefault(theme, [0] * days)[offset] = mentions
+    return {'start': first.isoformat(), 'issues': issues, 'themes': themes}
+
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_theme_series() -> dict:
+    """Vorberechnete Zeitreihe: {start, issues: [Ausgaben/Tag], themes: {Thema: [Erwähnungen/Tag]}}"""
+    if get_config("THEME_STORE", "supabase") == 'local':
+        if not os.path.exists(theme_index_path()):
+            return theme_series_arrays({})
+        with open(theme_index_path(), encoding='utf-8') as f:
+            return theme_series_arrays(json.load(f)['daily'])
+    return init_supabase().rpc('jl_theme_series', {}).execute().data or theme_series_arrays({})
+
+def theme_series_from_rows(rows: list) -> dict:
+    """Dieselbe Zeitreihe aus geladenen Artikelzeilen (falls die Migration fehlt)"""
+    daily = {}
+    for row in rows:
+        if row.get('pdf_date'):
+            apply_theme_delta(daily, str(row['pdf_date'])[:10], theme_mentions(row.get('analysis')), 1)
+    return theme_series_arrays(daily)
+
+def theme_series_frame(series: dict, freq: str = 'D'):
+    """Zeitreihe als DataFrame (Spalten: Themen + 'Ausgaben'), optional zu Wochen/Monaten summiert"""
+    if not series['start']:
+        return pd.DataFrame()
+    index = pd.date_range(series['start'], periods=len(series['issues']), freq='D')
+    df = pd.DataFrame({**series['themes'], 'Ausgaben': series['issues']}, index=index)
+    return df if freq == 'D' else df.resample(freq).sum()
+
+def detect_theme_spikes(series: dict, window: int = THEME_SPIKE_WINDOW_WEEKS,
+                        factor: float = THEME_SPIKE_FACTOR, min_mentions: int = THEME_SPIKE_MIN_MENTIONS) -> list:
+    """Themen, die in der letzten Woche (pro Ausgabe) deutlich über dem Schnitt der Wochen davor liegen"""
+    weekly = theme_series_frame(series, 'W')
+    if len(weekly) < 2:
+        return []
+    
+    latest = weekly.iloc[-1]
+    previous = weekly.iloc[-(window + 1):-1]
+    if not latest['Ausgaben'] or not previous['Ausgaben'].sum():
+        return []
+    
+    spikes = []
+    for theme in series['themes']:
+        mentions = int(latest[theme])
+        if mentions < min_mentions:
+            continue
+        rate = mentions / latest['Ausgaben']
+        baseline = previous[theme].sum() / previous['Ausgaben'].sum()
+        if baseline == 0 or rate >= factor * baseline:
+            spikes.append({
+                'theme': theme,
+                'week': weekly.index[-1].date().isoformat(),
+                'mentions': mentions,
+                'ratio': float(rate / baseline) if baseline else None,
+            })
+    return sorted(spikes, key=lambda spike: -(spike['ratio'] or float('inf')))
+
+def rebuild_theme_series(page_size: int = 500) -> dict:
+    """Themen für alle gespeicherten Artikel neu zählen (z.B. nach der Migration oder neuen Stichwörtern)"""
+    supabase = init_supabase()
+    writer = BulkUpserter(sink=store_article_themes)
+    start = 0
+    while True:
+        response = supabase.table('jl_articles').select("article_hash, pdf_date, analysis").order(
+            'id'
+        ).range(start, start + page_size - 1).execute()
+        rows = response.data or []
+        for row in rows:
+            writer.add(build_theme_record(row['article_hash'], row['pdf_date'], row['analysis']))
+        if len(rows) < page_size:
+            break
+        start += page_size
+    return writer.flush()
+
+# Lokaler Analyse-Snapshot: jl_articles als Parquet, nach Monat (created_at) partitioniert und per Wasserstand ergänzt
+SNAPSHOT_COLUMNS = ['id', 'article_hash', 'created_at', 'pdf_name', 'pdf_date',
+                    'highest_priority_count', 'high_priority_count', 'analysis']
+SNAPSHOT_PAGE_ROWS = 1000
+# Mehr Teil-Dateien pro Monat werden zu einer zusammengefasst
+SNAPSHOT_MAX_PARTS = 8
+WEEKDAYS_DE = ['Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa', 'So']
+
+def snapshot_dir() -> str:
+    return get_config("SNAPSHOT_DIR") or get_local_cache_dir('snapshot', 'jl_articles')
+
+def snapshot_watermark_path() -> str:
+    return os.path.join(snapshot_dir(), '_watermark.json')
+
+def load_snapshot_watermark() -> dict:
+    """Stand des Snapshots: letzte übernommene Zeile (created_at, id), Zeilen, letzte Aktualisierung"""
+    if not os.path.exists(snapshot_watermark_path()):
+        return {'created_at': None, 'id': None, 'rows': 0, 'refreshed_at': None}
+    with open(snapshot_watermark_path()) as f:
+        return json.load(f)
+
+def save_snapshot_watermark(watermark: dict):
+    temp_path = f"{snapshot_watermark_path()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(watermark, f)
+    os.replace(temp_path, snapshot_watermark_path())
+
+def snapshot_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('id', pa.int64()),
+        ('article_hash', pa.string()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+        ('pdf_name', pa.string()),
+        ('pdf_date', pa.date32()),
+        ('highest_priority_count', pa.int32()),
+        ('high_priority_count', pa.int32()),
+        ('analysis', pa.string()),
+    ])
+
+def snapshot_month_parts(month: str) -> list:
+    """Teil-Dateien eines Monats in Schreibreihenfolge"""
+    folder = os.path.join(snapshot_dir(), f"month={month}")
+    if not os.path.isdir(folder):
+        return []
+    return [os.path.join(folder, name) for name in sorted(os.listdir(folder)) if name.endswith('.parquet')]
+
+def write_snapshot_part(month: str, frame):
+    """Zeilen eines Monats als neue Teil-Datei anhängen"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    folder = os.path.join(snapshot_dir(), f"month={month}")
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"part-{time.time_ns()}.parquet")
+    table = pa.Table.from_pandas(frame[SNAPSHOT_COLUMNS], schema=snapshot_schema(), preserve_index=False)
+    pq.write_table(table, f"{path}.tmp", compression='zstd')
+    os.replace(f"{path}.tmp", path)
+
+def compact_snapshot_month(month: str):
+    """Zu viele Teil-Dateien eines Monats zu einer zusammenfassen (doppelte Artikel: der neueste zählt)"""
+    import pyarrow.parquet as pq
+    
+    parts = snapshot_month_parts(month)
+    if len(parts) <= SNAPSHOT_MAX_PARTS:
+        return
+    frame = pd.concat([pq.read_table(part).to_pandas() for part in parts], ignore_index=True)
+    write_snapshot_part(month, frame.drop_duplicates('article_hash', keep='last'))
+    for part in parts:
+        os.remove(part)
+
+def snapshot_rows_to_frame(rows: list):
+    """Supabase-Zeilen in die Snapshot-Typen bringen"""
+    frame = pd.DataFrame(rows, columns=SNAPSHOT_COLUMNS)
+    frame['created_at'] = pd.to_datetime(frame['created_at'], utc=True, format='ISO8601')
+    frame['pdf_date'] = pd.to_datetime(frame['pdf_date']).dt.date
+    for column in ('highest_priority_count', 'high_priority_count'):
+        frame[column] = frame[column].fillna(0).astype('int32')
+    return frame
+
+@st.cache_resource
+def get_snapshot_lock() -> threading.Lock:
+    """Nur eine Aktualisierung gleichzeitig (über alle Sessions hinweg)"""
+    return threading.Lock()
+
+def refresh_article_snapshot(page_size: int = SNAPSHOT_PAGE_ROWS) -> dict:
+    """Neue Artikel seit dem Wasserstand seitenweise holen und monatsweise anhängen"""
+    with get_snapshot_lock():
+        watermark = load_snapshot_watermark()
+        supabase = init_supabase()
+        added = 0
+        months = set()
+        
+        while True:
+            query = supabase.table('jl_articles').select(", ".join(SNAPSHOT_COLUMNS))
+            created_at, row_id = watermark['created_at'], watermark.get('id')
+            if created_at and row_id is not None:
+                # Keyset über (created_at, id) - Batch-Upserts teilen sich oft denselben Zeitstempel
+                query = query.or_(f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt.{row_id})')
+            elif created_at:
+                # Älterer Wasserstand ohne id: gleichen Zeitstempel erneut holen, Dubletten fallen beim Lesen weg
+                query = query.gte('created_at', created_at)
+            with perf_span('snapshot_fetch') as span:
+                rows = query.order('created_at').order('id').limit(page_size).execute().data or []
+                span['rows'] = len(rows)
+            if not rows:
+                break
+            
+            frame = snapshot_rows_to_frame(rows)
+            for month, month_frame in frame.groupby(frame['created_at'].dt.strftime('%Y-%m')):
+                write_snapshot_part(month, month_frame)
+                months.add(month)
+            
+            # Wasserstand nach jeder Seite: ein Abbruch verliert höchstens eine Seite
+            watermark['created_at'] = rows[-1]['created_at']
+            watermark['id'] = rows[-1]['id']
+            watermark['rows'] += len(rows)
+            save_snapshot_watermark(watermark)
+            added += len(rows)
+            if len(rows) < page_size:
+                break
+        
+        for month in months:
+            compact_snapshot_month(month)
+        
+        watermark['refreshed_at'] = datetime.now().astimezone().isoformat()
+        save_snapshot_watermark(watermark)
+    
+    return {'added': added, 'months': sorted(months), 'rows': watermark['rows']}
+
+def snapshot_is_stale() -> bool:
+    """Älter als SNAPSHOT_REFRESH_MINUTES (Standard 60)?"""
+    refreshed_at = load_snapshot_watermark()['refreshed_at']
+    if not refreshed_at:
+        return True
+    age = datetime.now().astimezone() - datetime.fromisoformat(refreshed_at)
+    return age > timedelta(minutes=get_config("SNAPSHOT_REFRESH_MINUTES", 60, int))
+
+def query_snapshot(columns: list = None, date_from=None, date_to=None, date_column: str = 'created_at'):
+    """Artikel aus dem lokalen Snapshot - gelesen werden nur die nötigen Spalten und (bei created_at) Monate"""
+    import pyarrow.dataset as ds
+    
+    columns = columns or SNAPSHOT_COLUMNS
+    date_from = str(date_from)[:10] if date_from else None
+    date_to = str(date_to)[:10] if date_to else None
+    
+    months = sorted(name[len('month='):] for name in os.listdir(snapshot_dir()) if name.startswith('month='))
+    if date_column == 'created_at':
+        months = [month for month in months
+                  if (not date_from or month >= date_from[:7]) and (not date_to or month <= date_to[:7])]
+    parts = [part for month in months for part in snapshot_month_parts(month)]
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    
+    day = ds.field(date_column).cast('date32')
+    condition = None
+    if date_from:
+        condition = day >= date.fromisoformat(date_from)
+    if date_to:
+        upper = day <= date.fromisoformat(date_to)
+        condition = upper if condition is None else condition & upper
+    
+    wanted = list(dict.fromkeys([*columns, 'article_hash']))
+    table = ds.dataset(parts, format='parquet', schema=snapshot_schema()).to_table(columns=wanted, filter=condition)
+    # Artikel können nach einer Aktualisierung doppelt in zwei Teil-Dateien stehen - der neueste zählt
+    return table.to_pandas().drop_duplicates('article_hash', keep='last')[columns]
+
+def aggregate_snapshot(group_by: str = 'Monat', date_column: str = 'pdf_date', text: str = None,
+                       date_from=None, date_to=None):
+    """Ad-hoc-Auswertung: Ausgaben und Prioritäten je Monat, Woche, Wochentag oder PDF"""
+    columns = ['article_hash', date_column, 'pdf_name', 'highest_priority_count', 'high_priority_count']
+    df = query_snapshot(columns + (['analysis'] if text else []), date_from, date_to, date_column)
+    if text:
+        df = df[df['analysis'].str.contains(text, case=False, regex=False, na=False)]
+    df = df.dropna(subset=[date_column])
+    if df.empty:
+        return pd.DataFrame(columns=['Ausgaben', 'Höchste Priorität', 'Hohe Priorität'])
+    
+    dates = pd.to_datetime(df[date_column], utc=date_column == 'created_at')
+    if date_column == 'created_at':
+        dates = dates.dt.tz_localize(None)
+    keys = {
+        'Monat': lambda: dates.dt.strftime('%Y-%m'),
+        'Woche': lambda: dates.dt.strftime('%G-W%V'),
+        'Wochentag': lambda: dates.dt.dayofweek.map(lambda day: f"{day + 1} {WEEKDAYS_DE[day]}"),
+        'PDF': lambda: df['pdf_name'],
+    }
+    return df.groupby(keys[group_by]().rename(group_by)).agg(**{
+        'Ausgaben': ('article_hash', 'count'),
+        'Höchste Priorität': ('highest_priority_count', 'sum'),
+        'Hohe Priorität': ('high_priority_count', 'sum'),
+    })
+
+# Migration Helper
+def records_from_legacy_csv(old_df) -> list:
+    """Alte CSV-Zeilen spaltenweise in jl_articles-Datensätze umwandeln (ohne iterrows)"""
+    names = old_df['pdf_name'].astype(str)
+    fallback_hashes = names.map(lambda name: hashlib.md5(name.encode()).hexdigest()[:32])
+    
+    if 'id' in old_df.columns:
+        hashes = old_df['id'].astype(str).where(old_df['id'].notna(), fallback_hashes)
+    else:
+        hashes = fallback_hashes
+    
+    if 'analyse' in old_df.columns:
+        analyses = old_df['analyse']
+    elif 'analysis' in old_df.columns:
+        analyses = old_df['analysis']
+    else:
+        analyses = pd.Series('', index=old_df.index)
+    
+    if 'volltext_kurz' in old_df.columns:
+        full_texts = old_df['volltext_kurz'].fillna('').astype(str).str.replace('...', '', regex=False)
+    else:
+        full_texts = pd.Series('', index=old_df.index)
+    
+    if 'datum' in old_df.columns:
+        created = pd.to_datetime(old_df['datum'], errors='coerce')
+        created_at = created.map(lambda ts: ts.isoformat() if pd.notna(ts) else None)
+    else:
+        created_at = pd.Series(None, index=old_df.index, dtype=object)
+    
+    records = pd.DataFrame({
+        'article_hash': hashes,
+        'pdf_name': names,
+        'analysis': analyses.fillna('').astype(str),
+        'full_text': full_texts,
+        'created_at': created_at,
+    }).to_dict('records')
+    
+    for record in records:
+        # Fehlende Datumswerte als NULL statt NaN senden
+        if pd.isna(record['created_at']):
+            record['created_at'] = None
+        record['metadata'] = {'migrated_from_csv': True}
+    return records
+
+def migrate_from_csv_to_supabase():
+    """Migriere bestehende CSV-Daten zu Supabase"""
+    try:
+        # Versuche CSV zu laden
+        if os.path.exists('jl_artikel_database.csv'):
+            old_df = pd.read_csv('jl_artikel_database.csv')
+            
+            progress_bar = st.progress(0)
+            status = st.empty()
+            
+            status.text(f"Bereite {len(old_df)} Datensätze vor...")
+            records = records_from_legacy_csv(old_df)
+            
+            def show_progress(written, failed):
+                done = written + failed
+                progress_bar.progress(min(done / max(len(records), 1), 1.0))
+                status.text(f"Migriere {done}/{len(records)}...")
+            
+            writer = BulkUpserter(progress_callback=show_progress)
+            writer.add_many(records)
+            report = writer.flush()
+            migrated = report['written']
+            
+            progress_bar.progress(1.0)
+            status.text(f"✅ Migration abgeschlossen: {migrated}/{len(old_df)} Artikel")
+            
+            for failure in report['failed']:
+                st.warning(f"Fehler bei {failure['pdf_name']}: {failure['error']}")
+            
+            # Backup alte CSV
+            os.rename('jl_artikel_database.csv', 'jl_artikel_database_backup.csv')
+            st.success(f"✅ {migrated} Artikel erfolgreich migriert!")
+            
+    except Exception as e:
+        st.error(f"Migrationsfehler: {e}")
+
+# Große PDFs: auf die Platte auslagern statt mehrfach im Speicher zu halten
+PDF_CHUNK_SIZE = 1024 * 1024
+BASE64_JUNK = re.compile(rb'[^A-Za-z0-9+/=]')
+
+class PdfTooLarge(ValueError):
+    """PDF überschreitet die konfigurierte Maximalgröße"""
+
+def get_pdf_limits() -> dict:
+    """Grenzen pro Datei (PDF_MAX_MB, PDF_MAX_PAGES)"""
+    return {
+        'max_bytes': get_config("PDF_MAX_MB", 80, int) * 1024 * 1024,
+        'max_pages': get_config("PDF_MAX_PAGES", 200, int),
+    }
+
+class SpooledPdf:
+    """PDF als Temp-Datei - Prüfsummen entstehen beim Schreiben, die Datei wird beim Schließen gelöscht"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.size = 0
+        self.md5 = None
+        self.sha256 = None
+        self._max_bytes = get_pdf_limits()['max_bytes']
+        self._md5 = hashlib.md5()
+        self._sha256 = hashlib.sha256()
+        fd, self.path = tempfile.mkstemp(suffix='.pdf', prefix='jl_', dir=get_config("PDF_SPOOL_DIR", "") or None)
+        self._file = os.fdopen(fd, 'wb')
+    
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self._max_bytes:
+            raise PdfTooLarge(f"'{self.name}' ist größer als {self._max_bytes // (1024 * 1024)} MB")
+        self._file.write(chunk)
+        self._md5.update(chunk)
+        self._sha256.update(chunk)
+    
+    def finish(self) -> 'SpooledPdf':
+        self._file.close()
+        self.md5 = self._md5.hexdigest()
+        self.sha256 = self._sha256.hexdigest()
+        return self
+    
+    def close(self):
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    @classmethod
+    def from_file(cls, file_obj, name: str = None) -> 'SpooledPdf':
+        """Upload oder Datei-Objekt blockweise auf die Platte kopieren"""
+        spool = cls(name or getattr(file_obj, 'name', 'upload.pdf'))
+        try:
+            if hasattr(file_obj, 'seek'):
+                file_obj.seek(0)
+            while True:
+                chunk = file_obj.read(PDF_CHUNK_SIZE)
+                if not chunk:
+                    break
+                spool.write(chunk)
+        except Exception:
+            spool.close()
+            raise
+        return spool.finish()
+    
+    @classmethod
+    def from_base64_response(cls, response, name: str) -> 'SpooledPdf':
+        """Base64-Antwort des Apps Scripts (stream=True) blockweise dekodieren und auslagern"""
+        spool = cls(name)
+        rest = b''
+        try:
+            for chunk in response.iter_content(PDF_CHUNK_SIZE):
+                data = rest + BASE64_JUNK.sub(b'', chunk)
+                # Nur ganze 4-Zeichen-Gruppen dekodieren, der Rest wandert in den nächsten Block
+                cut = len(data) - len(data) % 4
+                spool.write(base64.b64decode(data[:cut]))
+                rest = data[cut:]
+            if rest:
+                spool.write(base64.b64decode(rest + b'=' * (-len(rest) % 4)))
+        except Exception:
+            spool.close()
+            raise
+        finally:
+            response.close()
+        return spool.finish()
+
+class MemoryBudget:
+    """Gemeinsames Speicher-Budget für gerade geöffnete PDFs (über alle Threads)"""
+    
+    def __init__(self, limit_bytes: int):
+        self.limit = limit_bytes
+        self.used = 0
+        self._condition = threading.Condition()
+    
+    @contextmanager
+    def reserve(self, nbytes: int):
+        # Ein einzelnes übergroßes PDF darf trotzdem laufen - dann aber allein
+        nbytes = min(nbytes, self.limit)
+        with perf_span('memory_wait'), self._condition:
+            while self.used + nbytes > self.limit:
+                self._condition.wait()
+            self.used += nbytes
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.used -= nbytes
+                self._condition.notify_all()
+
+@st.cache_resource
+def get_memory_budget() -> MemoryBudget:
+    return MemoryBudget(get_config("PDF_MEMORY_BUDGET_MB", 512, int) * 1024 * 1024)
+
+def pdf_memory_estimate(pdf: SpooledPdf) -> int:
+    """Grobe Schätzung des Speicherbedarfs beim Parsen (Objekte, Seiteninhalte, Text)"""
+    return int(pdf.size * get_config("PDF_MEMORY_FACTOR", 3.0, float))
+
+@contextmanager
+def open_pdf_reader(pdf: SpooledPdf):
+    """pypdf direkt auf der Temp-Datei - per mmap, damit pypdf keine Kopie in den Speicher liest"""
+    with open(pdf.path, 'rb') as f:
+        try:
+            stream = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Leere Datei oder Dateisystem ohne mmap
+            stream = f
+        try:
+            with perf_span('pdf_open'):
+                reader = pypdf.PdfReader(stream)
+            yield reader
+        finally:
+            if stream is not f:
+                stream.close()
+
+# OCR-Fallback für Seiten ohne (brauchbare) Textebene
+OCR_MIN_CHARS = 80
+
+def page_text_quality(page_text: str) -> float:
+    """Anteil plausibler Zeichen: Buchstaben, Ziffern, übliche Satzzeichen (0 = Müll, 1 = sauber)"""
+    visible = [c for c in page_text if not c.isspace()]
+    if not visible:
+        return 0.0
+    plausible = sum(1 for c in visible if c.isalnum() or c in ".,;:!?-–„“\"'()/%€§&")
+    # "(cid:123)"-Sequenzen entstehen bei Schriften ohne Unicode-Zuordnung
+    broken = page_text.count("(cid:") * 8 + page_text.count("�")
+    return max(0.0, (plausible - broken) / len(visible))
+
+def needs_ocr(page_text: str) -> bool:
+    """Seite ohne Textebene oder mit kaputter Zeichenzuordnung?"""
+    stripped = page_text.strip() if page_text else ""
+    if len(stripped) < OCR_MIN_CHARS:
+        return True
+    return page_text_quality(stripped) < get_config("OCR_MIN_QUALITY", 0.85, float)
+
+def prefer_ocr_text(page_text: str, ocr_text: str) -> bool:
+    """OCR übernehmen, wenn sie lesbarer ist - kaputt kodierter Text ist oft länger als der erkannte"""
+    extracted, recognized = page_text.strip(), ocr_text.strip()
+    if not recognized:
+        return False
+    if len(extracted) < OCR_MIN_CHARS:
+        return len(recognized) > len(extracted)
+    return page_text_quality(recognized) > page_text_quality(extracted)
+
+def ocr_available() -> bool:
+    """OCR nur, wenn pypdfium2, pytesseract und das Tesseract-Programm vorhanden sind"""
+    if not get_config("OCR_ENABLED", True, bool):
+        return False
+    return (importlib.util.find_spec('pypdfium2') is not None
+            and importlib.util.find_spec('pytesseract') is not None
+            and shutil.which('tesseract') is not None)
+
+@st.cache_resource
+def get_ocr_pool():
+    """Begrenzter Prozess-Pool für OCR (CPU-lastig, daher getrennt vom Webserver-Prozess)"""
+    return ProcessPoolExecutor(max_workers=get_config("OCR_WORKERS", 2, int))
+
+def ocr_cache_path(pdf_digest: str, page_index: int, dpi: int, lang: str) -> str:
+    return os.path.join(get_local_cache_dir('ocr'), f"{pdf_digest}_{page_index}_{dpi}_{lang}.txt")
+
+def ocr_pages(pdf: SpooledPdf, page_indexes: list) -> dict:
+    """OCR für die angegebenen Seiten (0-basiert) - Ergebnisse pro Seite auf der Platte gecacht"""
+    dpi = get_config("OCR_DPI", 300, int)
+    lang = get_config("OCR_LANG", "deu")
+    timeout = get_config("OCR_PAGE_TIMEOUT", 120, int)
+    
+    results = {}
+    missing = []
+    for page_index in page_indexes:
+        path = ocr_cache_path(pdf.sha256, page_index, dpi, lang)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                results[page_index] = f.read()
+        else:
+            missing.append(page_index)
+    
+    if not missing:
+        return results
+    
+    # Worker-Prozesse lesen das ausgelagerte PDF direkt von der Platte
+    import ocr_worker
+    workers = get_config("OCR_WORKERS", 2, int)
+    for attempt in range(2):
+        pool = get_ocr_pool()
+        try:
+            futures = {pool.submit(ocr_worker.ocr_page, pdf.path, page_index, dpi, lang): page_index
+                       for page_index in missing}
+        except BrokenProcessPool:
+            get_ocr_pool.clear()
+            if attempt:
+                ui().warning("⚠️ OCR-Prozesse nicht verfügbar - Seiten ohne Texterkennung")
+            continue
+        
+        # Eine Frist für den ganzen Stapel: OCR_PAGE_TIMEOUT pro Seite und Worker-Durchgang
+        with perf_span('ocr', pages=len(futures)):
+            done, not_done = wait(futures, timeout=timeout * ((len(futures) + workers - 1) // workers))
+        
+        broken = []
+        for future in done:
+            page_index = futures[future]
+            try:
+                text = future.result()
+            except BrokenProcessPool:
+                broken.append(page_index)
+                continue
+            except Exception as e:
+                ui().warning(f"⚠️ OCR für Seite {page_index + 1} fehlgeschlagen: {e}")
+                continue
+            results[page_index] = text
+            with open(ocr_cache_path(pdf.sha256, page_index, dpi, lang), 'w', encoding='utf-8') as f:
+                f.write(text)
+        
+        if not_done:
+            for future in not_done:
+                future.cancel()
+            pages = ", ".join(str(futures[future] + 1) for future in sorted(not_done, key=futures.get))
+            ui().warning(f"⚠️ OCR-Zeitlimit überschritten - Seiten {pages} ohne Texterkennung")
+            # Laufende Aufgaben lassen sich nicht abbrechen: hängende Worker beenden, neuer Pool beim nächsten Mal
+            for process in list(getattr(pool, '_processes', {}).values()):
+                process.terminate()
+            pool.shutdown(wait=False, cancel_futures=True)
+            get_ocr_pool.clear()
+        
+        if not broken:
+            break
+        # Ein Worker ist abgestürzt (z.B. Speicher) - Pool neu anlegen und die betroffenen Seiten einmal wiederholen
+        pool.shutdown(wait=False, cancel_futures=True)
+        get_ocr_pool.clear()
+        missing = broken
+        if attempt:
+            ui().warning(f"⚠️ OCR-Prozesse abgestürzt - Seiten {', '.join(str(n + 1) for n in sorted(broken))} "
+                         f"ohne Texterkennung")
+    
+    return results
+
+def extract_pdf_text(pdf_file) -> str:
+    """PDF-Text extrahieren mit verbesserter Multi-Page Unterstützung (Uploads werden vorher ausgelagert)"""
+    if isinstance(pdf_file, SpooledPdf):
+        return extract_spooled_pdf_text(pdf_file)
+    try:
+        with perf_span('spool'):
+            pdf = SpooledPdf.from_file(pdf_file)
+    except Exception as e:
+        ui().error(f"PDF-Fehler: {e}")
+        return ""
+    with pdf:
+        return extract_spooled_pdf_text(pdf)
+
+def extract_spooled_pdf_text(pdf: SpooledPdf) -> str:
+    """Text aus einem ausgelagerten PDF - innerhalb des gemeinsamen Speicher-Budgets"""
+    try:
+        with get_memory_budget().reserve(pdf_memory_estimate(pdf)), open_pdf_reader(pdf) as pdf_reader:
+            return extract_reader_text(pdf_reader, pdf)
+    except Exception as e:
+        ui().error(f"PDF-Fehler: {e}")
+        return ""
+
+def extract_reader_text(pdf_reader, pdf: SpooledPdf) -> str:
+    """Seitentexte lesen, fehlende per OCR ergänzen und mit Seitenmarkierungen zusammensetzen"""
+    # Debug-Info anzeigen
+    total_pages = len(pdf_reader.pages)
+    ui().info(f"📄 PDF hat {total_pages} Seiten")
+    
+    max_pages = get_pdf_limits()['max_pages']
+    if total_pages > max_pages:
+        ui().warning(f"⚠️ Nur die ersten {max_pages} von {total_pages} Seiten werden gelesen (PDF_MAX_PAGES)")
+    
+    text = ""
+    page_texts = []
+    
+    for page_num in range(1, min(total_pages, max_pages) + 1):
+        with perf_span('extract_page', page=page_num):
+            page_texts.append(pdf_reader.pages[page_num - 1].extract_text() or "")
+    
+    # Gescannte oder kaputt kodierte Seiten per OCR nachholen - digitale PDFs kostet das nichts
+    ocr_needed = [index for index, page_text in enumerate(page_texts) if needs_ocr(page_text)]
+    if ocr_needed:
+        if ocr_available():
+            with ui().spinner(f"🔠 OCR für {len(ocr_needed)} Seite(n) ohne brauchbaren Text..."), \
+                    perf_span('ocr', pages=len(ocr_needed)):
+                recognized = ocr_pages(pdf, ocr_needed)
+            for index, ocr_text in recognized.items():
+                if prefer_ocr_text(page_texts[index], ocr_text):
+                    page_texts[index] = ocr_text
+            ui().info(f"🔠 OCR: {len(recognized)} von {len(ocr_needed)} Seite(n) erkannt")
+        else:
+            pages_list = ", ".join(str(index + 1) for index in ocr_needed[:20])
+            ui().warning(f"⚠️ {len(ocr_needed)} Seite(n) ohne brauchbaren Text ({pages_list}) - "
+                       f"OCR nicht verfügbar (Tesseract, pytesseract und pypdfium2 benötigt)")
+    
+    for page_num, page_text in enumerate(page_texts, 1):
+        # Füge Seitenmarkierung hinzu
+        text += f"\n[SEITE {page_num}]\n{page_text}\n"
+    
+    # Gesamt-Info
+    ui().success(f"✅ Extrahiert: {len(text)} Zeichen aus {len(page_texts)} Seiten")
+    
+    return text
+
+# Modell-Konfiguration (pro Stufe einstellbar)
+DEFAULT_FULL_MODEL = "gemini-1.5-flash"
+DEFAULT_TRIAGE_MODEL = "gemini-1.5-flash-8b"
+
+# Stichwörter für die lokale Vorab-Klassifikation (Kaskaden-Modus)
+LOCAL_RELEVANCE_KEYWORDS = [
+    'dessau', 'roßlau', 'rosslau', 'sachsen-anhalt', 'anhalt', 'magdeburg',
+    'stadtrat', 'landtag', 'landesregierung', 'oberbürgermeister', 'kreistag',
+    'ortschaftsrat', 'stadtverwaltung', 'haseloff', 'bauhaus', 'mulde', 'elbe'
+]
+
+# Interessenprofile: Regionen, Prioritäten und Ausschlüsse je Gruppe - die Prompts werden daraus gefüllt
+DEFAULT_INTEREST_PROFILES = [
+    {
+        'id': 'jl-dessau',
+        'name': 'JuLis Dessau-Roßlau',
+        'audience': 'die Jungen Liberalen',
+        'relevance_label': 'JuLi-Relevanz',
+        'regions': ['Dessau-Roßlau', 'Sachsen-Anhalt'],
+        'highest': [
+            'Dessau-Roßlauer Stadtrat & Kommunalpolitik',
+            'Lokale Wirtschaft & Gewerbeansiedlungen in Dessau-Roßlau',
+            'Schulen & Bildung in Dessau-Roßlau und Sachsen-Anhalt',
+            'Lokaler Verkehr & Infrastruktur (Straßen, ÖPNV in Dessau) - jedoch nichts mit Verkehrsunfällen',
+            'Landespolitik Sachsen-Anhalt',
+        ],
+        'high': [
+            'Digitalisierung in Dessau-Roßlau',
+            'Lokale Umwelt- & Nachhaltigkeitsprojekte',
+            'Bürgerbeteiligung in Dessau-Roßlau',
+            'Jugendthemen in der Region',
+        ],
+        'ignore': [
+            'Bundespolitik (Bundestag, Bundesregierung, etc.)',
+            'Internationale Themen',
+            'Andere Städte/Bundesländer (außer Sachsen-Anhalt)',
+            'lokaler Sport wie Handball und Fussball, Kultur (außer mit politischer Relevanz)',
+            'Alles was keine Politische Relevanz hat - Bewerbungsinformationen oder Diebstahl',
+        ],
+        # Kurzform für die Zeile IGNORIERE im Chunk-Prompt
+        'ignore_short': 'Bundespolitik, andere Städte/Länder, Sport, Kultur',
+        'keywords': LOCAL_RELEVANCE_KEYWORDS,
+    },
+]
+
+def complete_profile(profile: dict) -> dict:
+    """Fehlende Felder eines Profils ergänzen"""
+    profile = {
+        'name': profile['id'],
+        'relevance_label': 'Relevanz',
+        'regions': [],
+        'highest': [],
+        'high': [],
+        'ignore': [],
+        **profile,
+    }
+    profile.setdefault('audience', profile['name'])
+    profile.setdefault('keywords', [region.lower() for region in profile['regions']])
+    profile.setdefault('ignore_short', ", ".join(profile['ignore']))
+    return profile
+
+# Zeichen, die eine Profil-ID haben darf - sonst findet PROFILE_SCORE_PATTERN die Bewertungen nicht
+PROFILE_ID_PATTERN = re.compile(r'[\w.+-]+')
+
+@st.cache_resource
+def get_interest_profiles() -> list:
+    """Standardprofil plus Profile aus INTEREST_PROFILES_FILE (JSON-Liste, gleiche id ersetzt)"""
+    profiles = {profile['id']: complete_profile(profile) for profile in DEFAULT_INTEREST_PROFILES}
+    
+    extra_file = get_config("INTEREST_PROFILES_FILE")
+    if extra_file and os.path.exists(extra_file):
+        with open(extra_file, encoding='utf-8') as f:
+            for profile in json.load(f):
+                if not PROFILE_ID_PATTERN.fullmatch(str(profile.get('id', ''))):
+                    ui().warning(f"⚠️ Profil '{profile.get('id', '')}' übersprungen: "
+                                 f"die ID darf nur Buchstaben, Ziffern und . _ + - enthalten")
+                    continue
+                profiles[profile['id']] = complete_profile(profile)
+    return list(profiles.values())
+
+def get_active_profile() -> dict:
+    """Profil für die normale Analyse (ACTIVE_PROFILE, sonst das erste)"""
+    profiles = get_interest_profiles()
+    wanted = get_config("ACTIVE_PROFILE", profiles[0]['id'])
+    return next((profile for profile in profiles if profile['id'] == wanted), profiles[0])
+
+def upper_de(text: str) -> str:
+    # str.upper() macht aus ß ein SS - in Ortsnamen unerwünscht
+    return "ß".join(part.upper() for part in text.split("ß"))
+
+def merged_profile(profiles: list) -> dict:
+    """Ein Profil mit den Regionen aller Profile - für die neutrale Erfassung im Mehrprofil-Modus"""
+    regions = list(dict.fromkeys(region for profile in profiles for region in profile['regions']))
+    return complete_profile({'id': '+'.join(profile['id'] for profile in profiles),
+                             'audience': 'mehrere Gruppen', 'regions': regions})
+
+def profile_prompt_values(profile: dict) -> dict:
+    """Platzhalter der Prompt-Vorlagen aus einem Profil"""
+    return {
+        'audience': profile['audience'],
+        'relevance_label': profile['relevance_label'],
+        'regions_upper': " oder ".join(upper_de(region) for region in profile['regions']),
+        'highest_list': "\n".join(f"- {topic}" for topic in profile['highest']),
+        'high_list': "\n".join(f"- {topic}" for topic in profile['high']),
+        'ignore_list': "\n".join(f"- {topic}" for topic in profile['ignore']),
+        'highest_inline': ", ".join(profile['highest']),
+        'high_inline': ", ".join(profile['high']),
+        'ignore_inline': profile['ignore_short'],
+    }
+
+def describe_profile(profile: dict) -> str:
+    """Profil als Textblock für die Bewertung im Mehrprofil-Modus"""
+    return (f"PROFIL {profile['id']} ({profile['name']}):\n"
+            f"- Regionen: {', '.join(profile['regions'])}\n"
+            f"- HÖCHSTE Priorität: {'; '.join(profile['highest'])}\n"
+            f"- HOHE Priorität: {'; '.join(profile['high'])}\n"
+            f"- IGNORIEREN: {'; '.join(profile['ignore'])}")
+
+def get_model_config() -> dict:
+    """Modelle und Kaskaden-Einstellungen aus der Konfiguration"""
+    return {
+        'full_model': get_config("GEMINI_MODEL", DEFAULT_FULL_MODEL),
+        'triage_model': get_config("CASCADE_TRIAGE_MODEL", DEFAULT_TRIAGE_MODEL),
+        'cascade': get_config("CASCADE_ENABLED", False, bool),
+        # 'local' = nur Stichwörter, 'model' = kleines Modell, 'hybrid' = Stichwörter als Vorfilter
+        'triage_mode': get_config("CASCADE_TRIAGE_MODE", "hybrid"),
+        'local_min_hits': get_config("CASCADE_LOCAL_MIN_HITS", 1, int),
+        # Anteil verworfener Seiten, die zur Kontrolle trotzdem voll analysiert werden
+        'audit_rate': get_config("CASCADE_AUDIT_RATE", 0.1, float),
+        'triage_page_chars': get_config("CASCADE_TRIAGE_PAGE_CHARS", 1500, int),
+        'triage_batch_pages': get_config("CASCADE_TRIAGE_BATCH_PAGES", 12, int),
+        # Bereits gesehene Seiten (Mantel, Nachdrucke) aus dem Seiten-Cache übernehmen
+        # Aus, bis der Seiten-Cache-Pfad auch 'complete'-Prompt und Kaskaden-Stichprobe abdeckt
+        'page_cache': get_config("PAGE_CACHE_ENABLED", False, bool),
+        # Alle Interessenprofile in einem Durchgang (eine Erfassung, eine Bewertung je Block)
+        'multi_profile': get_config("MULTI_PROFILE_ENABLED", False, bool),
+    }
+
+def get_llm_backend() -> str:
+    """Aktives LLM-Backend: gemini, fake, record oder replay"""
+    return get_config("LLM_BACKEND", "gemini")
+
+def create_model(model_name: str, api_key: str):
+    """Modell für eine Stufe über das konfigurierte Backend erzeugen"""
+    backend = get_llm_backend()
+    
+    if backend == 'fake':
+        return create_fake_model(model_name)
+    if backend == 'replay':
+        return ReplayModel(model_name, inner=None)
+    
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel(model_name)
+    if backend == 'record':
+        return ReplayModel(model_name, inner=model)
+    return model
+
+def create_fake_model(model_name: str):
+    """Lokaler Gemini-Ersatz (fake_llm.py) - erst bei Bedarf importiert"""
+    from fake_llm import FakeModel
+    return FakeModel(
+        model_name,
+        keywords=get_active_profile()['keywords'],
+        latency=get_config("LLM_FAKE_LATENCY", 0.0, float),
+        seconds_per_1k_tokens=get_config("LLM_FAKE_SECONDS_PER_1K_TOKENS", 0.0, float),
+    )
+
+def get_gemini_api_key() -> str:
+    """API-Key aus der Konfiguration - Offline-Backends brauchen keinen"""
+    if get_llm_backend() in ('fake', 'replay'):
+        return 'offline'
+    return get_config("GEMINI_API_KEY", "")
+
+class ReplayMissError(RuntimeError):
+    """Für diesen Prompt gibt es keine Aufzeichnung"""
+
+class ReplayModel:
+    """Record/Replay: Antworten nach Prompt-Hash auf der Platte - inner=None heißt nur abspielen"""
+    
+    def __init__(self, model_name: str, inner=None):
+        self.model_name = model_name
+        self.inner = inner
+        self.folder = get_config("LLM_REPLAY_DIR") or get_local_cache_dir('llm_replay')
+        os.makedirs(self.folder, exist_ok=True)
+    
+    def path_for(self, prompt: str) -> str:
+        key = hashlib.sha256(f"{self.model_name}\n{prompt}".encode()).hexdigest()
+        return os.path.join(self.folder, f"{key}.json")
+    
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        from fake_llm import FakeResponse
+        path = self.path_for(prompt)
+        
+        if os.path.exists(path):
+            with open(path) as f:
+                stored = json.load(f)
+            return FakeResponse(stored['text'], stored['prompt_tokens'], stored['output_tokens'], stream)
+        
+        if self.inner is None:
+            if get_config("LLM_REPLAY_FALLBACK", "error") == 'fake':
+                return create_fake_model(self.model_name).generate_content(prompt, stream=stream)
+            raise ReplayMissError(f"Keine Aufzeichnung für {self.model_name} ({os.path.basename(path)[:12]}...)")
+        
+        # Aufnehmen: immer vollständig abrufen, damit die Antwort komplett gespeichert wird
+        response = self.inner.generate_content(prompt)
+        metadata = getattr(response, 'usage_metadata', None)
+        stored = {
+            'model': self.model_name,
+            'text': response.text,
+            'prompt_tokens': getattr(metadata, 'prompt_token_count', None) or estimate_tokens(prompt),
+            'output_tokens': getattr(metadata, 'candidates_token_count', None) or estimate_tokens(response.text),
+            'recorded_at': datetime.now().isoformat(),
+        }
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(stored, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        
+        return FakeResponse(stored['text'], stored['prompt_tokens'], stored['output_tokens'], stream)
+
+def estimate_tokens(text: str) -> int:
+    """Grobe Token-Schätzung (~4 Zeichen pro Token)"""
+    return max(1, len(text) // 4)
+
+# Prompt-Vorlagen: statische Anweisungen (cachebar) getrennt vom Text pro Aufruf
+PROMPT_TEMPLATES = {
+    'complete': {
+        'instructions': """
+AUFTRAG: Analysiere diesen Zeitungstext und finde NUR LOKALE/REGIONALE Artikel für {audience}. Bitte beachte das die erste Seite immer die Titelseite ist, daher themen nicht doppelt aufnehmen!
+
+WICHTIG: 
+- NUR Artikel mit Bezug zu {regions_upper}
+- IGNORIERE Bundespolitik, internationale Themen, andere Bundesländer
+- Zeige NUR Artikel mit HÖCHSTER oder HOHER Priorität
+- Extrahiere IMMER die Seitenzahl aus [SEITE X] Markierungen
+
+HÖCHSTE PRIORITÄT (🔥) - NUR LOKAL/REGIONAL:
+{highest_list}
+
+HOHE PRIORITÄT (⚡) - NUR LOKAL/REGIONAL:
+{high_list}
+
+IGNORIERE KOMPLETT:
+{ignore_list}
+
+FORMAT FÜR JEDEN ARTIKEL:
+### [EMOJI] Überschrift des Artikels
+**Seite:** [Nummer]
+**Kernaussage:** [1-2 Sätze - Was ist die wichtigste Information?]
+**{relevance_label}:** [1 Satz - Warum ist das für {audience} wichtig?]
+
+---
+
+GEBE NUR LOKALE/REGIONALE ARTIKEL AUS!
+""",
+        'body': "TEXT:\n{text}",
+    },
+    'chunk': {
+        'instructions': """
+AUFTRAG: Extrahiere NUR LOKALE/REGIONALE Artikel aus diesem Zeitungstext-Teil für {audience}.
+
+WICHTIG: 
+- NUR Artikel über {regions_upper}
+- KEINE Bundespolitik oder internationale Themen
+- Nur HÖCHSTE und HOHE Priorität
+- Seitenzahlen aus [SEITE X] extrahieren
+
+HÖCHSTE PRIORITÄT: {highest_inline}
+HOHE PRIORITÄT: {high_inline}
+
+IGNORIERE: {ignore_inline}
+
+FORMAT PRO ARTIKEL:
+TITEL: [Überschrift]
+SEITE: [Nummer]
+KATEGORIE: [Höchste/Hohe Priorität]
+INHALT: [Kernaussage in 1-2 Sätzen]
+RELEVANZ: [{relevance_label} in 1 Satz]
+===
+""",
+        'body': "TEXT TEIL {part}:\n{text}",
+    },
+    # Mehrprofil-Modus, Schritt 1: Artikel neutral erfassen (Regionen aller Profile)
+    'extract': {
+        'instructions': """
+AUFTRAG: Erfasse ALLE redaktionellen Artikel mit Bezug zu {regions_upper} aus diesem Zeitungstext-Teil.
+Noch NICHT nach Interessen filtern oder bewerten - die Bewertung für die einzelnen Gruppen folgt getrennt.
+
+IGNORIERE: Anzeigen, Traueranzeigen, Wetter, Veranstaltungskalender, reine Sportergebnisse
+Seitenzahlen aus [SEITE X] extrahieren
+
+FORMAT PRO ARTIKEL:
+TITEL: [Überschrift]
+SEITE: [Nummer]
+ORT: [Stadt/Region, um die es geht]
+THEMEN: [2-4 Stichwörter]
+INHALT: [Kernaussage in 1-2 Sätzen]
+===
+""",
+        'body': "TEXT TEIL {part}:\n{text}",
+    },
+    # Mehrprofil-Modus, Schritt 2: erfasste Artikel gegen alle Profile bewerten
+    'score': {
+        'instructions': """
+AUFTRAG: Bewerte jeden Artikel für jedes Interessenprofil.
+Ein Artikel passt nur, wenn er eine Region des Profils betrifft und zu dessen Themen gehört.
+Themen unter IGNORIEREN passen nie.
+
+Antworte NUR mit einer Zeile pro Artikel und Profil:
+ARTIKEL <Nummer> | <Profil-ID>: HÖCHSTE, HOHE oder KEINE | <1 Satz, warum das für die Gruppe wichtig ist>
+""",
+        'body': "PROFILE:\n{profiles}\n\nARTIKEL:\n{articles}",
+    },
+    # Wochenüberblick: nur die kompakten Zusammenfassungen bereits gespeicherter Analysen
+    'digest': {
+        'instructions': """
+AUFTRAG: Erstelle aus den Zusammenfassungen lokaler/regionaler Zeitungsartikel einen WOCHENÜBERBLICK für {audience}.
+Jede GESCHICHTE fasst bereits alle Ausgaben zusammen, die darüber berichtet haben - (Nx, Tage) zeigt wie oft und wann.
+
+WICHTIG:
+- NUR die gelieferten Informationen verwenden, nichts hinzuerfinden
+- Themen mit HÖCHSTER Priorität und Geschichten über mehrere Tage zuerst
+- Zusammengehörige Geschichten zu einem Thema bündeln
+- Seitenzahlen und Ausgaben weglassen
+
+FORMAT:
+## 🗓️ Die Woche in Kürze
+[3-5 Sätze]
+
+## 🔥 Top-Themen
+### [Thema]
+**Verlauf:** [Was ist im Laufe der Woche passiert?]
+**{relevance_label}:** [1 Satz]
+
+## ⚡ Weitere Themen
+- **[Thema]:** [1 Satz]
+""",
+        'body': "ZEITRAUM {period}:\n{stories}",
+    },
+    'triage': {
+        'instructions': """
+Prüfe für jede Seite, ob sie mindestens einen Artikel mit Bezug zu {regions_upper}
+und politischer Relevanz (Kommunalpolitik, Landespolitik, Wirtschaft, Bildung, Verkehr, Digitales) enthält.
+Sport, Kultur, Unfälle und Bundespolitik zählen NICHT.
+
+Antworte NUR mit einer Zeile pro Seite: SEITE <Nummer>: JA oder SEITE <Nummer>: NEIN
+""",
+        'body': "{pages}",
+    },
+}
+
+def render_prompt(template_name: str, **values) -> str:
+    """Nur den variablen Teil einer Prompt-Vorlage füllen"""
+    return PROMPT_TEMPLATES[template_name]['body'].format(**values)
+
+def template_instructions(template_name: str, profile: dict = None) -> str:
+    """Anweisungsteil einer Vorlage, gefüllt aus einem Profil (Standard: aktives Profil)"""
+    values = profile_prompt_values(profile or get_active_profile())
+    return PROMPT_TEMPLATES[template_name]['instructions'].format(**values)
+
+def prompt_overhead_tokens(template_name: str) -> int:
+    """Token-Schätzung für den statischen Anweisungsteil einer Vorlage"""
+    return estimate_tokens(template_instructions(template_name))
+
+class PromptModel:
+    """Modell mit fest hinterlegten Anweisungen - pro Aufruf wird nur der variable Teil gesendet"""
+    
+    def __init__(self, model, instructions: str, context: dict = None):
+        self.model = model
+        self.model_name = getattr(model, 'model_name', 'unbekannt')
+        self.instructions = instructions
+        # context ist der Registry-Eintrag; None = kein Caching
+        self.context = context
+    
+    def generate_content(self, prompt: str, **kwargs):
+        if self.context is not None:
+            self.context['hits'] += 1
+        if self.context is not None and self.context['kind'] == 'gemini':
+            # Anweisungen liegen im gecachten Kontext beim API-Server
+            return self.model.generate_content(prompt, **kwargs)
+        # Lokaler Ersatz / kein Caching: Anweisungen voranstellen
+        return self.model.generate_content(f"{self.instructions}\n{prompt}", **kwargs)
+
+@st.cache_resource
+def get_context_cache_registry() -> dict:
+    """Prozessweite Registry der gecachten Anweisungs-Kontexte (über Sessions & Ausgaben hinweg)"""
+    return {'lock': threading.Lock(), 'entries': {}}
+
+def get_cached_context(template_name: str, model_name: str, api_key: str, instructions: str) -> dict:
+    """Gecachten Kontext für eine Vorlage (je Profil eigene Anweisungen) holen oder anlegen"""
+    instructions_hash = hashlib.sha256(instructions.encode()).hexdigest()[:16]
+    # Gecachte Kontexte gehören zum Projekt des API-Schlüssels - nie schlüsselübergreifend teilen
+    key_fingerprint = hashlib.sha256((api_key or "").encode()).hexdigest()[:12]
+    key = (model_name, template_name, instructions_hash, key_fingerprint)
+    ttl = get_config("CONTEXT_CACHE_TTL", 3600, int)
+    mode = get_config("CONTEXT_CACHE_MODE", "gemini")
+    # Gemini cacht erst ab einer Mindestgröße (Gemini 1.5: 32.768 Tokens)
+    min_tokens = get_config("CONTEXT_CACHE_MIN_TOKENS", 32768, int)
+    
+    registry = get_context_cache_registry()
+    with registry['lock']:
+        entry = registry['entries'].get(key)
+        # Kurz vor Ablauf neu anlegen, damit laufende Batches nicht ins Leere greifen
+        if entry and entry['expires_at'] > time.time() + 60:
+            return entry
+        
+        entry = {
+            'kind': 'local',
+            'template': template_name,
+            'model': model_name,
+            'content': None,
+            'tokens': estimate_tokens(instructions),
+            'hits': 0,
+            'expires_at': time.time() + ttl,
+        }
+        
+        # Nur das echte Gemini-Backend kennt gecachte Kontexte; Record/Replay braucht den
+        # kompletten Prompt im Hash, damit geänderte Anweisungen neu aufgenommen werden
+        if mode == 'gemini' and get_llm_backend() == 'gemini' and entry['tokens'] < min_tokens:
+            entry['error'] = f"inaktiv: {entry['tokens']} < {min_tokens} Tokens (CONTEXT_CACHE_MIN_TOKENS)"
+        elif mode == 'gemini' and get_llm_backend() == 'gemini':
+            try:
+                genai.configure(api_key=api_key)
+                entry['content'] = genai.caching.CachedContent.create(
+                    model=model_name,
+                    display_name=f"jl-{template_name}-{instructions_hash}",
+                    system_instruction=instructions,
+                    ttl=timedelta(seconds=ttl),
+                )
+                entry['kind'] = 'gemini'
+            except Exception as e:
+                # z.B. Modell ohne Caching
+                entry['error'] = str(e)
+        
+        registry['entries'][key] = entry
+        return entry
+
+def create_prompt_model(template_name: str, model_name: str, api_key: str, profile: dict = None,
+                        instructions: str = None) -> PromptModel:
+    """Modell für eine Prompt-Vorlage - mit gecachtem Anweisungsteil, wenn möglich (instructions: eigene Variante)"""
+    instructions = instructions or template_instructions(template_name, profile)
+    
+    if get_config("CONTEXT_CACHE_MODE", "gemini") == 'off':
+        return PromptModel(create_model(model_name, api_key), instructions)
+    
+    context = get_cached_context(template_name, model_name, api_key, instructions)
+    if context['kind'] == 'gemini':
+        genai.configure(api_key=api_key)
+        return PromptModel(genai.GenerativeModel.from_cached_content(context['content']), instructions, context)
+    return PromptModel(create_model(model_name, api_key), instructions, context)
+
+def record_usage(response, prompt: str, response_text: str, usage: dict = None):
+    """Token-Verbrauch einer Antwort in usage aufsummieren"""
+    if usage is None:
+        return
+
+    metadata = getattr(response, 'usage_metadata', None)
+    prompt_tokens = getattr(metadata, 'prompt_token_count', None)
+    output_tokens = getattr(metadata, 'candidates_token_count', None)
+    usage['prompt_tokens'] = usage.get('prompt_tokens', 0) + (prompt_tokens or estimate_tokens(prompt))
+    usage['output_tokens'] = usage.get('output_tokens', 0) + (output_tokens or estimate_tokens(response_text))
+    usage['cached_tokens'] = usage.get('cached_tokens', 0) + (getattr(metadata, 'cached_content_token_count', None) or 0)
+    usage['calls'] = usage.get('calls', 0) + 1
+
+def generate(model, prompt: str, usage: dict = None):
+    """Modell aufrufen (mit Retry bei Überlast) und Token-Verbrauch in usage aufsummieren"""
+    max_retries = get_config("GEMINI_MAX_RETRIES", 2, int)
+    start = time.perf_counter()
+    
+    for attempt in range(max_retries + 1):
+        try:
+            response = model.generate_content(prompt)
+            break
+        except Exception as e:
+            # Nur vorübergehende Fehler (Rate Limit, Überlast, Timeout) wiederholen
+            if attempt >= max_retries or not is_transient_error(e):
+                raise
+            time.sleep(2 ** attempt)
+    
+    call_usage = {}
+    record_usage(response, prompt, response.text, call_usage)
+    merge_usage(usage, call_usage)
+    record_llm_call(
+        getattr(model, 'model_name', 'unbekannt'), time.perf_counter() - start,
+        call_usage['prompt_tokens'], call_usage['output_tokens'], call_usage['cached_tokens'],
+        retries=attempt
+    )
+    return response
+
+def is_transient_error(error: Exception) -> bool:
+    """Fehler, bei denen sich ein erneuter Versuch lohnt"""
+    name = type(error).__name__
+    return name in ('ResourceExhausted', 'ServiceUnavailable', 'DeadlineExceeded', 'InternalServerError',
+                    'TooManyRequests', 'Timeout', 'ConnectionError')
+
+def merge_usage(usage: dict, call_usage: dict):
+    """Token-Verbrauch eines Aufrufs in eine Summe übernehmen"""
+    if usage is None:
+        return
+    for key, value in call_usage.items():
+        usage[key] = usage.get(key, 0) + value
+
+def generate_stream(model, prompt: str, usage: dict = None):
+    """Modell im Streaming-Modus aufrufen und Textstücke liefern, sobald sie ankommen"""
+    start = time.perf_counter()
+    response = model.generate_content(prompt, stream=True)
+    received = []
+
+    for chunk in response:
+        try:
+            piece = chunk.text
+        except ValueError:
+            # Teilantwort ohne Text (z.B. nur Metadaten)
+            piece = ""
+        received.append(piece)
+        yield piece
+
+    call_usage = {}
+    record_usage(response, prompt, "".join(received), call_usage)
+    merge_usage(usage, call_usage)
+    record_llm_call(
+        getattr(model, 'model_name', 'unbekannt'), time.perf_counter() - start,
+        call_usage['prompt_tokens'], call_usage['output_tokens'], call_usage['cached_tokens'],
+        stream=True
+    )
+
+# Trennzeilen zwischen Artikelblöcken in den beiden Antwortformaten
+BLOCK_SEPARATORS = {
+    'complete': r'\n[ \t]*-{3,}[ \t]*\n',
+    'chunk': r'\n[ \t]*={3,}[ \t]*\n',
+}
+
+def pop_completed_blocks(buffer: str, separator: str) -> tuple:
+    """Abgeschlossene Artikelblöcke aus dem Stream-Puffer lösen - der Rest bleibt im Puffer"""
+    parts = re.split(separator, buffer)
+    completed = [part.strip() for part in parts[:-1] if part.strip()]
+    return completed, parts[-1]
+
+def split_pages(text: str) -> list:
+    """Zerlege extrahierten Text anhand der [SEITE n] Markierungen"""
+    markers = list(re.finditer(r'\[SEITE (\d+)\]', text))
+    if not markers:
+        return [(1, text.strip())] if text.strip() else []
+
+    pages = []
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+        pages.append((int(marker.group(1)), text[marker.end():end].strip()))
+    return pages
+
+def join_pages(pages: list) -> str:
+    """Setze Seiten wieder mit [SEITE n] Markierungen zusammen"""
+    return "".join(f"\n[SEITE {page_num}]\n{page_text}\n" for page_num, page_text in pages)
+
+def local_relevance_hits(page_text: str, keywords: list = None) -> int:
+    """Lokaler Klassifikator: Anzahl regionaler Stichwörter auf der Seite (Standard: aktives Profil)"""
+    lowered = page_text.lower()
+    return sum(lowered.count(keyword) for keyword in (keywords or get_active_profile()['keywords']))
+
+def triage_pages_with_model(pages: list, model, config: dict, usage: dict) -> set:
+    """Günstige Ja/Nein-Relevanzprüfung pro Seite mit dem Triage-Modell"""
+    relevant = set()
+    batch_size = max(1, config['triage_batch_pages'])
+
+    for start in range(0, len(pages), batch_size):
+        batch = pages[start:start + batch_size]
+        page_block = "".join(
+            f"\n[SEITE {page_num}]\n{page_text[:config['triage_page_chars']]}\n"
+            for page_num, page_text in batch
+        )
+        prompt = render_prompt('triage', pages=page_block)
+
+        try:
+            response = generate(model, prompt, usage)
+            answers = dict(
+                (int(num), verdict.upper())
+                for num, verdict in re.findall(r'SEITE\s*(\d+)\s*:\s*(JA|NEIN)', response.text, re.IGNORECASE)
+            )
+        except Exception as e:
+            ui().warning(f"⚠️ Triage fehlgeschlagen, Seiten werden voll analysiert: {e}")
+            answers = {}
+
+        for page_num, _ in batch:
+            # Keine eindeutige Antwort -> sicherheitshalber voll analysieren
+            if answers.get(page_num, 'JA') == 'JA':
+                relevant.add(page_num)
+
+    return relevant
+
+def triage_pages(pages: list, api_key: str, config: dict, usage: dict) -> set:
+    """Bestimme die Seiten, die die volle Analyse bekommen"""
+    mode = config['triage_mode']
+
+    if mode == 'local':
+        return {n for n, t in pages if local_relevance_hits(t) >= config['local_min_hits']}
+
+    candidates = pages
+    if mode == 'hybrid':
+        # Seiten ganz ohne regionale Stichwörter gar nicht erst ans Modell schicken
+        candidates = [(n, t) for n, t in pages if local_relevance_hits(t) > 0]
+
+    if not candidates:
+        return set()
+
+    triage_model = create_prompt_model('triage', config['triage_model'], api_key)
+    return triage_pages_with_model(candidates, triage_model, config, usage)
+
+# Seiten-Cache: identische oder fast identische Seiten (Mantel, Regionalausgaben, Nachdrucke) nur einmal analysieren
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+SHINGLE_WORDS = 5
+MIN_SHINGLE_PAGE_WORDS = 30
+_MERSENNE_PRIME = (1 << 61) - 1
+_MINHASH_SEEDS = [
+    (random.Random(seed).randrange(1, _MERSENNE_PRIME), random.Random(seed + 1000).randrange(0, _MERSENNE_PRIME))
+    for seed in range(MINHASH_PERMUTATIONS)
+]
+
+def normalize_page_text(page_text: str) -> str:
+    """Kleinbuchstaben, nur Wörter - Satzzeichen, Trennungen und Umbrüche spielen keine Rolle"""
+    return " ".join(re.findall(r"\w+", page_text.lower()))
+
+def page_minhash(normalized: str) -> list:
+    """MinHash-Signatur über Wort-Shingles (leer bei zu kurzen Seiten)"""
+    words = normalized.split()
+    if len(words) < MIN_SHINGLE_PAGE_WORDS:
+        return []
+    shingles = {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_WORDS]).encode(), digest_size=8).digest(), 'big')
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+    return [min((a * value + b) % _MERSENNE_PRIME for value in shingles) for a, b in _MINHASH_SEEDS]
+
+def minhash_bands(signature: list) -> list:
+    """LSH-Bänder: ähnliche Seiten teilen mit hoher Wahrscheinlichkeit mindestens ein Band"""
+    if not signature:
+        return []
+    rows = len(signature) // MINHASH_BANDS
+    return [
+        f"{band}:{hashlib.md5(str(signature[band * rows:(band + 1) * rows]).encode()).hexdigest()[:12]}"
+        for band in range(MINHASH_BANDS)
+    ]
+
+def minhash_similarity(first: list, second: list) -> float:
+    """Geschätzte Jaccard-Ähnlichkeit zweier Signaturen"""
+    if not first or not second or len(first) != len(second):
+        return 0.0
+    return sum(1 for a, b in zip(first, second) if a == b) / len(first)
+
+def page_fingerprint(page_text: str) -> dict:
+    """Exakter Hash + MinHash für eine Seite"""
+    normalized = normalize_page_text(page_text)
+    signature = page_minhash(normalized)
+    return {
+        'fingerprint': hashlib.sha256(normalized.encode()).hexdigest(),
+        'minhash': signature,
+        'bands': minhash_bands(signature),
+    }
+
+def page_cache_version(model_name: str) -> str:
+    """Ergebnisse gelten nur für dasselbe Modell und denselben Prompt"""
+    return hashlib.sha256(f"{model_name}\n{template_instructions('chunk')}".encode()).hexdigest()[:12]
+
+def triage_cache_source(config: dict) -> str:
+    """Triage-Verwerfungen gelten nur für dieselbe Triage-Konfiguration"""
+    settings = [config['triage_mode'], config['triage_model'], config['local_min_hits'],
+                config['triage_page_chars'], template_instructions('triage')]
+    return "triage:" + hashlib.sha256("\n".join(map(str, settings)).encode()).hexdigest()[:12]
+
+def page_cache_path() -> str:
+    return os.path.join(get_local_cache_dir('index'), 'page_cache.json')
+
+def load_local_page_cache() -> dict:
+    if not os.path.exists(page_cache_path()):
+        return {}
+    with open(page_cache_path(), encoding='utf-8') as f:
+        return json.load(f)
+
+def find_cached_pages(fingerprints: list, version: str, sources: set = None) -> dict:
+    """Treffer pro Seiten-Fingerprint: exakt, sonst ähnlichste Seite über LSH-Bänder (nur Einträge aus `sources`)"""
+    if get_config("PAGE_CACHE_STORE", "supabase") == 'local':
+        candidates = [entry for entry in load_local_page_cache().values() if entry['prompt_version'] == version]
+    else:
+        supabase = init_supabase()
+        candidates = supabase.table('jl_page_cache').select("*").eq('prompt_version', version).in_(
+            'fingerprint', [fp['fingerprint'] for fp in fingerprints]
+        ).execute().data or []
+        bands = sorted({band for fp in fingerprints for band in fp['bands']})
+        if bands:
+            candidates += supabase.table('jl_page_cache').select("*").eq('prompt_version', version).ov(
+                'bands', bands
+            ).execute().data or []
+    candidates = [entry for entry in candidates if entry.get('source', 'full') in (sources or {'full'})]
+    
+    exact = {entry['fingerprint']: entry for entry in candidates}
+    threshold = get_config("PAGE_CACHE_SIMILARITY", 0.85, float)
+    hits = {}
+    for fp in fingerprints:
+        if fp['fingerprint'] in exact:
+            hits[fp['fingerprint']] = (exact[fp['fingerprint']], 1.0)
+            continue
+        best, best_score = None, 0.0
+        for entry in candidates:
+            if set(fp['bands']) & set(entry.get('bands') or []):
+                score = minhash_similarity(fp['minhash'], entry.get('minhash') or [])
+                if score > best_score:
+                    best, best_score = entry, score
+        if best is not None and best_score >= threshold:
+            hits[fp['fingerprint']] = (best, best_score)
+    return hits
+
+def store_cached_pages(entries: list):
+    """Ergebnisse neu analysierter Seiten ablegen"""
+    if not entries:
+        return
+    if get_config("PAGE_CACHE_STORE", "supabase") == 'local':
+        cache = load_local_page_cache()
+        for entry in entries:
+            cache[f"{entry['prompt_version']}:{entry['fingerprint']}"] = entry
+        with open(page_cache_path(), 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        return
+    init_supabase().table('jl_page_cache').upsert(entries, on_conflict='fingerprint,prompt_version').execute()
+
+def article_page_number(article: dict):
+    """Erste Seitenzahl aus dem SEITE-Feld eines Artikels"""
+    match = re.search(r"\d+", str(article.get('seite', '')))
+    return int(match.group()) if match else None
+
+def analyze_with_page_cache(text: str, api_key: str, config: dict, cascade: bool, stream: bool = False) -> str:
+    """Bekannte Seiten aus dem Cache übernehmen, nur neue Seiten ans Modell schicken"""
+    version = page_cache_version(config['full_model'])
+    # Von der Triage verworfene Seiten nur übernehmen, wenn dieselbe Triage wieder läuft
+    triage_source = triage_cache_source(config)
+    sources = {'full', triage_source} if cascade else {'full'}
+    
+    with perf_span('page_cache_lookup') as span:
+        pages = split_pages(text)
+        fingerprints = {n: page_fingerprint(t) for n, t in pages}
+        try:
+            hits = find_cached_pages(list(fingerprints.values()), version, sources)
+        except Exception as e:
+            ui().caption(f"ℹ️ Seiten-Cache nicht verfügbar: {e}")
+            hits = {}
+        span['pages'] = len(pages)
+        span['reused'] = sum(1 for n, _ in pages if fingerprints[n]['fingerprint'] in hits)
+    
+    reused_articles = []
+    novel = []
+    for n, t in pages:
+        hit = hits.get(fingerprints[n]['fingerprint'])
+        if hit:
+            for article in hit[0]['articles']:
+                reused_articles.append({**article, 'seite': str(n)})
+        else:
+            novel.append((n, t))
+    
+    ratio = (len(pages) - len(novel)) / len(pages) if pages else 0.0
+    ui().info(f"♻️ Seiten-Cache: {len(pages) - len(novel)} von {len(pages)} Seiten wiederverwendet ({ratio:.0%})")
+    if stream and reused_articles:
+        live = ui().container()
+        for article in reused_articles:
+            live.markdown(format_article(article, priority_emoji(article)))
+    
+    new_articles = []
+    analyzed = novel
+    usage = {}
+    if novel and cascade:
+        with ui().spinner("🔎 Triage: Suche relevante Seiten..."), perf_span('triage', pages=len(novel)):
+            relevant = triage_pages(novel, api_key, config, usage)
+        analyzed = [(n, t) for n, t in novel if n in relevant]
+        ui().info(f"🔎 Triage: {len(analyzed)} von {len(novel)} neuen Seiten werden voll analysiert")
+    
+    failed_chunks = []
+    if analyzed:
+        model = create_prompt_model('chunk', config['full_model'], api_key)
+        new_articles = collect_chunk_articles(join_pages(analyzed), model, 50000, usage, stream, failed_chunks)
+    
+    # Seiten aus fehlgeschlagenen Teilen nie als "nichts Relevantes" merken
+    failed_pages = {int(num) for chunk in failed_chunks for num in re.findall(r'\[SEITE (\d+)\]', chunk)}
+    if any(not re.search(r'\[SEITE \d+\]', chunk) for chunk in failed_chunks):
+        # Teil ohne Seitenmarkierung (Fortsetzung einer langen Seite) - Zuordnung unklar
+        failed_pages = {n for n, _ in analyzed}
+    
+    # Ergebnisse pro Seite merken - Seiten ohne Treffer als "nichts Relevantes"
+    by_page = {n: [] for n, _ in novel}
+    unassigned = False
+    for article in new_articles:
+        page_num = article_page_number(article)
+        if page_num in by_page:
+            by_page[page_num].append({key: value for key, value in article.items() if key != 'seite'})
+        else:
+            unassigned = True
+    
+    now = datetime.now().astimezone().isoformat()
+    entries = [
+        {
+            'fingerprint': fingerprints[n]['fingerprint'],
+            'prompt_version': version,
+            'minhash': fingerprints[n]['minhash'],
+            'bands': fingerprints[n]['bands'],
+            'articles': by_page[n],
+            'source': triage_source if (n, t) not in analyzed else 'full',
+            'page_chars': len(t),
+            'created_at': now,
+        }
+        for n, t in novel
+        # Nicht zuordenbare Artikel: leere Seiten lieber nicht als "nichts Relevantes" merken
+        if (by_page[n] or not unassigned) and n not in failed_pages
+    ]
+    try:
+        with perf_span('page_cache_store', rows=len(entries)):
+            store_cached_pages(entries)
+    except Exception as e:
+        ui().caption(f"ℹ️ Seiten-Cache nicht gespeichert: {e}")
+    
+    record_session_metric('page_cache_metrics', {
+        'timestamp': datetime.now().isoformat(),
+        'pages_total': len(pages),
+        'pages_reused': len(pages) - len(novel),
+        'reuse_ratio': round(ratio, 3),
+        'articles_reused': len(reused_articles),
+        'articles_new': len(new_articles),
+        'prompt_tokens': usage.get('prompt_tokens', 0),
+    })
+    
+    # Fehlende Teile (Quota, Schlüssel) sind kein "nichts gefunden" - sonst würde die Ausgabe als erledigt gespeichert
+    if failed_chunks:
+        raise RuntimeError(f"{len(failed_chunks)} Teil(e) nicht analysiert - Ergebnis unvollständig")
+    
+    articles = sorted(reused_articles + new_articles, key=lambda a: article_page_number(a) or 0)
+    return create_final_summary(articles)
+
+ANALYSIS_ERROR_PREFIX = "❌ **Analyse-Fehler:**"
+
+def analyze_with_gemini(text: str, api_key: str, cascade: bool = None, stream: bool = False,
+                        page_cache: bool = None) -> str:
+    """Text mit Google Gemini analysieren - mit Chunking für lange Texte"""
+    try:
+        config = get_model_config()
+
+        if cascade is None:
+            cascade = config['cascade']
+        if page_cache is None:
+            page_cache = config['page_cache']
+        if page_cache:
+            return analyze_with_page_cache(text, api_key, config, cascade, stream)
+        if cascade:
+            return analyze_cascade(text, api_key, config, stream)
+
+        # Text-Länge prüfen
+        text_length = len(text)
+        ui().info(f"📝 Text-Länge: {text_length} Zeichen")
+
+        return analyze_full(text, config['full_model'], api_key, stream=stream)
+
+    except Exception as e:
+        return f"{ANALYSIS_ERROR_PREFIX} {str(e)}"
+
+def analysis_failed(analysis: str) -> bool:
+    """analyze_with_gemini liefert bei Ausnahmen eine Fehlermeldung statt einer Analyse"""
+    return analysis.startswith(ANALYSIS_ERROR_PREFIX)
+
+def analyze_full(text: str, model_name: str, api_key: str, usage: dict = None, stream: bool = False) -> str:
+    """Volle Analyse - normal oder in Chunks je nach Textlänge"""
+    # Gemini 1.5 Flash kann ~1M Tokens = ~4M Zeichen
+    # Aber für Sicherheit chunken wir bei 50k Zeichen
+    max_chunk_size = 50000
+
+    if len(text) <= max_chunk_size:
+        # Kurzer Text - normale Analyse
+        ui().info("✅ Text passt in ein Stück - normale Analyse")
+        model = create_prompt_model('complete', model_name, api_key)
+        return analyze_complete_text(text, model, usage, stream)
+    else:
+        # Langer Text - in Chunks aufteilen
+        ui().warning(f"⚠️ Text zu lang ({len(text)} Zeichen) - wird in Teile aufgeteilt")
+        model = create_prompt_model('chunk', model_name, api_key)
+        return analyze_chunked_text(text, model, max_chunk_size, usage, stream)
+
+def analyze_cascade(text: str, api_key: str, config: dict, stream: bool = False) -> str:
+    """Zweistufige Analyse: günstige Triage, volle Analyse nur für Kandidaten-Seiten"""
+    with perf_span('chunk_planning'):
+        pages = split_pages(text)
+    triage_usage = {}
+    full_usage = {}
+
+    with ui().spinner("🔎 Triage: Suche relevante Seiten..."), perf_span('triage', pages=len(pages)):
+        relevant = triage_pages(pages, api_key, config, triage_usage)
+
+    selected = [(n, t) for n, t in pages if n in relevant]
+    rejected = [(n, t) for n, t in pages if n not in relevant]
+    ui().info(f"🔎 Triage: {len(selected)} von {len(pages)} Seiten werden voll analysiert")
 
-def extract_pdf_text(pdf_file) -> str:
-    """PDF-Text extrahieren mit verbesserter Multi-Page Unterstützung"""
-    try:
-        pdf_reader = PdfReader(io.BytesIO(pdf_file.read()))
-        
-        # Debug-Info anzeigen
-        total_pages = len(pdf_reader.pages)
-        st.info(f"📄 PDF hat {total_pages} Seiten")
-        
-        text = ""
-        page_texts = []
-        
-        for page_num, page in enumerate(pdf_reader.pages, 1):
-            page_text = page.extract_text()
-            # Füge Seitenmarkierung hinzu
-            page_texts.append(f"\n[SEITE {page_num}]\n{page_text}")
-            text += f"\n[SEITE {page_num}]\n{page_text}\n"
-        
-        # Gesamt-Info
-        st.success(f"✅ Extrahiert: {len(text)} Zeichen aus {total_pages} Seiten")
-        
-        return text
+    if selected:
+        analysis = analyze_full(join_pages(selected), config['full_model'], api_key, full_usage, stream)
+    else:
+        analysis = create_final_summary([])
+
+    # Stichprobe verworfener Seiten prüfen, um verpasste Artikel abzuschätzen
+    audit_pages = []
+    if rejected and config['audit_rate'] > 0:
+        sample_size = max(1, round(len(rejected) * config['audit_rate']))
+        audit_pages = random.sample(rejected, min(sample_size, len(rejected)))
+
+    missed_articles = []
+    if audit_pages:
+        with ui().spinner(f"🧪 Prüfe Stichprobe von {len(audit_pages)} verworfenen Seiten..."):
+            audit_text = join_pages(sorted(audit_pages))
+            audit_model = create_prompt_model('chunk', config['full_model'], api_key)
+            missed_articles = collect_chunk_articles(audit_text, audit_model, len(audit_text) + 1, full_usage)
+
+    if missed_articles:
+        analysis += "\n## 🧪 NACHTRÄGLICH GEFUNDEN (von der Triage verworfen)\n\n"
+        for article in missed_articles:
+            analysis += format_article(article, priority_emoji(article))
+
+    # Kennzahlen: gesparte Tokens vs. verpasste Artikel
+    baseline_tokens = estimate_tokens(text) + prompt_overhead_tokens('complete')
+    used_tokens = (triage_usage.get('prompt_tokens', 0) + full_usage.get('prompt_tokens', 0))
+    estimated_missed = (len(missed_articles) / len(audit_pages) * len(rejected)) if audit_pages else 0.0
+
+    metrics = {
+        'timestamp': datetime.now().isoformat(),
+        'pages_total': len(pages),
+        'pages_selected': len(selected),
+        'pages_audited': len(audit_pages),
+        'triage_mode': config['triage_mode'],
+        'triage_model': config['triage_model'],
+        'full_model': config['full_model'],
+        'triage_tokens': triage_usage.get('prompt_tokens', 0),
+        'full_tokens': full_usage.get('prompt_tokens', 0),
+        'baseline_tokens': baseline_tokens,
+        'tokens_saved': max(0, baseline_tokens - used_tokens),
+        'missed_in_audit': len(missed_articles),
+        'estimated_missed': round(estimated_missed, 1),
+    }
+    record_session_metric('cascade_metrics', metrics)
+
+    ui().info(
+        f"💰 Kaskade: ~{metrics['tokens_saved']:,} Tokens gespart "
+        f"({used_tokens:,} statt ~{baseline_tokens:,}) · "
+        f"Stichprobe: {len(missed_articles)} verpasste Artikel auf {len(audit_pages)} Seiten "
+        f"(hochgerechnet ~{metrics['estimated_missed']})"
+    )
+
+    return analysis
+
+# Mehrprofil-Modus: eine Erfassung pro Ausgabe, Bewertung für alle Profile im selben Lauf
+PROFILE_SCORE_BATCH = 40
+PROFILE_VERDICTS = {'HÖCHSTE': 'Höchste Priorität', 'HOHE': 'Hohe Priorität'}
+PROFILE_SCORE_PATTERN = re.compile(
+    r'ARTIKEL\s*(\d+)\s*\|\s*(' + PROFILE_ID_PATTERN.pattern + r')\s*:\s*(HÖCHSTE|HOHE|KEINE)[ \t]*(?:\|[ \t]*(.*))?', re.IGNORECASE
+)
+
+def score_articles_for_profiles(records: list, profiles: list, api_key: str, config: dict, usage: dict) -> dict:
+    """{(Artikel-Index, Profil-ID): {'kategorie', 'relevanz'}} - ein Aufruf je Block für alle Profile"""
+    scores = {}
+    if not records:
+        return scores
+    
+    model = create_prompt_model('score', config['full_model'], api_key)
+    profile_block = "\n\n".join(describe_profile(profile) for profile in profiles)
+    known_ids = {profile['id'] for profile in profiles}
+    
+    for start in range(0, len(records), PROFILE_SCORE_BATCH):
+        batch = list(enumerate(records[start:start + PROFILE_SCORE_BATCH], start))
+        article_block = "\n".join(
+            f"ARTIKEL {index + 1}: {record.get('titel', '')} (Seite {record.get('seite', '?')}, "
+            f"Ort: {record.get('ort', 'k.A.')}, Themen: {record.get('themen', 'k.A.')}) - {record.get('inhalt', '')}"
+            for index, record in batch
+        )
+        prompt = render_prompt('score', profiles=profile_block, articles=article_block)
         
-    except Exception as e:
-        st.error(f"PDF-Fehler: {e}")
-        return ""
+        try:
+            response = generate(model, prompt, usage)
+            for num, profile_id, verdict, reason in PROFILE_SCORE_PATTERN.findall(response.text):
+                verdict = verdict.upper()
+                if profile_id in known_ids and verdict in PROFILE_VERDICTS:
+                    scores[(int(num) - 1, profile_id)] = {'kategorie': PROFILE_VERDICTS[verdict],
+                                                          'relevanz': reason.strip()}
+        except Exception as e:
+            # Lieber grob per Stichwort zuordnen als die ganze Ausgabe zu verlieren
+            ui().warning(f"⚠️ Profil-Bewertung fehlgeschlagen, Zuordnung per Stichwort: {e}")
+            for index, record in batch:
+                record_text = f"{record.get('titel', '')} {record.get('ort', '')} {record.get('inhalt', '')}"
+                for profile in profiles:
+                    if local_relevance_hits(record_text, profile['keywords']):
+                        scores[(index, profile['id'])] = {'kategorie': 'Hohe Priorität',
+                                                          'relevanz': 'Automatisch per Stichwort zugeordnet'}
+    return scores
 
-def analyze_with_gemini(text: str, api_key: str) -> str:
-    """Text mit Google Gemini analysieren - mit Chunking für lange Texte"""
+def analyze_profiles(text: str, api_key: str, profiles: list) -> dict:
+    """Artikel einmal erfassen und gegen alle Profile bewerten - {Profil-ID: Analyse}"""
+    config = get_model_config()
+    usage = {}
+    
+    model = create_prompt_model('extract', config['full_model'], api_key, merged_profile(profiles))
+    records = collect_chunk_articles(text, model, 50000, usage)
+    ui().info(f"👥 {len(records)} Artikel erfasst - Bewertung für {len(profiles)} Profile")
+    
+    with ui().spinner("👥 Bewerte Artikel für alle Profile..."), \
+            perf_span('profile_scoring', profiles=len(profiles), articles=len(records)):
+        scores = score_articles_for_profiles(records, profiles, api_key, config, usage)
+    
+    results = {}
+    for profile in profiles:
+        articles = [
+            {**record, **scores[(index, profile['id'])]}
+            for index, record in enumerate(records) if (index, profile['id']) in scores
+        ]
+        results[profile['id']] = create_final_summary(articles, profile)
+    return results
+
+def analyze_issue(text: str, api_key: str, multi_profile: bool = None, **kwargs) -> tuple:
+    """Analyse für das aktive Profil - im Mehrprofil-Modus zusätzlich {Profil-ID: Analyse} aller Profile"""
+    profiles = get_interest_profiles()
+    if multi_profile is None:
+        multi_profile = get_model_config()['multi_profile']
+    if not multi_profile or len(profiles) < 2:
+        return analyze_with_gemini(text, api_key, **kwargs), {}
+    
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        # Text-Länge prüfen
-        text_length = len(text)
-        st.info(f"📝 Text-Länge: {text_length} Zeichen")
-        
-        # Gemini 1.5 Flash kann ~1M Tokens = ~4M Zeichen
-        # Aber für Sicherheit chunken wir bei 50k Zeichen
-        max_chunk_size = 50000
-        
-        if text_length <= max_chunk_size:
-            # Kurzer Text - normale Analyse
-            st.info("✅ Text passt in ein Stück - normale Analyse")
-            return analyze_complete_text(text, model)
-        else:
-            # Langer Text - in Chunks aufteilen
-            st.warning(f"⚠️ Text zu lang ({text_length} Zeichen) - wird in Teile aufgeteilt")
-            return analyze_chunked_text(text, model, max_chunk_size)
-        
+        results = analyze_profiles(text, api_key, profiles)
     except Exception as e:
-        return f"❌ **Analyse-Fehler:** {str(e)}"
+        return f"{ANALYSIS_ERROR_PREFIX} {str(e)}", {}
+    return results[get_active_profile()['id']], results
+
+def build_profile_record(article_hash: str, results: dict) -> dict:
+    """Datensatz für store_profile_analyses: alle Profil-Analysen einer Ausgabe"""
+    return {
+        'article_hash': article_hash,
+        'profiles': [
+            {
+                'profile_id': profile_id,
+                'analysis': analysis,
+                'highest_priority_count': analysis.count('🔥'),
+                'high_priority_count': analysis.count('⚡'),
+            }
+            for profile_id, analysis in results.items()
+        ],
+    }
+
+def profile_analyses_path() -> str:
+    return os.path.join(get_local_cache_dir('index'), 'profile_analyses.json')
+
+def store_profile_analyses(records: list):
+    """Profil-Analysen pro Ausgabe ersetzen (Supabase oder lokaler Ersatz)"""
+    rows = [
+        {'article_hash': record['article_hash'], **entry}
+        for record in records for entry in record['profiles']
+    ]
+    if not rows:
+        return
+    
+    if get_config("PROFILE_STORE", "supabase") == 'local':
+        path = profile_analyses_path()
+        stored = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                stored = json.load(f)
+        for row in rows:
+            stored.setdefault(row['article_hash'], {})[row['profile_id']] = row
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(stored, f, ensure_ascii=False)
+        return
+    
+    init_supabase().table('jl_profile_analyses').upsert(rows, on_conflict='article_hash,profile_id').execute()
+
+def show_profile_results(results: dict):
+    """Ergebnisse aller Profile nebeneinander (ein Tab pro Profil)"""
+    profiles = [profile for profile in get_interest_profiles() if profile['id'] in results]
+    for tab, profile in zip(st.tabs([f"👥 {profile['name']}" for profile in profiles]), profiles):
+        with tab:
+            st.markdown(results[profile['id']])
 
-def analyze_complete_text(text: str, model) -> str:
+def analyze_complete_text(text: str, model, usage: dict = None, stream: bool = False) -> str:
     """Gesamten Text analysieren und formatiert ausgeben"""
-    prompt = f"""
-    AUFTRAG: Analysiere diesen Zeitungstext und finde NUR LOKALE/REGIONALE Artikel für die Jungen Liberalen. Bitte beachte das die erste Seite immer die Titelseite ist, daher themen nicht doppelt aufnehmen!
-    
-    WICHTIG: 
-    - NUR Artikel mit Bezug zu DESSAU-ROßLAU oder SACHSEN-ANHALT
-    - IGNORIERE Bundespolitik, internationale Themen, andere Bundesländer
-    - Zeige NUR Artikel mit HÖCHSTER oder HOHER Priorität
-    - Extrahiere IMMER die Seitenzahl aus [SEITE X] Markierungen
-    
-    HÖCHSTE PRIORITÄT (🔥) - NUR LOKAL/REGIONAL:
-    - Dessau-Roßlauer Stadtrat & Kommunalpolitik
-    - Lokale Wirtschaft & Gewerbeansiedlungen in Dessau-Roßlau
-    - Schulen & Bildung in Dessau-Roßlau und Sachsen-Anhalt
-    - Lokaler Verkehr & Infrastruktur (Straßen, ÖPNV in Dessau) - jedoch nichts mit Verkehrsunfällen 
-    - Landespolitik Sachsen-Anhalt
-    
-    HOHE PRIORITÄT (⚡) - NUR LOKAL/REGIONAL:
-    - Digitalisierung in Dessau-Roßlau
-    - Lokale Umwelt- & Nachhaltigkeitsprojekte
-    - Bürgerbeteiligung in Dessau-Roßlau
-    - Jugendthemen in der Region
-    
-    IGNORIERE KOMPLETT:
-    - Bundespolitik (Bundestag, Bundesregierung, etc.)
-    - Internationale Themen
-    - Andere Städte/Bundesländer (außer Sachsen-Anhalt)
-    - lokaler Sport wie Handball und Fussball, Kultur (außer mit politischer Relevanz)
-    - Alles was keine Politische Relevanz hat - Bewerbungsinformationen oder Diebstahl
-    
-    FORMAT FÜR JEDEN ARTIKEL:
-    ### [EMOJI] Überschrift des Artikels
-    **Seite:** [Nummer]
-    **Kernaussage:** [1-2 Sätze - Was ist die wichtigste Information?]
-    **JuLi-Relevanz:** [1 Satz - Warum sollten JuLis hier aktiv werden?]
-    
-    ---
-    
-    GEBE NUR LOKALE/REGIONALE ARTIKEL AUS!
-    
-    TEXT:
-    {text}
-    """
+    prompt = render_prompt('complete', text=text)
+    
+    if not stream:
+        response = generate(model, prompt, usage)
+        return format_final_output(response.text)
     
-    response = model.generate_content(prompt)
-    return format_final_output(response.text)
+    # Streaming: fertige Artikelblöcke sofort anzeigen
+    live = ui().container()
+    status = ui().empty()
+    received = []
+    buffer = "\n"
+    shown = 0
+    
+    for piece in generate_stream(model, prompt, usage):
+        received.append(piece)
+        buffer += piece
+        completed, buffer = pop_completed_blocks(buffer, BLOCK_SEPARATORS['complete'])
+        for block in completed:
+            live.markdown(block + "\n\n---")
+            shown += 1
+        status.caption(f"📡 Empfange Antwort... {shown} Blöcke angezeigt")
+    
+    if buffer.strip():
+        live.markdown(buffer.strip())
+    status.empty()
+    
+    return format_final_output("".join(received))
 
-def analyze_chunked_text(text: str, model, chunk_size: int) -> str:
+def analyze_chunked_text(text: str, model, chunk_size: int, usage: dict = None, stream: bool = False) -> str:
     """Langen Text in Chunks aufteilen und analysieren"""
+    all_articles = collect_chunk_articles(text, model, chunk_size, usage, stream)
     
-    # Text in Chunks aufteilen
+    # Erstelle finale Ausgabe
+    return create_final_summary(all_articles)
+
+def split_into_chunks(text: str, chunk_size: int) -> list:
+    """Text an Seitenmarkierungen in Chunks von höchstens chunk_size Zeichen teilen"""
     chunks = []
     current_pos = 0
     
@@ -362,50 +3290,50 @@ def analyze_chunked_text(text: str, model, chunk_size: int) -> str:
         
         current_pos = end_pos
     
-    st.info(f"📄 Text aufgeteilt in {len(chunks)} Teile")
+    return chunks
+
+def collect_chunk_articles(text: str, model, chunk_size: int, usage: dict = None, stream: bool = False,
+                           failed: list = None) -> list:
+    """Chunks einzeln analysieren und strukturierte Artikel sammeln (fehlgeschlagene Teile landen in `failed`)"""
+    with perf_span('chunk_planning') as span:
+        chunks = split_into_chunks(text, chunk_size)
+        span['chunks'] = len(chunks)
+    ui().info(f"📄 Text aufgeteilt in {len(chunks)} Teile")
     
     # Sammle alle Artikel aus allen Chunks
     all_articles = []
+    live = ui().container() if stream else None
     
     for i, chunk in enumerate(chunks, 1):
-        with st.spinner(f"🔍 Analysiere Teil {i}/{len(chunks)}..."):
-            
-            chunk_prompt = f"""
-            AUFTRAG: Extrahiere NUR LOKALE/REGIONALE Artikel aus diesem Zeitungstext-Teil für die Jungen Liberalen.
-            
-            WICHTIG: 
-            - NUR Artikel über DESSAU-ROßLAU oder SACHSEN-ANHALT
-            - KEINE Bundespolitik oder internationale Themen
-            - Nur HÖCHSTE und HOHE Priorität
-            - Seitenzahlen aus [SEITE X] extrahieren
-            
-            HÖCHSTE PRIORITÄT: Dessau-Roßlauer Stadtrat, lokale Wirtschaft, Schulen in Dessau, Verkehr in Dessau, Landespolitik Sachsen-Anhalt
-            HOHE PRIORITÄT: Digitalisierung in Dessau, lokale Umweltprojekte, Bürgerbeteiligung Dessau, regionale Jugendthemen
-            
-            IGNORIERE: Bundespolitik, andere Städte/Länder, Sport, Kultur
-            
-            FORMAT PRO ARTIKEL:
-            TITEL: [Überschrift]
-            SEITE: [Nummer]
-            KATEGORIE: [Höchste/Hohe Priorität]
-            INHALT: [Kernaussage in 1-2 Sätzen]
-            RELEVANZ: [JuLi-Relevanz in 1 Satz]
-            ===
+        with ui().spinner(f"🔍 Analysiere Teil {i}/{len(chunks)}..."):
             
-            TEXT TEIL {i}:
-            {chunk}
-            """
+            chunk_prompt = render_prompt('chunk', part=i, text=chunk)
             
             try:
-                response = model.generate_content(chunk_prompt)
-                # Parse die Artikel aus der Antwort
-                articles = parse_articles_from_response(response.text)
-                all_articles.extend(articles)
+                if stream:
+                    # Artikel anzeigen, sobald ihr Block mit === abgeschlossen ist
+                    buffer = "\n"
+                    for piece in generate_stream(model, chunk_prompt, usage):
+                        buffer += piece
+                        completed, buffer = pop_completed_blocks(buffer, BLOCK_SEPARATORS['chunk'])
+                        for article in parse_articles_from_response("===".join(completed)):
+                            live.markdown(format_article(article, priority_emoji(article)))
+                            all_articles.append(article)
+                    # Letzter Block ohne abschließendes ===
+                    for article in parse_articles_from_response(buffer):
+                        live.markdown(format_article(article, priority_emoji(article)))
+                        all_articles.append(article)
+                else:
+                    response = generate(model, chunk_prompt, usage)
+                    # Parse die Artikel aus der Antwort
+                    articles = parse_articles_from_response(response.text)
+                    all_articles.extend(articles)
             except Exception as e:
-                st.error(f"Fehler bei Teil {i}: {e}")
+                ui().error(f"Fehler bei Teil {i}: {e}")
+                if failed is not None:
+                    failed.append(chunk)
     
-    # Erstelle finale Ausgabe
-    return create_final_summary(all_articles)
+    return all_articles
 
 def parse_articles_from_response(response_text: str) -> list:
     """Extrahiere strukturierte Artikel aus der KI-Antwort"""
@@ -432,22 +3360,56 @@ def parse_articles_from_response(response_text: str) -> list:
                 article['inhalt'] = line.replace('INHALT:', '').strip()
             elif line.startswith('RELEVANZ:'):
                 article['relevanz'] = line.replace('RELEVANZ:', '').strip()
+            elif line.startswith('ORT:'):
+                article['ort'] = line.replace('ORT:', '').strip()
+            elif line.startswith('THEMEN:'):
+                article['themen'] = line.replace('THEMEN:', '').strip()
         
         if 'titel' in article:  # Nur hinzufügen wenn Titel vorhanden
             articles.append(article)
     
     return articles
 
-def create_final_summary(articles: list) -> str:
+# Feldzeilen der Markdown-Ausgabe, z.B. "**📄 Seite:** 3" oder "**Kernaussage:** ..."
+ANALYSIS_FIELD_PATTERN = re.compile(r'^\*\*(?:[^\w*]+\s*)?([^*:]+):\*\*\s*(.*)$')
+
+def parse_analysis_articles(analysis_text: str) -> list:
+    """Artikel aus einer gespeicherten Markdown-Analyse (### Emoji Titel, dann Seite/Kernaussage/Relevanz)"""
+    articles = []
+    for block in re.split(r'^###\s+', analysis_text or '', flags=re.MULTILINE)[1:]:
+        lines = block.strip().splitlines()
+        article = {
+            'titel': re.sub(r'^[^\w]+', '', lines[0]).strip(),
+            'kategorie': 'Höchste Priorität' if '🔥' in lines[0] else 'Hohe Priorität',
+        }
+        for line in lines[1:]:
+            match = ANALYSIS_FIELD_PATTERN.match(line.strip())
+            if not match:
+                continue
+            label, value = match.group(1).strip().lower(), match.group(2).strip()
+            if label == 'seite':
+                article['seite'] = value
+            elif label == 'kernaussage':
+                article['inhalt'] = value
+            else:
+                # Relevanz-Bezeichnung hängt vom Profil ab (JuLi-Relevanz, ...)
+                article.setdefault('relevanz', value)
+        if article['titel']:
+            articles.append(article)
+    return articles
+
+def create_final_summary(articles: list, profile: dict = None) -> str:
     """Erstelle finale formatierte Zusammenfassung"""
     if not articles:
         return "❌ Keine relevanten lokalen/regionalen Artikel gefunden."
     
+    profile = profile or get_active_profile()
+    
     # Sortiere nach Priorität
     hoechste = [a for a in articles if 'Höchste' in a.get('kategorie', '')]
     hohe = [a for a in articles if 'Hohe' in a.get('kategorie', '')]
     
-    output = "# 📰 ANALYSE-ERGEBNIS - DESSAU-ROßLAU & SACHSEN-ANHALT\n\n"
+    output = f"# 📰 ANALYSE-ERGEBNIS - {' & '.join(upper_de(region) for region in profile['regions'])}\n\n"
     
     # Zusammenfassung
     output += f"**Gefunden:** {len(articles)} relevante lokale/regionale Artikel\n"
@@ -459,22 +3421,27 @@ def create_final_summary(articles: list) -> str:
     if hoechste:
         output += "## 🔥 HÖCHSTE PRIORITÄT - Sofort handeln!\n\n"
         for article in hoechste:
-            output += format_article(article, "🔥")
+            output += format_article(article, "🔥", profile)
     
     # Hohe Priorität
     if hohe:
-        output += "## ⚡ HOHE PRIORITÄT - Wichtig für JuLis\n\n"
+        output += f"## ⚡ HOHE PRIORITÄT - Wichtig für {profile['audience']}\n\n"
         for article in hohe:
-            output += format_article(article, "⚡")
+            output += format_article(article, "⚡", profile)
     
     return output
 
-def format_article(article: dict, emoji: str) -> str:
+def priority_emoji(article: dict) -> str:
+    """Emoji passend zur Prioritäts-Kategorie eines Artikels"""
+    return "🔥" if 'Höchste' in article.get('kategorie', '') else "⚡"
+
+def format_article(article: dict, emoji: str, profile: dict = None) -> str:
     """Formatiere einzelnen Artikel"""
+    profile = profile or get_active_profile()
     output = f"### {emoji} {article.get('titel', 'Unbekannter Titel')}\n"
     output += f"**📄 Seite:** {article.get('seite', 'k.A.')}\n"
     output += f"**📍 Kernaussage:** {article.get('inhalt', 'Keine Zusammenfassung verfügbar')}\n"
-    output += f"**🎯 JuLi-Relevanz:** {article.get('relevanz', 'Relevant für liberale Kommunalpolitik')}\n"
+    output += f"**🎯 {profile['relevance_label']}:** {article.get('relevanz') or 'Relevant für ' + profile['audience']}\n"
     output += "\n---\n\n"
     return output
 
@@ -484,14 +3451,16 @@ def format_final_output(raw_output: str) -> str:
     hoechste_count = raw_output.count("🔥")
     hohe_count = raw_output.count("⚡")
     
+    regions = get_active_profile()['regions']
+    
     # Füge Zusammenfassung hinzu
-    summary = f"""# 📰 ANALYSE-ERGEBNIS - DESSAU-ROßLAU & SACHSEN-ANHALT
+    summary = f"""# 📰 ANALYSE-ERGEBNIS - {' & '.join(upper_de(region) for region in regions)}
 
 **Gefunden:** {hoechste_count + hohe_count} relevante lokale/regionale Artikel
 - 🔥 Höchste Priorität: {hoechste_count}
 - ⚡ Hohe Priorität: {hohe_count}
 
-🎯 **Fokus:** Nur Dessau-Roßlau und Sachsen-Anhalt
+🎯 **Fokus:** Nur {' und '.join(regions)}
 ❌ **Ignoriert:** Bundespolitik & internationale Themen
 
 ---
@@ -510,7 +3479,8 @@ def show_login():
         submit = st.form_submit_button("🚀 Einloggen")
         
         if submit:
-            if username in TEAM_CREDENTIALS and TEAM_CREDENTIALS[username] == password:
+            credentials = get_credentials()
+            if username in credentials and credentials[username] == password:
                 st.session_state.logged_in = True
                 st.session_state.username = username
                 st.rerun()
@@ -518,6 +3488,9 @@ def show_login():
                 st.error("❌ Falsche Anmeldedaten!")
     
     st.info("💡 **Demo-Zugang:** jl_team / junge_liberale_2025")
+    
+    # Seite ist gezeichnet - jetzt pandas, Gemini & Co. im Hintergrund laden
+    warm_up_imports()
 
 def analyze_tab():
     """Tab für neue Artikel-Analyse"""
@@ -528,8 +3501,10 @@ def analyze_tab():
     
     # Versuche API-Key aus Secrets
     try:
-        api_key = st.secrets.get("GEMINI_API_KEY", "")
-        if api_key:
+        api_key = get_gemini_api_key()
+        if get_llm_backend() in ('fake', 'replay'):
+            st.sidebar.info(f"🧪 Offline-Backend aktiv: {get_llm_backend()}")
+        elif api_key:
             st.sidebar.success("✅ API-Key aus Konfiguration geladen")
     except:
         pass
@@ -550,6 +3525,37 @@ def analyze_tab():
                 st.warning("⚠️ API-Key benötigt")
                 st.info("📖 https://makersuite.google.com/app/apikey")
     
+    # Kaskaden-Modus: günstige Triage vor der vollen Analyse
+    cascade = st.sidebar.checkbox(
+        "⚡ Kaskaden-Modus (Triage)",
+        value=get_model_config()['cascade'],
+        help="Ein kleines Modell prüft zuerst jede Seite - nur relevante Seiten werden voll analysiert"
+    )
+    
+    # Seiten-Cache: schon analysierte Seiten nicht erneut schicken
+    page_cache = st.sidebar.checkbox(
+        "♻️ Seiten-Cache",
+        value=get_model_config()['page_cache'],
+        help="Seiten, die schon in einer anderen Ausgabe analysiert wurden (Mantel, Beilagen), werden übernommen"
+    )
+    
+    # Live-Ausgabe: Artikel erscheinen, sobald die KI sie liefert
+    stream = st.sidebar.checkbox(
+        "📡 Live-Ausgabe",
+        value=get_config("STREAM_RESPONSES", True, bool),
+        help="Zeigt Artikel an, während die KI noch antwortet"
+    )
+    
+    # Mehrere Gruppen lesen dieselbe Zeitung: einmal erfassen, für alle bewerten
+    multi_profile = False
+    if len(get_interest_profiles()) > 1:
+        multi_profile = st.sidebar.checkbox(
+            "👥 Alle Profile in einem Durchgang",
+            value=get_model_config()['multi_profile'],
+            help="Artikel werden einmal erfasst und für alle Interessenprofile bewertet "
+                 "(ohne Kaskade, Seiten-Cache und Live-Ausgabe)"
+        )
+    
     # PDF Upload
     pdf_file = st.file_uploader(
         "📄 Zeitungs-PDF hochladen:",
@@ -563,47 +3569,177 @@ def analyze_tab():
         # PDF analysieren
         if st.button("🔍 Zeitung analysieren", type="primary", disabled=not api_key):
             if api_key:
-                with st.spinner("📖 PDF wird gelesen..."):
-                    text = extract_pdf_text(pdf_file)
+                with perf_run(pdf_file.name, 'upload'):
+                    with st.spinner("📖 PDF wird gelesen..."):
+                        text = extract_pdf_text(pdf_file)
                 
-                if text.strip():
-                    with st.spinner("🤖 KI analysiert relevante Artikel..."):
-                        analysis = analyze_with_gemini(text, api_key)
+                    if text.strip():
+                        if stream and not multi_profile:
+                            st.markdown("### 📡 Live-Ergebnisse")
+                            analysis, profile_results = analyze_issue(text, api_key, multi_profile, cascade=cascade,
+                                                                      stream=True, page_cache=page_cache)
+                        else:
+                            with st.spinner("🤖 KI analysiert relevante Artikel..."):
+                                analysis, profile_results = analyze_issue(text, api_key, multi_profile, cascade=cascade,
+                                                                          page_cache=page_cache)
                     
-                    # Ergebnis anzeigen
-                    st.success("✅ Analyse abgeschlossen!")
-                    st.markdown("---")
+                        # Ergebnis anzeigen
+                        st.success("✅ Analyse abgeschlossen!")
+                        st.markdown("---")
                     
-                    # Analyse in schönem Format
-                    st.markdown(analysis)
+                        # Analyse in schönem Format (bei Live-Ausgabe bereits angezeigt)
+                        if profile_results:
+                            show_profile_results(profile_results)
+                        elif stream:
+                            with st.expander("📄 Vollständige Analyse"):
+                                st.markdown(analysis)
+                        else:
+                            st.markdown(analysis)
                     
-                    # In Database speichern
-                    if save_analysis_to_db(pdf_file.name, analysis, text):
-                        st.success("💾 Artikel in Database gespeichert!")
+                        # In Database speichern
+                        if save_analysis_to_db(pdf_file.name, analysis, text, profile_results):
+                            st.success("💾 Artikel in Database gespeichert!")
                     
-                    # Download-Option
-                    st.download_button(
-                        label="📥 Analyse als Markdown herunterladen",
-                        data=f"# JL Zeitungsanalyse - {pdf_file.name}\n\nDatum: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n\n{analysis}",
-                        file_name=f"JL_Analyse_{pdf_file.name.replace('.pdf', '')}_{datetime.now().strftime('%Y%m%d')}.md",
-                        mime="text/markdown"
-                    )
-                else:
-                    st.error("❌ Kein Text im PDF gefunden!")
+                        # Download-Option
+                        st.download_button(
+                            label="📥 Analyse als Markdown herunterladen",
+                            data=f"# JL Zeitungsanalyse - {pdf_file.name}\n\nDatum: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n\n{analysis}",
+                            file_name=f"JL_Analyse_{pdf_file.name.replace('.pdf', '')}_{datetime.now().strftime('%Y%m%d')}.md",
+                            mime="text/markdown"
+                        )
+                    else:
+                        st.error("❌ Kein Text im PDF gefunden!")
             else:
                 st.warning("⚠️ Bitte API-Key in der Sidebar eingeben!")
 
+def show_article_row(row, key_prefix: str = "archiv"):
+    """Einen gespeicherten Artikel mit Analyse und nachladbarem Volltext anzeigen"""
+    with st.container():
+        st.markdown("---")
+        col1, col2 = st.columns([3, 1])
+        
+        with col1:
+            st.markdown(f"### 📰 {row['pdf_name']}")
+        with col2:
+            st.markdown(f"📅 {pd.to_datetime(row['datum']).strftime('%d.%m.%Y')}")
+        
+        if 'analysis' in row:
+            # Analyse in Container
+            with st.container():
+                st.markdown(row['analysis'])
+        else:
+            # Suchtreffer: hervorgehobener Ausschnitt, Analyse erst auf Wunsch
+            st.markdown(f"… {row['headline']} …")
+            if st.toggle("🧾 Analyse anzeigen", key=f"{key_prefix}_analyse_{row['id']}"):
+                with st.spinner("Lade Analyse..."):
+                    st.markdown(load_article_analysis(row['article_hash']) or "Keine Analyse gespeichert.")
+        
+        # Volltext erst auf Wunsch nachladen
+        if st.toggle("📖 Volltext anzeigen", key=f"{key_prefix}_volltext_{row['id']}"):
+            with st.spinner("Lade Volltext..."):
+                full_text = load_full_text(row['article_hash'])
+            if full_text:
+                st.text_area("Volltext", full_text, height=400, key=f"{key_prefix}_volltext_text_{row['id']}",
+                             label_visibility="collapsed")
+            else:
+                st.caption(row.get('volltext_kurz') or "Kein Volltext gespeichert.")
+
+def new_articles_feed():
+    """Neue Artikel seit dem letzten Besuch - nur Zeilen nach dem Wasserstand"""
+    since = get_feed_since()
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        only_highest = st.toggle("🔥 Nur höchste Priorität", key="feed_only_highest")
+    
+    try:
+        total_new = count_new_articles(since, only_highest)
+    except Exception as e:
+        st.error(f"❌ Feed-Fehler: {str(e)}")
+        return
+    
+    st.markdown(f"### 🆕 Neu seit deinem letzten Besuch: {total_new}")
+    st.caption(f"Seit {pd.to_datetime(since).strftime('%d.%m.%Y %H:%M')}")
+    
+    if not total_new:
+        st.info("✨ Nichts Neues - du bist auf dem aktuellen Stand.")
+        return
+    
+    # Seiten per Cursor nachladen ((created_at, id) der jeweils letzten Zeile)
+    pages_key = f"feed_pages_{since}_{only_highest}"
+    pages = st.session_state.setdefault(pages_key, 1)
+    rows, cursor = [], None
+    for _ in range(pages):
+        page = load_new_articles(since, cursor, only_highest)
+        rows.extend(page)
+        if len(page) < FEED_PAGE_SIZE:
+            break
+        cursor = (page[-1]['created_at'], page[-1]['id'])
+    
+    with col2:
+        if st.button("✅ Alles gesehen", use_container_width=True):
+            newest = load_new_articles(since, None, False, 1)
+            if newest:
+                try:
+                    save_watermark(st.session_state.get('username', 'User'), newest[0]['created_at'])
+                    st.session_state['feed_since'] = newest[0]['created_at']
+                    count_new_articles.clear()
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"❌ Wasserstand nicht gespeichert: {e}")
+    
+    for _, row in articles_to_dataframe(rows).iterrows():
+        show_article_row(row, key_prefix="feed")
+    
+    if len(rows) < total_new and st.button(f"⬇️ Weitere laden ({total_new - len(rows)} übrig)"):
+        st.session_state[pages_key] = pages + 1
+        st.rerun()
+
+def entity_facet_filter() -> list:
+    """Facetten-Auswahl (Personen, Parteien, Schulen, ...) mit Artikel-Zählern aus dem Index"""
+    try:
+        facets = load_entity_facets()
+    except Exception as e:
+        st.caption(f"ℹ️ Entitäten-Index nicht verfügbar: {e}")
+        return []
+    
+    if not facets:
+        return []
+    
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        types = [entity_type for entity_type in ENTITY_TYPES if any(f['entity_type'] == entity_type for f in facets)]
+        facet_type = st.selectbox("🏷️ Kategorie:", ["Alle", *types],
+                                  format_func=lambda t: ENTITY_TYPES.get(t, t))
+    
+    options = [f for f in facets if facet_type == "Alle" or f['entity_type'] == facet_type]
+    labels = {f['entity_key']: f"{f['name']} ({f['article_count']})" for f in facets}
+    
+    with col2:
+        return st.multiselect(
+            "Artikel über...",
+            [f['entity_key'] for f in options],
+            format_func=lambda key: labels.get(key, key),
+            key="entity_facets",
+            placeholder="z.B. Oberbürgermeister, Fraktion, Schule, Straße"
+        )
+
 def search_tab():
     """Tab für Artikel-Suche in der Database"""
     st.header("🔍 Artikel-Database durchsuchen")
     
-    # Database laden
-    df = load_article_database()
+    total_count = get_article_stats()['total_count']
     
-    if df.empty:
+    if not total_count:
         st.info("📭 Noch keine Artikel in der Database. Analysiere zuerst ein paar PDFs!")
         return
     
+    # Häufigster Fall zuerst: nur die neuen Artikel, eine kleine Abfrage
+    new_articles_feed()
+    
+    st.markdown("---")
+    st.markdown("### 📚 Archiv")
+    
     # Suchfunktionen
     col1, col2 = st.columns([3, 1])
     
@@ -614,7 +3750,7 @@ def search_tab():
         )
     
     with col2:
-        st.metric("📊 Gesamt-Artikel", len(df))
+        st.metric("📊 Gesamt-Artikel", total_count)
     
     # Zeitfilter
     col1, col2 = st.columns(2)
@@ -623,11 +3759,30 @@ def search_tab():
     with col2:
         date_to = st.date_input("📅 Bis:", value=None)
     
-    # Suche ausführen
-    filtered_df = df.copy()
+    # Facetten aus dem Entitäten-Index
+    selected_entities = entity_facet_filter()
+    
+    # Gesamtes Archiv nur laden, wenn wirklich danach gesucht wird
+    if not (search_query or date_from or date_to or selected_entities
+            or st.toggle("Gesamtes Archiv anzeigen", key="show_archive")):
+        return
+    
+    if selected_entities and not search_query:
+        # Reine Index-Abfrage: nur die passenden Artikel laden
+        filtered_df = load_articles_by_hashes(find_articles_by_entities(selected_entities))
+    elif search_query:
+        # Gerankte Suche auf dem Server - das Archiv muss dafür nicht geladen werden
+        filtered_df = search_articles(search_query)
+        
+        if selected_entities and not filtered_df.empty:
+            filtered_df = filtered_df[filtered_df['article_hash'].isin(find_articles_by_entities(selected_entities))]
+    else:
+        # Database laden
+        filtered_df = load_article_database()
     
-    if search_query:
-        filtered_df = search_articles(search_query, filtered_df)
+    if filtered_df.empty:
+        st.markdown("### 📋 Gefunden: 0 Artikel")
+        return
     
     if date_from:
         filtered_df = filtered_df[pd.to_datetime(filtered_df['datum']).dt.date >= date_from]
@@ -636,105 +3791,116 @@ def search_tab():
     
     # Ergebnisse anzeigen
     st.markdown(f"### 📋 Gefunden: {len(filtered_df)} Artikel")
+    total_count = filtered_df.attrs.get('total_count', 0)
+    if total_count > len(filtered_df):
+        st.caption(f"Die {len(filtered_df)} relevantesten von {total_count} Treffern - Suche verfeinern für mehr")
     
     if not filtered_df.empty:
-        # Sortierung
-        sort_by = st.selectbox("Sortieren nach:", ["Datum (neu→alt)", "PDF-Name", "Datum (alt→neu)"])
+        # Sortierung (Suchtreffer kommen nach Relevanz sortiert)
+        sort_options = ["Datum (neu→alt)", "PDF-Name", "Datum (alt→neu)"]
+        if 'rank' in filtered_df.columns:
+            sort_options.insert(0, "Relevanz")
+        sort_by = st.selectbox("Sortieren nach:", sort_options)
         
         if sort_by == "Datum (neu→alt)":
             filtered_df = filtered_df.sort_values('datum', ascending=False)
         elif sort_by == "PDF-Name":
             filtered_df = filtered_df.sort_values('pdf_name')
-        else:
+        elif sort_by == "Datum (alt→neu)":
             filtered_df = filtered_df.sort_values('datum', ascending=True)
         
         # Artikel anzeigen
         for idx, row in filtered_df.iterrows():
-            with st.container():
-                st.markdown("---")
-                col1, col2 = st.columns([3, 1])
-                
-                with col1:
-                    st.markdown(f"### 📰 {row['pdf_name']}")
-                with col2:
-                    st.markdown(f"📅 {pd.to_datetime(row['datum']).strftime('%d.%m.%Y')}")
-                
-                # Analyse in Container
-                with st.container():
-                    st.markdown(row['analysis'])
+            show_article_row(row)
         
-        # Export-Option
+        # Export-Optionen (erst beim Klick erzeugt)
         st.markdown("---")
-        csv_data = filtered_df.to_csv(index=False)
-        st.download_button(
-            label="📥 Suchergebnisse als CSV exportieren",
-            data=csv_data,
-            file_name=f"JL_Artikel_Export_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv"
-        )
+        st.markdown("**📥 Suchergebnisse exportieren**")
+        export_buttons(filtered_df, f"JL_Artikel_Export_{datetime.now().strftime('%Y%m%d')}", key="search_export",
+                       prepare=with_analysis)
 
 def stats_tab():
     """Tab für Statistiken"""
     st.header("📊 Artikel-Statistiken")
     
-    df = load_article_database()
+    stats = get_article_stats()
     
-    if df.empty:
+    if not stats['total_count']:
         st.info("📭 Noch keine Daten für Statistiken verfügbar.")
         return
     
-    # Basis-Statistiken
+    # Basis-Statistiken (aus dem gecachten Zähl-Service, ohne Zeilen zu laden)
+    priority = stats['priority']
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("📰 Gesamt-Artikel", len(df))
+        st.metric("📰 Gesamt-Artikel", stats['total_count'])
     
     with col2:
-        if not df.empty:
-            latest_date = pd.to_datetime(df['datum']).max().strftime('%d.%m.%Y')
+        if stats['last_created_at']:
+            latest_date = pd.to_datetime(stats['last_created_at']).strftime('%d.%m.%Y')
             st.metric("📅 Letzte Analyse", latest_date)
     
     with col3:
-        unique_pdfs = df['pdf_name'].nunique()
-        st.metric("📄 Verschiedene PDFs", unique_pdfs)
+        st.metric("📄 Verschiedene PDFs", stats['pdf_count'] if stats['pdf_count'] is not None else "–")
     
     with col4:
         # Artikel mit hoher/höchster Priorität zählen
-        total_high_prio = df['highest_priority_count'].sum() + df['high_priority_count'].sum()
-        st.metric("🎯 Relevante Artikel", total_high_prio)
+        if priority['highest_mentions'] is not None:
+            st.metric("🎯 Relevante Artikel", priority['highest_mentions'] + priority['high_mentions'])
+        else:
+            st.metric("🎯 Ausgaben mit Priorität", priority['highest_articles'])
+    
+    # Themen und Verlauf nach Erscheinungsdatum aus der vorberechneten Zeitreihe
+    try:
+        series = fetch_theme_series()
+    except Exception as e:
+        st.caption(f"ℹ️ Themen-Zeitreihe nicht verfügbar, wird aus den Artikeln berechnet: {e}")
+        df = load_article_database()
+        series = theme_series_from_rows(df.to_dict('records') if not df.empty else [])
     
     # Top Themen
     st.markdown("### 🏆 Top Themen in den Analysen")
     
-    # Themen-Keywords definieren
-    themes = {
-        'Kommunalpolitik': ['Stadtrat', 'Bürgermeister', 'Gemeinderat', 'Kommune'],
-        'Verkehr': ['Verkehr', 'ÖPNV', 'Mobilität', 'Straße', 'Radweg'],
-        'Digitalisierung': ['Digital', 'Internet', 'Online', 'IT'],
-        'Bildung': ['Schule', 'Bildung', 'Universität', 'Studium'],
-        'Wirtschaft': ['Wirtschaft', 'Unternehmen', 'Gewerbe', 'Arbeitsplätze'],
-        'Umwelt': ['Umwelt', 'Klima', 'Nachhaltigkeit', 'Energie']
-    }
-    
-    theme_counts = {}
-    all_text = ' '.join(df['analysis'].astype(str))
-    
-    for theme, keywords in themes.items():
-        count = sum(all_text.lower().count(kw.lower()) for kw in keywords)
-        if count > 0:
-            theme_counts[theme] = count
-    
+    theme_counts = {theme: sum(values) for theme, values in series['themes'].items() if sum(values) > 0}
     if theme_counts:
         theme_df = pd.DataFrame(list(theme_counts.items()), columns=['Thema', 'Erwähnungen'])
         theme_df = theme_df.sort_values('Erwähnungen', ascending=False)
         st.bar_chart(theme_df.set_index('Thema'))
     
-    # Zeitverlauf
-    st.markdown("### 📈 Analysen im Zeitverlauf")
-    df['datum_date'] = pd.to_datetime(df['datum']).dt.date
-    timeline = df.groupby('datum_date').size().reset_index(name='Anzahl')
-    if len(timeline) > 1:
-        st.line_chart(timeline.set_index('datum_date'))
+    for spike in detect_theme_spikes(series):
+        if spike['ratio']:
+            st.warning(f"📈 **{spike['theme']}**: {spike['mentions']} Erwähnungen in der Woche bis "
+                       f"{pd.to_datetime(spike['week']):%d.%m.%Y} - {spike['ratio']:.1f}× über dem "
+                       f"{THEME_SPIKE_WINDOW_WEEKS}-Wochen-Schnitt")
+        else:
+            st.warning(f"📈 **{spike['theme']}**: {spike['mentions']} Erwähnungen in der Woche bis "
+                       f"{pd.to_datetime(spike['week']):%d.%m.%Y} - in den Wochen davor kein Thema")
+    
+    # Zeitverlauf nach Erscheinungsdatum der Ausgaben (nicht nach Analysezeitpunkt)
+    st.markdown("### 📈 Themen im Zeitverlauf")
+    if not series['start']:
+        st.info("📭 Noch keine Ausgaben mit Erscheinungsdatum.")
+    else:
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            selected = st.multiselect("Themen", list(series['themes']), default=list(theme_counts)[:3],
+                                      key="trend_themes")
+        with col2:
+            resolution = st.selectbox("Auflösung", ["Woche", "Monat", "Tag"], key="trend_freq")
+        with col3:
+            window = st.number_input("Gleitender Schnitt (Perioden)", min_value=1, max_value=52, value=4,
+                                     key="trend_window")
+        
+        frame = theme_series_frame(series, {'Tag': 'D', 'Woche': 'W', 'Monat': 'MS'}[resolution])
+        if selected:
+            st.line_chart(frame[selected].rolling(int(window), min_periods=1).mean())
+        st.caption(f"Ausgaben pro {resolution}")
+        st.bar_chart(frame['Ausgaben'])
+    
+    weekly_digest_section()
+    
+    snapshot_section()
 
 def automated_analysis_tab():
     """Tab für automatisierte Google Drive Analyse"""
@@ -812,6 +3978,124 @@ def automated_analysis_tab():
             {web_app_url}
             ```
             """)
+        
+        st.markdown("---")
+        backfill_section(web_app_url)
+
+BACKFILL_STATUS = {
+    'running': "▶️ läuft",
+    'paused': "⏸️ pausiert",
+    'waiting_budget': "⏳ Tagesbudget erreicht - geht morgen weiter",
+    'done': "✅ fertig",
+}
+
+def backfill_section(web_app_url: str):
+    """Archiv-Backfill anlegen, überwachen, pausieren und fortsetzen"""
+    st.markdown("### 🗄️ Archiv-Backfill")
+    st.markdown("""
+    Arbeitet einen Zeitraum des Drive-Ordners im Hintergrund ab - auch wenn der Browser geschlossen wird.
+    Nach jeder Datei wird ein Checkpoint gespeichert; pausierte oder durch einen Neustart unterbrochene
+    Jobs machen genau dort weiter. *Das Apps Script muss dafür den Parameter `from` unterstützen
+    (siehe Script-Vorlage).*
+    """)
+    
+    api_key = get_gemini_api_key()
+    
+    try:
+        resumed = resume_orphaned_backfills(api_key) if api_key else []
+        jobs = load_backfill_jobs()
+    except Exception as e:
+        st.error(f"❌ Backfill-Jobs konnten nicht geladen werden: {e}")
+        return
+    
+    if resumed:
+        st.info(f"🔁 {len(resumed)} unterbrochene(r) Job(s) automatisch fortgesetzt")
+    
+    with st.form("backfill_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            date_from = st.date_input("📅 Ausgaben von:", value=datetime.now().date() - timedelta(days=365),
+                                      key="backfill_from")
+            concurrency = st.slider("Parallele Dateien:", 1, 8, get_config("BACKFILL_CONCURRENCY", 2, int))
+        with col2:
+            date_to = st.date_input("📅 bis:", value=datetime.now().date(), key="backfill_to")
+            daily_token_budget = st.number_input(
+                "Token-Budget pro Tag:", min_value=10_000, step=100_000,
+                value=get_config("BACKFILL_DAILY_TOKENS", 2_000_000, int),
+                help="Ist das Budget erreicht, wartet der Job bis Mitternacht"
+            )
+        
+        if st.form_submit_button("🗄️ Backfill anlegen & starten", type="primary"):
+            if not api_key:
+                st.error("❌ Gemini API Key fehlt in den Secrets!")
+            elif date_from > date_to:
+                st.error("❌ 'Von' liegt nach 'bis'")
+            else:
+                try:
+                    with st.spinner("📂 Hole Dateiliste für den Zeitraum..."):
+                        job = create_backfill_job(web_app_url, date_from, date_to, concurrency,
+                                                  int(daily_token_budget), st.session_state.get('username', 'User'))
+                    if job['files']:
+                        start_backfill(job, api_key)
+                        st.success(f"✅ {len(job['files'])} Datei(en) eingeplant, "
+                                   f"{job['skipped_known']} bereits analysiert")
+                    else:
+                        st.info(f"Keine neuen Dateien im Zeitraum ({job['skipped_known']} bereits analysiert)")
+                        job['status'] = 'done'
+                        save_backfill_job(job)
+                    jobs = load_backfill_jobs()
+                except Exception as e:
+                    st.error(f"❌ Backfill konnte nicht angelegt werden: {e}")
+    
+    if not jobs:
+        return
+    
+    if st.button("🔄 Fortschritt aktualisieren", key="backfill_refresh"):
+        st.rerun()
+    
+    for job in jobs:
+        show_backfill_job(job, api_key)
+
+def show_backfill_job(job: dict, api_key: str):
+    """Fortschritt und Steuerung eines Backfill-Jobs"""
+    total = len(job['files'])
+    results = job['done'].values()
+    finished = sum(1 for result in results if result['status'] in ('ok', 'skipped'))
+    failed = [
+        {'Datei': f['name'], 'Ausgabe': f['issue_date'], 'Fehler': job['done'][f['id']].get('error', '')}
+        for f in job['files'] if job['done'].get(f['id'], {}).get('status') == 'failed'
+    ]
+    running = backfill_running(job['job_id'])
+    status = 'running' if running and job['status'] == 'paused' else job['status']
+    
+    st.markdown("---")
+    st.markdown(f"**{job['date_from']} – {job['date_to']}** · {BACKFILL_STATUS.get(status, status)} · "
+                f"von {job.get('created_by', '?')}")
+    st.progress(finished / total if total else 1.0)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Erledigt", f"{finished}/{total}")
+    with col2:
+        st.metric("Fehlgeschlagen", len(failed))
+    with col3:
+        st.metric("Tokens heute", f"{backfill_tokens_today(job):,}",
+                  help=f"Budget: {job['daily_token_budget']:,} pro Tag · {job['concurrency']} parallel")
+    with col4:
+        if running:
+            if st.button("⏸️ Pausieren", key=f"backfill_pause_{job['job_id']}", use_container_width=True):
+                pause_backfill(job['job_id'])
+                st.info("⏸️ Laufende Dateien werden noch fertig analysiert, dann hält der Job an.")
+        elif job['status'] != 'done' or failed:
+            if st.button("▶️ Fortsetzen", key=f"backfill_resume_{job['job_id']}", use_container_width=True):
+                if api_key and start_backfill(job, api_key):
+                    st.rerun()
+                elif api_key:
+                    st.warning("⚠️ Der Job läuft bereits auf einer anderen Instanz.")
+    
+    if failed:
+        with st.expander(f"❌ {len(failed)} fehlgeschlagene Datei(en) - werden beim Fortsetzen erneut versucht"):
+            st.dataframe(pd.DataFrame(failed), use_container_width=True)
 
 def check_newest_pdf(web_app_url):
     """Zeige Info über die neueste PDF"""
@@ -837,7 +4121,7 @@ def check_newest_pdf(web_app_url):
                 
                 with info_col2:
                     # Prüfe ob bereits analysiert
-                    if check_duplicate(file_info['name']):
+                    if check_duplicate(file_info['name'], file_info.get('md5Checksum')):
                         st.info("✅ Bereits analysiert")
                     else:
                         st.warning("⚠️ Noch nicht analysiert")
@@ -852,7 +4136,7 @@ def analyze_newest_pdf(web_app_url):
     """Analysiere nur die neueste PDF"""
     try:
         # API Key prüfen
-        api_key = st.secrets.get("GEMINI_API_KEY", "")
+        api_key = get_gemini_api_key()
         if not api_key:
             st.error("❌ Gemini API Key fehlt! Bitte in Streamlit Secrets hinzufügen.")
             with st.expander("🔑 So fügst du den API Key hinzu:"):
@@ -870,7 +4154,7 @@ def analyze_newest_pdf(web_app_url):
         # Progress Container
         progress_container = st.container()
         
-        with progress_container:
+        with progress_container, perf_run('Neueste PDF', 'drive_newest') as run:
             # Hole neueste PDF Info
             with st.spinner("🔍 Suche neueste PDF..."):
                 response = requests.get(web_app_url)
@@ -881,88 +4165,415 @@ def analyze_newest_pdf(web_app_url):
                     return
                 
                 file_info = data['file']
+                run['label'] = file_info['name']
                 
                 # Prüfe ob bereits analysiert
-                if check_duplicate(file_info['name']):
+                if check_duplicate(file_info['name'], file_info.get('md5Checksum')):
                     st.warning(f"⚠️ '{file_info['name']}' wurde bereits analysiert!")
                     if not st.checkbox("Trotzdem erneut analysieren?"):
                         return
             
-            # Status-Updates
-            status = st.empty()
-            progress_bar = st.progress(0)
-            
-            # Download PDF
-            status.text("📥 Lade PDF herunter...")
-            progress_bar.progress(25)
-            
-            download_response = requests.post(
-                web_app_url,
-                data={'fileId': file_info['id']},
-                timeout=60
+            # Nur eine Analyse pro Datei - auch wenn mehrere Nutzer gleichzeitig klicken
+            stream = get_config("STREAM_RESPONSES", True, bool)
+            flight_key = file_info.get('md5Checksum') or file_info['id']
+            result, leader = single_flight(
+                flight_key,
+                lambda: analyze_drive_file(web_app_url, file_info, api_key, stream),
+                st.session_state.get('username', 'User')
             )
             
-            if download_response.status_code != 200:
-                st.error(f"Download-Fehler: HTTP {download_response.status_code}")
+            if not result:
                 return
+            analysis = result['analysis']
+            profile_results = result.get('profile_results')
+            if profile_results:
+                # Mehrprofil-Ergebnisse werden ohne Live-Ausgabe als Tabs gezeigt
+                stream = False
+            if not leader:
+                # Ergebnis kam von einer anderen Session - noch nicht angezeigt
+                stream = False
+                st.info("🤝 Ergebnis der parallel laufenden Analyse übernommen")
+        
+        # Ergebnis anzeigen
+        st.success(f"✅ **{file_info['name']}** erfolgreich analysiert!")
+        st.markdown("---")
+        
+        # Analyse in schönem Format (bei Live-Ausgabe bereits angezeigt)
+        if profile_results:
+            show_profile_results(profile_results)
+        elif stream:
+            with st.expander("📄 Vollständige Analyse"):
+                st.markdown(analysis)
+        else:
+            with st.container():
+                st.markdown(analysis)
+        
+        # Download-Buttons
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.download_button(
+                label="📥 Als Markdown speichern",
+                data=f"# JL Zeitungsanalyse\n\n**Datei:** {file_info['name']}\n**Datum:** {datetime.now().strftime('%d.%m.%Y %H:%M')}\n\n{analysis}",
+                file_name=f"JL_Analyse_{file_info['name'].replace('.pdf', '')}_{datetime.now().strftime('%Y%m%d')}.md",
+                mime="text/markdown",
+                use_container_width=True
+            )
+        
+        with col2:
+            st.download_button(
+                label="📄 Als PDF speichern",
+                data=pdf_export(lambda: [f"# JL Zeitungsanalyse\n\n**Datei:** {file_info['name']}\n"
+                                         f"**Datum:** {datetime.now().strftime('%d.%m.%Y %H:%M')}\n\n", analysis]),
+                file_name=f"JL_Analyse_{file_info['name'].replace('.pdf', '')}_{datetime.now().strftime('%Y%m%d')}.pdf",
+                mime="application/pdf",
+                use_container_width=True
+            )
+        
+    except Exception as e:
+        st.error(f"Fehler: {e}")
+        with st.expander("🐛 Fehlerdetails"):
+            import traceback
+            st.code(traceback.format_exc())
+
+def analyze_drive_file(web_app_url, file_info: dict, api_key: str, stream: bool):
+    """Eine Drive-Datei herunterladen, analysieren und speichern"""
+    # Status-Updates
+    status = st.empty()
+    progress_bar = st.progress(0)
+    
+    # Download PDF
+    status.text("📥 Lade PDF herunter...")
+    progress_bar.progress(25)
+    
+    # Antwort wird blockweise dekodiert und auf die Platte geschrieben
+    with perf_span('download'):
+        download_response = requests.post(
+            web_app_url,
+            data={'fileId': file_info['id']},
+            timeout=60,
+            stream=True
+        )
+        
+        if download_response.status_code != 200:
+            st.error(f"Download-Fehler: HTTP {download_response.status_code}")
+            return None
+        
+        try:
+            pdf = SpooledPdf.from_base64_response(download_response, file_info['name'])
+        except PdfTooLarge as e:
+            st.error(f"❌ {e}")
+            return None
+    
+    with pdf:
+        # Ohne Prüfsumme in der Liste: nach dem Download prüfen, spart zumindest die Analyse
+        if not file_info.get('md5Checksum'):
+            match = find_processed(pdf.md5)
+            if match and match['pdf_name'] != file_info['name']:
+                st.warning(f"⚠️ Inhalt identisch mit bereits analysierter Datei '{match['pdf_name']}'")
+                if not st.checkbox("Trotzdem erneut analysieren?", key="reanalyze_same_content"):
+                    return None
+        
+        # Text extrahieren
+        status.text("📖 Extrahiere Text aus PDF...")
+        progress_bar.progress(50)
+        
+        text = extract_pdf_text(pdf)
+        
+        if not text.strip():
+            st.error("❌ Kein Text im PDF gefunden!")
+            return None
+        
+        # Analysieren
+        status.text("🤖 KI analysiert relevante Artikel...")
+        progress_bar.progress(75)
+        
+        analysis, profile_results = analyze_issue(text, api_key, stream=stream)
+        if analysis_failed(analysis):
+            # Nicht speichern und nicht als verarbeitet merken - der nächste Lauf versucht es erneut
+            st.error(analysis)
+            return None
+        
+        # Speichern
+        article_hash = build_article_record(file_info['name'], analysis, text)['article_hash']
+        if save_analysis_to_db(file_info['name'], analysis, text, profile_results):
+            try:
+                mark_processed([processed_entry(pdf, file_info['name'], article_hash)])
+            except Exception as e:
+                st.warning(f"⚠️ Prüfsummen-Index nicht aktualisiert: {e}")
+    
+    progress_bar.progress(100)
+    status.text("✅ Analyse abgeschlossen!")
+    
+    return {'file_name': file_info['name'], 'analysis': analysis, 'article_hash': article_hash,
+            'profile_results': profile_results}
+
+# Archiv-Backfill: Zeitraum des Drive-Ordners abarbeiten, mit Checkpoint nach jeder Datei
+def list_drive_files(web_app_url: str, date_from=None) -> list:
+    """Dateiliste vom Apps Script - optional alle seit date_from geänderten (Parameter from)"""
+    params = {'from': date_from.isoformat()} if date_from else {}
+    response = requests.get(web_app_url, params=params, timeout=120)
+    response.raise_for_status()
+    files = response.json()
+    if isinstance(files, dict) and files.get('error'):
+        raise RuntimeError(files['error'])
+    return files
+
+def issue_date(file_info: dict) -> str:
+    """Ausgabedatum (YYYY-MM-DD) aus dem Dateinamen, sonst Änderungsdatum in Drive"""
+    return parse_pdf_date(file_info.get('name', '')) or (file_info.get('modified') or '')[:10]
+
+def download_drive_pdf(web_app_url: str, file_info: dict) -> SpooledPdf:
+    """PDF über das Apps Script herunterladen - direkt in eine Temp-Datei"""
+    with perf_span('download'):
+        response = requests.post(web_app_url, data={'fileId': file_info['id']}, timeout=120, stream=True)
+        response.raise_for_status()
+        return SpooledPdf.from_base64_response(response, file_info['name'])
+
+def backfill_path(job_id: str) -> str:
+    return os.path.join(get_local_cache_dir('backfill'), f"{job_id}.json")
+
+def save_backfill_job(job: dict):
+    """Checkpoint schreiben (Supabase oder lokale Datei)"""
+    job['updated_at'] = datetime.now().isoformat()
+    if get_config("BACKFILL_STORE", "supabase") == 'local':
+        # Erst in Temp-Datei, dann umbenennen - ein Abbruch hinterlässt keinen halben Checkpoint
+        path = backfill_path(job['job_id'])
+        with open(path + '.tmp', 'w') as f:
+            json.dump(job, f)
+        os.replace(path + '.tmp', path)
+        return
+    
+    init_supabase().table('jl_backfill_jobs').upsert({
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'state': job,
+        'updated_at': job['updated_at'],
+    }, on_conflict='job_id').execute()
+
+def load_backfill_jobs() -> list:
+    """Alle Backfill-Jobs, neueste zuerst"""
+    if get_config("BACKFILL_STORE", "supabase") == 'local':
+        folder = get_local_cache_dir('backfill')
+        jobs = []
+        for name in os.listdir(folder):
+            if name.endswith('.json'):
+                with open(os.path.join(folder, name)) as f:
+                    jobs.append(json.load(f))
+    else:
+        response = init_supabase().table('jl_backfill_jobs').select("state").execute()
+        jobs = [row['state'] for row in response.data or []]
+    return sorted(jobs, key=lambda job: job['created_at'], reverse=True)
+
+def create_backfill_job(web_app_url: str, date_from, date_to, concurrency: int,
+                        daily_token_budget: int, owner: str) -> dict:
+    """Dateien im Zeitraum auflisten und als Job (älteste zuerst) speichern"""
+    files = list_drive_files(web_app_url, date_from)
+    in_range = [
+        file for file in files
+        if date_from.isoformat() <= issue_date(file) <= date_to.isoformat()
+    ]
+    
+    try:
+        processed_index = load_processed_index()
+    except Exception:
+        processed_index = {}
+    pending, skipped = split_by_processed(in_range, processed_index)
+    
+    job = {
+        'job_id': f"{date_from.isoformat()}_{date_to.isoformat()}_{uuid.uuid4().hex[:6]}",
+        'created_at': datetime.now().isoformat(),
+        'created_by': owner,
+        'web_app_url': web_app_url,
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'concurrency': concurrency,
+        'daily_token_budget': daily_token_budget,
+        'status': 'paused',
+        'files': sorted(
+            [{'id': f['id'], 'name': f['name'], 'md5Checksum': f.get('md5Checksum'),
+              'size': f.get('size'), 'issue_date': issue_date(f)} for f in pending],
+            key=lambda f: (f['issue_date'], f['name'])
+        ),
+        'done': {},
+        'tokens': {},
+        'skipped_known': len(skipped),
+    }
+    save_backfill_job(job)
+    return job
+
+def backfill_tokens_today(job: dict) -> int:
+    return job['tokens'].get(datetime.now().date().isoformat(), 0)
+
+def process_backfill_file(web_app_url: str, file_info: dict, api_key: str) -> dict:
+    """Eine Datei ohne UI herunterladen, analysieren und speichern - Ergebnis für den Checkpoint"""
+    with perf_run(file_info['name'], 'backfill') as run:
+        with download_drive_pdf(web_app_url, file_info) as pdf:
+            # Inhalt evtl. schon unter anderem Namen verarbeitet
+            match = find_processed(pdf.md5)
+            if match:
+                return {'status': 'skipped', 'article_hash': match.get('article_hash'), 'tokens': 0}
             
-            pdf_content = base64.b64decode(download_response.text)
-            
-            # PDF Buffer erstellen
-            pdf_buffer = io.BytesIO(pdf_content)
-            pdf_buffer.name = file_info['name']
-            
-            # Text extrahieren
-            status.text("📖 Extrahiere Text aus PDF...")
-            progress_bar.progress(50)
+            text = extract_pdf_text(pdf)
+            if not text.strip():
+                return {'status': 'failed', 'error': "Kein Text im PDF", 'tokens': 0}
             
-            text = extract_pdf_text(pdf_buffer)
+            analysis, profile_results = analyze_issue(text, api_key)
+            tokens = sum(call['prompt_tokens'] + call['output_tokens'] for call in run['llm_calls'])
+            if analysis_failed(analysis):
+                # Nicht speichern und nicht als verarbeitet merken - beim Fortsetzen erneut versuchen
+                return {'status': 'failed', 'error': analysis[len(ANALYSIS_ERROR_PREFIX):].strip(), 'tokens': tokens}
             
-            if not text.strip():
-                st.error("❌ Kein Text im PDF gefunden!")
-                return
+            article_hash = build_article_record(file_info['name'], analysis, text)['article_hash']
+            if not save_analysis_to_db(file_info['name'], analysis, text, profile_results):
+                return {'status': 'failed', 'error': "Speichern fehlgeschlagen", 'tokens': tokens}
+            mark_processed([processed_entry(pdf, file_info['name'], article_hash)])
             
-            # Analysieren
-            status.text("🤖 KI analysiert relevante Artikel...")
-            progress_bar.progress(75)
+            return {'status': 'ok', 'article_hash': article_hash, 'tokens': tokens}
+
+def seconds_until_midnight() -> float:
+    tomorrow = datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time())
+    return (tomorrow - datetime.now()).total_seconds()
+
+def backfill_lease_key(job_id: str) -> str:
+    return f"backfill:{job_id}"
+
+def acquire_backfill_lease(job_id: str, owner: str) -> bool:
+    """Nur eine Instanz arbeitet einen Job ab - Lease als Claim-Zeile in jl_analysis_claims"""
+    if get_config("CLAIM_STORE", "supabase") == 'local':
+        return True
+    return acquire_claim(backfill_lease_key(job_id), owner, get_config("BACKFILL_LEASE_SECONDS", 900, int))
+
+def renew_backfill_lease(job_id: str, owner: str) -> bool:
+    """Lease verlängern (Hintergrund-Thread, ohne UI) - False, wenn eine andere Instanz sie übernommen hat"""
+    if get_config("CLAIM_STORE", "supabase") == 'local':
+        return True
+    expires = datetime.now().astimezone() + timedelta(seconds=get_config("BACKFILL_LEASE_SECONDS", 900, int))
+    try:
+        renewed = init_supabase().table('jl_analysis_claims').update({'expires_at': expires.isoformat()}).eq(
+            'file_key', backfill_lease_key(job_id)
+        ).eq('claimed_by', owner).eq('status', 'running').execute()
+    except Exception:
+        # DB kurz nicht erreichbar - weiterarbeiten, die Lease läuft notfalls ab
+        return True
+    return bool(renewed.data)
+
+def release_backfill_lease(job_id: str, owner: str):
+    """Lease freigeben, damit der Job sofort woanders fortgesetzt werden kann"""
+    if get_config("CLAIM_STORE", "supabase") == 'local':
+        return
+    try:
+        init_supabase().table('jl_analysis_claims').update({'status': 'done'}).eq(
+            'file_key', backfill_lease_key(job_id)
+        ).eq('claimed_by', owner).execute()
+    except Exception:
+        pass
+
+def run_backfill_job(job: dict, api_key: str, stop_event: threading.Event, owner: str):
+    """Job abarbeiten, bis alles erledigt ist oder pausiert wird"""
+    lock = threading.Lock()
+    try:
+        work_backfill_job(job, api_key, stop_event, owner, lock)
+    finally:
+        release_backfill_lease(job['job_id'], owner)
+
+def work_backfill_job(job: dict, api_key: str, stop_event: threading.Event, owner: str, lock: threading.Lock):
+    def checkpoint(file_info: dict, result: dict):
+        with lock:
+            result['finished_at'] = datetime.now().isoformat()
+            job['done'][file_info['id']] = result
+            today = datetime.now().date().isoformat()
+            job['tokens'][today] = job['tokens'].get(today, 0) + result.get('tokens', 0)
+            save_backfill_job(job)
+        if not renew_backfill_lease(job['job_id'], owner):
+            # Lease abgelaufen und von einer anderen Instanz übernommen - hier aufhören
+            stop_event.set()
+    
+    def work(file_info: dict):
+        try:
+            result = process_backfill_file(job['web_app_url'], file_info, api_key)
+        except Exception as e:
+            result = {'status': 'failed', 'error': str(e), 'tokens': 0}
+        checkpoint(file_info, result)
+    
+    # Fehlgeschlagene Dateien werden beim Fortsetzen erneut versucht
+    pending = [f for f in job['files'] if job['done'].get(f['id'], {}).get('status') not in ('ok', 'skipped')]
+    
+    with ThreadPoolExecutor(max_workers=job['concurrency'], thread_name_prefix="jl-backfill") as pool:
+        running = set()
+        for file_info in pending:
+            while len(running) >= job['concurrency']:
+                _, running = wait(running, return_when=FIRST_COMPLETED)
             
-            analysis = analyze_with_gemini(text, api_key)
+            # Tagesbudget wird vor jeder Datei geprüft - laufende Dateien dürfen es knapp überschreiten
+            while not stop_event.is_set() and backfill_tokens_today(job) >= job['daily_token_budget']:
+                with lock:
+                    job['status'] = 'waiting_budget'
+                    save_backfill_job(job)
+                if not renew_backfill_lease(job['job_id'], owner):
+                    stop_event.set()
+                # Kürzer als die Lease warten, damit sie nicht während der Pause abläuft
+                stop_event.wait(min(seconds_until_midnight() + 5, get_config("BACKFILL_LEASE_SECONDS", 900, int) / 3))
             
-            # Speichern
-            save_analysis_to_db(file_info['name'], analysis, text)
+            if stop_event.is_set():
+                break
             
-            progress_bar.progress(100)
-            status.text("✅ Analyse abgeschlossen!")
-        
-        # Ergebnis anzeigen
-        st.success(f"✅ **{file_info['name']}** erfolgreich analysiert!")
-        st.markdown("---")
-        
-        # Analyse in schönem Format
-        with st.container():
-            st.markdown(analysis)
-        
-        # Download-Buttons
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.download_button(
-                label="📥 Als Markdown speichern",
-                data=f"# JL Zeitungsanalyse\n\n**Datei:** {file_info['name']}\n**Datum:** {datetime.now().strftime('%d.%m.%Y %H:%M')}\n\n{analysis}",
-                file_name=f"JL_Analyse_{file_info['name'].replace('.pdf', '')}_{datetime.now().strftime('%Y%m%d')}.md",
-                mime="text/markdown",
-                use_container_width=True
-            )
-        
-        with col2:
-            # Als PDF speichern (später implementieren)
-            st.button("📄 Als PDF speichern", disabled=True, use_container_width=True, help="Kommt bald!")
+            if job['status'] != 'running':
+                with lock:
+                    job['status'] = 'running'
+                    save_backfill_job(job)
+            running.add(pool.submit(work, file_info))
         
-    except Exception as e:
-        st.error(f"Fehler: {e}")
-        with st.expander("🐛 Fehlerdetails"):
-            import traceback
-            st.code(traceback.format_exc())
+        wait(running)
+    
+    with lock:
+        remaining = [f for f in job['files'] if job['done'].get(f['id'], {}).get('status') not in ('ok', 'skipped')]
+        job['status'] = 'paused' if stop_event.is_set() or remaining else 'done'
+        save_backfill_job(job)
+
+@st.cache_resource
+def get_backfill_workers() -> dict:
+    """Prozessweit laufende Backfill-Threads (überleben das Schließen des Browsers)"""
+    return {'lock': threading.Lock(), 'workers': {}, 'owner': f"backfill-{os.getpid()}-{uuid.uuid4().hex[:6]}"}
+
+def backfill_running(job_id: str) -> bool:
+    worker = get_backfill_workers()['workers'].get(job_id)
+    return bool(worker and worker['thread'].is_alive())
+
+def start_backfill(job: dict, api_key: str) -> bool:
+    """Job im Hintergrund starten bzw. fortsetzen (nur ein Thread pro Job)"""
+    registry = get_backfill_workers()
+    with registry['lock']:
+        if backfill_running(job['job_id']):
+            return False
+        # Läuft der Job schon auf einer anderen Instanz, nicht doppelt starten
+        if not acquire_backfill_lease(job['job_id'], registry['owner']):
+            return False
+        stop_event = threading.Event()
+        thread = threading.Thread(
+            target=run_backfill_job, args=(job, api_key, stop_event, registry['owner']),
+            name=f"jl-backfill-{job['job_id']}", daemon=True
+        )
+        registry['workers'][job['job_id']] = {'thread': thread, 'stop': stop_event, 'job': job}
+        job['status'] = 'running'
+        save_backfill_job(job)
+        thread.start()
+        return True
+
+def pause_backfill(job_id: str):
+    """Laufende Dateien fertig machen, dann anhalten"""
+    worker = get_backfill_workers()['workers'].get(job_id)
+    if worker:
+        worker['stop'].set()
+
+def resume_orphaned_backfills(api_key: str) -> list:
+    """Nach einem Neustart des Servers laufende Jobs automatisch wieder aufnehmen"""
+    resumed = []
+    for job in load_backfill_jobs():
+        if job['status'] in ('running', 'waiting_budget') and not backfill_running(job['job_id']):
+            if start_backfill(job, api_key):
+                resumed.append(job['job_id'])
+    return resumed
 
 def analyze_recent_pdfs(web_app_url, days):
     """Analysiere alle PDFs der letzten X Tage"""
@@ -1034,13 +4645,19 @@ def apps_script_integration():
             const cutoffDate = new Date();
             cutoffDate.setDate(cutoffDate.getDate() - 7); // Letzte 7 Tage
             
+            // Archiv-Backfill: ältere Dateien per ?from=JJJJ-MM-TT (Ausgabedatum filtert die App)
+            const params = (e && e.parameter) || {};
+            const fromDate = params.from ? new Date(params.from) : cutoffDate;
+            
             while (files.hasNext()) {
               const file = files.next();
-              if (file.getLastUpdated() > cutoffDate) {
+              if (file.getLastUpdated() > fromDate) {
                 fileList.push({
                   id: file.getId(),
                   name: file.getName(),
-                  modified: file.getLastUpdated().toISOString()
+                  modified: file.getLastUpdated().toISOString(),
+                  size: file.getSize(),
+                  md5Checksum: getMd5(file.getId())
                 });
               }
             }
@@ -1061,6 +4678,15 @@ def apps_script_integration():
           }
         }
         
+        // Prüfsumme aus der Drive API (Dienst "Drive API" unter "Dienste" hinzufügen)
+        function getMd5(fileId) {
+          try {
+            return Drive.Files.get(fileId, {fields: 'md5Checksum'}).md5Checksum;
+          } catch (error) {
+            return null;
+          }
+        }
+        
         function doPost(e) {
           try {
             const fileId = e.parameter.fileId;
@@ -1081,13 +4707,16 @@ def apps_script_integration():
         }
         ```
         
-        4. **Finde deine Ordner-ID:**
+        4. **Drive API aktivieren** (für Prüfsummen): Links bei **Dienste** auf **+** klicken → **Drive API** hinzufügen.
+           Damit werden unveränderte oder umbenannte Dateien erkannt, bevor sie heruntergeladen werden.
+        
+        5. **Finde deine Ordner-ID:**
            - Öffne deinen Zeitungsordner
            - URL: `https://drive.google.com/drive/folders/XXXXX`
            - Kopiere `XXXXX` (das ist deine Ordner-ID)
            - Ersetze `DEINE_ORDNER_ID_HIER` im Script
         
-        5. **Speichern und Deploy:**
+        6. **Speichern und Deploy:**
            - Strg+S zum Speichern
            - Deploy → New Deployment
            - Type: **Web app**
@@ -1095,13 +4724,13 @@ def apps_script_integration():
            - Who has access: **Anyone**
            - Deploy klicken
            
-        6. **WICHTIG: Autorisierung**
+        7. **WICHTIG: Autorisierung**
            - Beim ersten Deploy: "Review Permissions" klicken
            - Wähle dein Google-Konto
            - "Advanced" → "Go to [Scriptname] (unsafe)"
            - "Allow" klicken
            
-        7. **Kopiere die Web App URL** (beginnt mit https://script.google.com/macros/s/...)
+        8. **Kopiere die Web App URL** (beginnt mit https://script.google.com/macros/s/...)
         
         **Teste die URL:**
         - Öffne die URL in einem neuen Browser-Tab
@@ -1163,7 +4792,7 @@ def fetch_and_analyze_apps_script(web_app_url):
     """Hole und analysiere Dateien über Apps Script"""
     try:
         # API Key prüfen
-        api_key = st.secrets.get("GEMINI_API_KEY", "")
+        api_key = get_gemini_api_key()
         if not api_key:
             st.error("❌ Gemini API Key fehlt in den Secrets!")
             return
@@ -1211,7 +4840,23 @@ def fetch_and_analyze_apps_script(web_app_url):
         # Zeige Dateien
         with st.expander("📋 Gefundene Dateien"):
             for file in files:
-                st.write(f"📄 {file.get('name', 'Unbekannt')} ({file.get('size', 0):,} Bytes)")
+                st.write(f"📄 {file.get('name', 'Unbekannt')} ({int(file.get('size') or 0):,} Bytes)")
+        
+        # Bereits verarbeitete Inhalte (auch umbenannte) vor dem Download aussortieren
+        try:
+            processed_index = load_processed_index()
+        except Exception as e:
+            st.warning(f"⚠️ Prüfsummen-Index nicht verfügbar: {e}")
+            processed_index = {}
+        
+        files, skipped_files = split_by_processed(files, processed_index)
+        if skipped_files:
+            with st.expander(f"⏭️ {len(skipped_files)} bereits analysierte Datei(en) werden übersprungen"):
+                for file, match in skipped_files:
+                    st.write(f"📄 {file.get('name')} = {match['pdf_name']}")
+        if not files:
+            st.info("✅ Alle Dateien wurden bereits analysiert")
+            return
         
         # Container für Live-Updates
         status_container = st.container()
@@ -1227,6 +4872,12 @@ def fetch_and_analyze_apps_script(web_app_url):
             successful = 0
             failed = 0
             all_analyses = []
+            # Nach jeder Datei geschrieben (siehe unten), damit ein Abbruch keine bezahlte Analyse kostet
+            writer = BulkUpserter(batch_size=10)
+            text_writer = BulkUpserter(batch_size=10, sink=store_full_texts)
+            entity_writer = BulkUpserter(batch_size=10, sink=store_entities)
+            theme_writer = BulkUpserter(batch_size=10, sink=store_article_themes)
+            profile_writer = BulkUpserter(batch_size=10, sink=store_profile_analyses)
             
             st.write("📊 Starte Analyse...")
             
@@ -1239,15 +4890,19 @@ def fetch_and_analyze_apps_script(web_app_url):
                 
                 with log_container:
                     with st.expander(f"📄 {file_name}", expanded=True):
+                        run_token = begin_perf_run(file_name, 'drive_batch')
+                        pdf = None
                         try:
                             # Schritt 1: Download
                             st.write("⏳ Lade PDF herunter...")
                             
-                            download_response = requests.post(
-                                web_app_url,
-                                data={'fileId': file['id']},
-                                timeout=30
-                            )
+                            with perf_span('download'):
+                                download_response = requests.post(
+                                    web_app_url,
+                                    data={'fileId': file['id']},
+                                    timeout=30,
+                                    stream=True
+                                )
                             
                             if download_response.status_code != 200:
                                 st.error(f"❌ Download-Fehler: HTTP {download_response.status_code}")
@@ -1261,24 +4916,29 @@ def fetch_and_analyze_apps_script(web_app_url):
                                 failed += 1
                                 continue
                             
-                            st.write(f"✅ Download erfolgreich ({len(download_response.content):,} Bytes)")
-                            
-                            # Schritt 2: Base64 Decode
+                            # Schritt 2: Base64 blockweise dekodieren, direkt in eine Temp-Datei
                             try:
-                                pdf_content = base64.b64decode(download_response.text)
-                                st.write(f"✅ Dekodierung erfolgreich ({len(pdf_content):,} Bytes)")
+                                with perf_span('download'):
+                                    pdf = SpooledPdf.from_base64_response(download_response, file_name)
+                                st.write(f"✅ Download erfolgreich ({pdf.size:,} Bytes)")
+                            except PdfTooLarge as e:
+                                st.error(f"❌ {e}")
+                                failed += 1
+                                continue
                             except Exception as e:
                                 st.error(f"❌ Base64-Dekodierung fehlgeschlagen: {e}")
                                 failed += 1
                                 continue
                             
-                            # Schritt 3: PDF Buffer erstellen
-                            pdf_buffer = io.BytesIO(pdf_content)
-                            pdf_buffer.name = file_name
+                            # Listen ohne Prüfsumme: Inhalt nach dem Download vergleichen
+                            match = find_processed(pdf.md5, processed_index)
+                            if match:
+                                st.info(f"⏭️ Inhalt identisch mit '{match['pdf_name']}' - übersprungen")
+                                continue
                             
-                            # Schritt 4: Text extrahieren
+                            # Schritt 3: Text extrahieren
                             st.write("⏳ Extrahiere Text aus PDF...")
-                            text = extract_pdf_text(pdf_buffer)
+                            text = extract_pdf_text(pdf)
                             
                             if not text.strip():
                                 st.warning("⚠️ Kein Text im PDF gefunden")
@@ -1287,14 +4947,38 @@ def fetch_and_analyze_apps_script(web_app_url):
                             
                             st.write(f"✅ Text extrahiert ({len(text):,} Zeichen)")
                             
-                            # Schritt 5: Analysieren
+                            # Schritt 4: Analysieren
                             st.write("🤖 Analysiere mit KI...")
-                            analysis = analyze_with_gemini(text, api_key)
+                            analysis, profile_results = analyze_issue(text, api_key)
+                            if analysis_failed(analysis):
+                                # Nicht speichern und nicht als verarbeitet merken - nächster Lauf versucht es erneut
+                                st.error(analysis)
+                                failed += 1
+                                continue
                             st.write("✅ Analyse abgeschlossen")
                             
-                            # Schritt 6: Speichern
-                            if save_analysis_to_db(file_name, analysis, text):
-                                st.write("💾 In Datenbank gespeichert")
+                            # Schritt 5: Zum Speichern vormerken (gebündelt am Ende)
+                            record = build_article_record(file_name, analysis, text)
+                            writer.add(record)
+                            text_writer.add(build_text_record(record['article_hash'], text))
+                            entity_writer.add(build_entity_record(record['article_hash'], analysis))
+                            theme_writer.add(build_theme_record(record['article_hash'], record['pdf_date'], analysis))
+                            if profile_results:
+                                profile_writer.add(build_profile_record(record['article_hash'], profile_results))
+                            
+                            # Schritt 6: Sofort speichern - Tab zu oder Rerun verlieren sonst den Puffer
+                            for pending in (writer, text_writer, entity_writer, theme_writer, profile_writer):
+                                pending.flush()
+                            entry = processed_entry(pdf, file_name, record['article_hash'])
+                            if any(failure['key'] == record['article_hash'] for failure in writer.failed):
+                                st.warning("⚠️ Analyse nicht gespeichert - wird beim nächsten Lauf erneut verarbeitet")
+                            else:
+                                processed_index[entry['md5_checksum']] = entry
+                                try:
+                                    mark_processed([entry])
+                                except Exception as e:
+                                    st.warning(f"⚠️ Prüfsummen-Index nicht aktualisiert: {e}")
+                                st.write("💾 Gespeichert")
                             
                             all_analyses.append({
                                 'filename': file_name,
@@ -1316,11 +5000,23 @@ def fetch_and_analyze_apps_script(web_app_url):
                             import traceback
                             st.code(traceback.format_exc())
                             failed += 1
+                        finally:
+                            if pdf is not None:
+                                pdf.close()
+                            end_perf_run(run_token)
             
             # Finale Zusammenfassung
             progress_bar.progress(1.0)
             status_text.text("✅ Batch-Analyse abgeschlossen!")
             
+            # Alles ist schon geschrieben - hier nur noch der Gesamtbericht
+            show_bulk_report(writer.report(), "Analysen")
+            show_bulk_report(text_writer.report(), "Volltexte")
+            show_bulk_report(entity_writer.report(), "Entitäten-Einträge")
+            show_bulk_report(theme_writer.report(), "Themen-Einträge")
+            if profile_writer.written or profile_writer.failed:
+                show_bulk_report(profile_writer.report(), "Profil-Analysen")
+            
             st.markdown("---")
             st.success(f"""
             ### 📊 Zusammenfassung:
@@ -1331,31 +5027,8 @@ def fetch_and_analyze_apps_script(web_app_url):
             
             # Bericht erstellen wenn Analysen vorhanden
             if all_analyses:
-                report = create_batch_report(all_analyses)
-                
                 st.markdown("---")
-                with st.expander("📄 Gesamtbericht anzeigen", expanded=True):
-                    st.markdown(report)
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.download_button(
-                        label="📥 Bericht als Markdown",
-                        data=report,
-                        file_name=f"JL_Batch_{datetime.now().strftime('%Y%m%d_%H%M')}.md",
-                        mime="text/markdown"
-                    )
-                
-                with col2:
-                    # CSV Export
-                    df = pd.DataFrame(all_analyses)
-                    csv = df.to_csv(index=False)
-                    st.download_button(
-                        label="📥 Ergebnisse als CSV",
-                        data=csv,
-                        file_name=f"JL_Analysen_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-                        mime="text/csv"
-                    )
+                show_batch_report(all_analyses, key="drive_batch_export")
             else:
                 st.warning("Keine erfolgreichen Analysen zum Exportieren")
                 
@@ -1388,7 +5061,7 @@ def manual_batch_upload():
     st.markdown("### 📤 Manueller Batch-Upload")
     
     # API Key prüfen
-    api_key = st.secrets.get("GEMINI_API_KEY", "")
+    api_key = get_gemini_api_key()
     if not api_key:
         st.error("❌ Gemini API Key fehlt in den Secrets!")
         return
@@ -1416,12 +5089,19 @@ def manual_batch_upload():
             
             successful = 0
             all_analyses = []
+            # Nach jeder Datei geschrieben (siehe unten), damit ein Abbruch keine bezahlte Analyse kostet
+            writer = BulkUpserter(batch_size=10)
+            text_writer = BulkUpserter(batch_size=10, sink=store_full_texts)
+            entity_writer = BulkUpserter(batch_size=10, sink=store_entities)
+            theme_writer = BulkUpserter(batch_size=10, sink=store_article_themes)
+            profile_writer = BulkUpserter(batch_size=10, sink=store_profile_analyses)
             
             for idx, pdf_file in enumerate(pdf_files):
                 progress = (idx + 1) / len(pdf_files)
                 progress_bar.progress(progress)
                 status_text.text(f"Analysiere: {pdf_file.name}")
                 
+                run_token = begin_perf_run(pdf_file.name, 'manual_batch')
                 try:
                     # PDF lesen
                     pdf_file.seek(0)
@@ -1429,10 +5109,21 @@ def manual_batch_upload():
                     
                     if text.strip():
                         # Analysieren
-                        analysis = analyze_with_gemini(text, api_key)
+                        analysis, profile_results = analyze_issue(text, api_key)
+                        if analysis_failed(analysis):
+                            st.error(f"{pdf_file.name}: {analysis}")
+                            continue
                         
-                        # Speichern
-                        save_analysis_to_db(pdf_file.name, analysis, text)
+                        # Sofort speichern, damit ein Abbruch keine bezahlte Analyse kostet
+                        record = build_article_record(pdf_file.name, analysis, text)
+                        writer.add(record)
+                        text_writer.add(build_text_record(record['article_hash'], text))
+                        entity_writer.add(build_entity_record(record['article_hash'], analysis))
+                        theme_writer.add(build_theme_record(record['article_hash'], record['pdf_date'], analysis))
+                        if profile_results:
+                            profile_writer.add(build_profile_record(record['article_hash'], profile_results))
+                        for pending in (writer, text_writer, entity_writer, theme_writer, profile_writer):
+                            pending.flush()
                         
                         all_analyses.append({
                             'filename': pdf_file.name,
@@ -1444,11 +5135,20 @@ def manual_batch_upload():
                         
                 except Exception as e:
                     st.error(f"Fehler bei {pdf_file.name}: {e}")
+                finally:
+                    end_perf_run(run_token)
             
             # Ergebnis
             progress_bar.progress(1.0)
             status_text.text("✅ Batch-Analyse abgeschlossen!")
             
+            show_bulk_report(writer.report(), "Analysen")
+            show_bulk_report(text_writer.report(), "Volltexte")
+            show_bulk_report(entity_writer.report(), "Entitäten-Einträge")
+            show_bulk_report(theme_writer.report(), "Themen-Einträge")
+            if profile_writer.written or profile_writer.failed:
+                show_bulk_report(profile_writer.report(), "Profil-Analysen")
+            
             st.success(f"""
             ### 📊 Ergebnis:
             - ✅ Erfolgreich: {successful} PDFs
@@ -1457,31 +5157,162 @@ def manual_batch_upload():
             
             # Bericht
             if all_analyses:
-                report = create_batch_report(all_analyses)
-                
-                with st.expander("📄 Gesamtbericht", expanded=True):
-                    st.markdown(report)
-                
-                st.download_button(
-                    label="📥 Bericht herunterladen",
-                    data=report,
-                    file_name=f"JL_Batch_{datetime.now().strftime('%Y%m%d_%H%M')}.md",
-                    mime="text/markdown"
-                )
+                show_batch_report(all_analyses, key="manual_batch_export")
 
-def create_batch_report(analyses):
-    """Erstelle Batch-Analyse Bericht"""
-    report = f"""# 🤖 JL BATCH-ANALYSE BERICHT
+# Exporte: erst beim Klick erzeugt und blockweise in eine Temp-Datei geschrieben
+EXPORT_CHUNK_ROWS = 500
+PDF_LINE_WIDTH = 100
+PDF_LINES_PER_PAGE = 68
+# Symbole ohne Entsprechung in WinAnsi (Standardschrift im PDF)
+PDF_SYMBOLS = {'🔥': '[!!]', '⚡': '[!]', '→': '->', '–': '-'}
 
-**Datum:** {datetime.now().strftime('%d.%m.%Y %H:%M')}
-**Anzahl Zeitungen:** {len(analyses)}
+def spool_export(write) -> bytes:
+    """write(out) blockweise in eine Temp-Datei schreiben lassen - im Speicher liegt am Ende nur das Ergebnis"""
+    fd, path = tempfile.mkstemp(prefix='jl_export_', dir=get_config("PDF_SPOOL_DIR", "") or None)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            write(out)
+        with open(path, 'rb') as f:
+            return f.read()
+    finally:
+        os.remove(path)
 
----
+def frame_chunks(df):
+    for start in range(0, max(len(df), 1), EXPORT_CHUNK_ROWS):
+        yield start, df.iloc[start:start + EXPORT_CHUNK_ROWS]
 
-## 📊 ZUSAMMENFASSUNG
+def write_csv_export(df, out):
+    for start, chunk in frame_chunks(df):
+        out.write(chunk.to_csv(index=False, header=start == 0).encode('utf-8'))
 
-"""
+def write_jsonl_export(df, out):
+    for _, chunk in frame_chunks(df):
+        if not chunk.empty:
+            lines = chunk.to_json(orient='records', lines=True, force_ascii=False, date_format='iso')
+            out.write(lines.rstrip('\n').encode('utf-8') + b'\n')
+
+def write_parquet_export(df, out):
+    """Parquet mit einer Row-Group pro Block (benötigt pyarrow)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    # Schema aus dem ganzen Frame, damit Blöcke mit nur leeren Werten passen
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(out, schema) as parquet_writer:
+        for _, chunk in frame_chunks(df):
+            parquet_writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv', write_csv_export),
+    'JSON Lines': ('jsonl', 'application/x-ndjson', write_jsonl_export),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet', write_parquet_export),
+}
+
+def export_buttons(df, base_name: str, key: str, prepare=None):
+    """Download-Buttons je Format - der Export (und prepare, z.B. Nachladen von Spalten) entsteht erst beim Klick"""
+    formats = [label for label in EXPORT_FORMATS
+               if label != 'Parquet' or importlib.util.find_spec('pyarrow') is not None]
+    for col, label in zip(st.columns(len(formats)), formats):
+        extension, mime, write = EXPORT_FORMATS[label]
+        with col:
+            st.download_button(
+                label=f"📥 {label}",
+                data=lambda write=write: spool_export(lambda out: write(prepare(df) if prepare else df, out)),
+                file_name=f"{base_name}.{extension}",
+                mime=mime,
+                key=f"{key}_{extension}",
+                use_container_width=True
+            )
+
+def wrap_text(text: str, width: int) -> list:
+    lines, current = [], ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}".strip()
+    if current:
+        lines.append(current)
+    return lines
+
+def markdown_pdf_pages(sections, width: int = PDF_LINE_WIDTH, lines_per_page: int = PDF_LINES_PER_PAGE):
+    """Markdown-Abschnitte als reine Textzeilen, seitenweise (Generator)"""
+    page = []
+    for section in sections:
+        for raw_line in section.splitlines():
+            for symbol, replacement in PDF_SYMBOLS.items():
+                raw_line = raw_line.replace(symbol, replacement)
+            # Übrige Emojis entfallen (nicht in der Standardschrift)
+            raw_line = raw_line.encode('cp1252', errors='ignore').decode('cp1252')
+            line = re.sub(r'^#+\s*', '', raw_line).replace('**', '').replace('`', '').strip()
+            if line == '---':
+                line = '-' * 40
+            for wrapped in wrap_text(line, width) or [""]:
+                page.append(wrapped)
+                if len(page) == lines_per_page:
+                    yield page
+                    page = []
+    if page:
+        yield page
+
+def write_text_pdf(pages, out):
+    """Minimales PDF (Helvetica, WinAnsi) mit einer Textspalte pro Seite - Seite für Seite geschrieben"""
+    def escape(line: str) -> bytes:
+        raw = line.encode('cp1252', errors='ignore')
+        return raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+    
+    offsets = {}
+    position = 0
     
+    def write_object(obj_id: int, body: bytes):
+        nonlocal position
+        offsets[obj_id] = position
+        data = f"{obj_id} 0 obj\n".encode() + body + b"\nendobj\n"
+        out.write(data)
+        position += len(data)
+    
+    header = b"%PDF-1.4\n"
+    out.write(header)
+    position = len(header)
+    
+    font_id = 3
+    write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    write_object(font_id, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    
+    page_ids = []
+    next_id = 4
+    for lines in pages:
+        content = b"BT /F1 9 Tf 11 TL 40 800 Td\n" + b"".join(b"(" + escape(l) + b") Tj T*\n" for l in lines) + b"ET"
+        page_id, content_id = next_id, next_id + 1
+        next_id += 2
+        page_ids.append(page_id)
+        write_object(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode())
+        write_object(content_id, f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+    
+    # Seitenbaum zuletzt - erst jetzt sind alle Seiten bekannt
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode())
+    
+    xref = position
+    out.write(f"xref\n0 {next_id}\n0000000000 65535 f \n".encode())
+    for obj_id in range(1, next_id):
+        out.write(f"{offsets[obj_id]:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {next_id} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+def write_markdown_export(sections, out):
+    for section in sections:
+        out.write(section.encode('utf-8'))
+
+def pdf_export(sections_factory):
+    """Download-Daten für einen PDF-Bericht (sections_factory liefert die Markdown-Abschnitte)"""
+    return lambda: spool_export(lambda out: write_text_pdf(markdown_pdf_pages(sections_factory()), out))
+
+def iter_batch_report(analyses):
+    """Batch-Bericht abschnittsweise: Kopf mit Zusammenfassung, dann je Zeitung ein Abschnitt"""
     # Zähle Prioritäten
     total_highest = 0
     total_high = 0
@@ -1490,7 +5321,15 @@ def create_batch_report(analyses):
         total_highest += analysis_data['analysis'].count('🔥')
         total_high += analysis_data['analysis'].count('⚡')
     
-    report += f"""
+    yield f"""# 🤖 JL BATCH-ANALYSE BERICHT
+
+**Datum:** {datetime.now().strftime('%d.%m.%Y %H:%M')}
+**Anzahl Zeitungen:** {len(analyses)}
+
+---
+
+## 📊 ZUSAMMENFASSUNG
+
 - 🔥 **Höchste Priorität gesamt:** {total_highest} Artikel
 - ⚡ **Hohe Priorität gesamt:** {total_high} Artikel
 - 📰 **Analysierte Zeitungen:** {len(analyses)}
@@ -1501,12 +5340,428 @@ def create_batch_report(analyses):
 """
     
     for analysis_data in analyses:
-        report += f"\n### 📄 {analysis_data['filename']}\n"
-        report += f"*Analysiert: {analysis_data['date']}*\n\n"
-        report += analysis_data['analysis']
-        report += "\n\n---\n"
+        yield (f"\n### 📄 {analysis_data['filename']}\n"
+               f"*Analysiert: {analysis_data['date']}*\n\n"
+               f"{analysis_data['analysis']}\n\n---\n")
+
+def show_batch_report(analyses, key: str):
+    """Bericht abschnittsweise anzeigen und Downloads (Markdown, PDF, Tabellen) anbieten"""
+    with st.expander("📄 Gesamtbericht anzeigen", expanded=True):
+        for section in iter_batch_report(analyses):
+            st.markdown(section)
+    
+    stamp = datetime.now().strftime('%Y%m%d_%H%M')
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            label="📥 Bericht als Markdown",
+            data=lambda: spool_export(lambda out: write_markdown_export(iter_batch_report(analyses), out)),
+            file_name=f"JL_Batch_{stamp}.md",
+            mime="text/markdown",
+            key=f"{key}_md",
+            use_container_width=True
+        )
+    with col2:
+        st.download_button(
+            label="📄 Bericht als PDF",
+            data=pdf_export(lambda: iter_batch_report(analyses)),
+            file_name=f"JL_Batch_{stamp}.pdf",
+            mime="application/pdf",
+            key=f"{key}_pdf",
+            use_container_width=True
+        )
+    
+    export_buttons(pd.DataFrame(analyses), f"JL_Analysen_{stamp}", key)
+
+# Wochenüberblick: aus gespeicherten Analysen - nur kompakte Zusammenfassungen gehen ans Modell
+# Geschichten gleich, wenn sie sich genug seltene Wortstämme teilen (Anteil am kürzeren Artikel)
+DIGEST_CLUSTER_THRESHOLD = 0.5
+DIGEST_MIN_SHARED_WORDS = 2
+# Wörter in mehr als diesem Anteil aller Artikel (Ortsnamen, "Stadtrat") tragen nichts zur Zuordnung bei
+DIGEST_COMMON_WORD_SHARE = 0.2
+DIGEST_MAX_STORIES = 60
+
+def week_bounds(day: date) -> tuple:
+    """Montag und Sonntag der Woche, in der day liegt"""
+    monday = day - timedelta(days=day.weekday())
+    return monday, monday + timedelta(days=6)
+
+def digest_period(date_from: date, date_to: date) -> str:
+    """Cache-Schlüssel: ISO-Woche (z.B. 2026-W11), sonst der Zeitraum"""
+    if date_from.weekday() == 0 and date_to == date_from + timedelta(days=6):
+        year, week, _ = date_from.isocalendar()
+        return f"{year}-W{week:02d}"
+    return f"{date_from.isoformat()}..{date_to.isoformat()}"
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_digest_sources(date_from: str, date_to: str) -> list:
+    """Gespeicherte Analysen eines Zeitraums (nach Ausgabedatum) - ohne Zeitungstext"""
+    response = init_supabase().table('jl_articles').select(
+        "article_hash, pdf_name, pdf_date, analysis"
+    ).gte('pdf_date', date_from).lte('pdf_date', date_to).order('pdf_date').execute()
+    return response.data or []
+
+def story_words(article: dict) -> set:
+    """Wortstämme aus Titel und Kernaussage für den Geschichten-Vergleich"""
+    text = f"{article.get('titel', '')} {article.get('inhalt', '')}"
+    return {
+        stem_word(word) for word in re.findall(r'\w+', text)
+        if len(word) > 3 and word.lower() not in ENTITY_STOPWORDS
+    }
+
+def cluster_digest_articles(rows: list) -> list:
+    """Artikel aller Ausgaben zu Geschichten bündeln - wiederkehrende Berichte über mehrere Tage zusammen"""
+    items = [
+        {**article, 'pdf_name': row['pdf_name'], 'pdf_date': row['pdf_date'], 'words': story_words(article)}
+        for row in rows for article in parse_analysis_articles(row.get('analysis'))
+    ]
+    
+    frequency = {}
+    for item in items:
+        for word in item['words']:
+            frequency[word] = frequency.get(word, 0) + 1
+    common = {word for word, count in frequency.items() if count > max(2, len(items) * DIGEST_COMMON_WORD_SHARE)}
+    for item in items:
+        item['words'] -= common
+    
+    # Union-Find; verglichen werden nur Artikel mit mindestens einem gemeinsamen Wortstamm
+    parent = list(range(len(items)))
+    
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    by_word = {}
+    for i, item in enumerate(items):
+        for word in item['words']:
+            by_word.setdefault(word, []).append(i)
+    
+    for i, item in enumerate(items):
+        candidates = {j for word in item['words'] for j in by_word[word] if j > i}
+        for j in candidates:
+            shared = len(item['words'] & items[j]['words'])
+            shorter = min(len(item['words']), len(items[j]['words']))
+            if shared >= DIGEST_MIN_SHARED_WORDS and shared / shorter >= DIGEST_CLUSTER_THRESHOLD:
+                parent[find(j)] = find(i)
+    
+    groups = {}
+    for i, item in enumerate(items):
+        groups.setdefault(find(i), []).append(item)
+    
+    stories = []
+    for members in groups.values():
+        # Stellvertreter: höchste Priorität, dann die ausführlichste Kernaussage
+        lead = max(members, key=lambda a: ('Höchste' in a['kategorie'], len(a.get('inhalt', ''))))
+        stories.append({
+            'titel': lead['titel'],
+            'inhalt': lead.get('inhalt', ''),
+            'prioritaet': 'Höchste' if 'Höchste' in lead['kategorie'] else 'Hohe',
+            'tage': sorted({member['pdf_date'] for member in members}),
+            'erwaehnungen': len(members),
+            'quellen': [
+                {'pdf_name': member['pdf_name'], 'pdf_date': member['pdf_date'],
+                 'seite': member.get('seite', ''), 'titel': member['titel']}
+                for member in sorted(members, key=lambda member: member['pdf_date'])
+            ],
+        })
+    
+    stories.sort(key=lambda story: (story['prioritaet'] != 'Höchste', -len(story['tage']),
+                                    -story['erwaehnungen'], story['tage'][0]))
+    return stories
+
+def digest_story_lines(stories: list) -> str:
+    """Kompakte Eingabe für die Synthese: eine Zeile pro Geschichte"""
+    lines = []
+    for number, story in enumerate(stories[:DIGEST_MAX_STORIES], 1):
+        days = ", ".join(datetime.strptime(day, '%Y-%m-%d').strftime('%d.%m.') for day in story['tage'])
+        lines.append(f"GESCHICHTE {number} [{story['prioritaet']}] ({story['erwaehnungen']}x, {days}): "
+                     f"{story['titel']} - {story['inhalt']}")
+    return "\n".join(lines)
+
+def digest_source_hash(rows: list, model_name: str) -> str:
+    """Ändert sich mit jeder neuen oder neu analysierten Ausgabe, mit Modell und Prompt"""
+    key = "\n".join([model_name, template_instructions('digest'), *sorted(row['article_hash'] for row in rows)])
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+def digests_path() -> str:
+    return os.path.join(get_local_cache_dir('index'), 'digests.json')
+
+def load_stored_digest(period: str, profile_id: str):
+    """Gespeicherten Wochenüberblick holen (Supabase oder lokaler Ersatz)"""
+    if get_config("DIGEST_STORE", "supabase") == 'local':
+        if not os.path.exists(digests_path()):
+            return None
+        with open(digests_path(), encoding='utf-8') as f:
+            return json.load(f).get(f"{period}|{profile_id}")
+    
+    response = init_supabase().table('jl_weekly_digests').select("*").eq(
+        'period', period
+    ).eq('profile_id', profile_id).limit(1).execute()
+    return response.data[0] if response.data else None
+
+def store_digest(record: dict):
+    """Wochenüberblick pro Zeitraum und Profil ersetzen"""
+    if get_config("DIGEST_STORE", "supabase") == 'local':
+        stored = {}
+        if os.path.exists(digests_path()):
+            with open(digests_path(), encoding='utf-8') as f:
+                stored = json.load(f)
+        stored[f"{record['period']}|{record['profile_id']}"] = record
+        with open(digests_path(), 'w', encoding='utf-8') as f:
+            json.dump(stored, f, ensure_ascii=False)
+        return
+    
+    init_supabase().table('jl_weekly_digests').upsert(record, on_conflict='period,profile_id').execute()
+
+def build_digest(date_from: date, date_to: date, api_key: str, force: bool = False):
+    """Wochenüberblick aus gespeicherten Analysen - neu erzeugt nur, wenn sich die Ausgaben geändert haben"""
+    profile = get_active_profile()
+    period = digest_period(date_from, date_to)
+    
+    with perf_span('digest_load'):
+        rows = load_digest_sources(date_from.isoformat(), date_to.isoformat())
+    if not rows:
+        return None
+    
+    model_name = get_model_config()['full_model']
+    source_hash = digest_source_hash(rows, model_name)
+    stored = None if force else load_stored_digest(period, profile['id'])
+    if stored and stored['source_hash'] == source_hash:
+        return {**stored, 'cached': True}
+    
+    with perf_span('digest_cluster', issues=len(rows)) as span:
+        stories = cluster_digest_articles(rows)
+        span['stories'] = len(stories)
+    
+    usage = {}
+    if stories:
+        model = create_prompt_model('digest', model_name, api_key)
+        prompt = render_prompt('digest', period=f"{date_from:%d.%m.%Y} - {date_to:%d.%m.%Y}",
+                               stories=digest_story_lines(stories))
+        digest = generate(model, prompt, usage).text
+    else:
+        digest = "❌ Keine relevanten lokalen/regionalen Artikel in diesem Zeitraum."
+    
+    record = {
+        'period': period,
+        'profile_id': profile['id'],
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'source_hash': source_hash,
+        'digest': digest,
+        'stories': stories,
+        'issue_count': len(rows),
+        'article_count': sum(story['erwaehnungen'] for story in stories),
+        'prompt_tokens': usage.get('prompt_tokens', 0),
+        'output_tokens': usage.get('output_tokens', 0),
+        'created_at': datetime.now().astimezone().isoformat(),
+    }
+    store_digest(record)
+    return {**record, 'cached': False}
+
+def iter_digest_report(digest: dict):
+    """Wochenüberblick abschnittsweise für Anzeige und Export"""
+    date_from = datetime.strptime(digest['date_from'], '%Y-%m-%d')
+    date_to = datetime.strptime(digest['date_to'], '%Y-%m-%d')
+    yield (f"# 🗓️ JL WOCHENÜBERBLICK {date_from:%d.%m.} - {date_to:%d.%m.%Y}\n\n"
+           f"**Ausgaben:** {digest['issue_count']} · **Artikel:** {digest['article_count']} · "
+           f"**Geschichten:** {len(digest['stories'])}\n\n---\n\n")
+    yield digest['digest'] + "\n\n---\n\n"
+    
+    recurring = [story for story in digest['stories'] if len(story['tage']) > 1]
+    if recurring:
+        yield "## 🧵 Wiederkehrende Geschichten\n\n"
+        for story in recurring:
+            days = ", ".join(datetime.strptime(day, '%Y-%m-%d').strftime('%d.%m.') for day in story['tage'])
+            yield f"- **{story['titel']}** ({story['erwaehnungen']}x: {days})\n"
+
+def weekly_digest_section():
+    """Wochenüberblick aus den gespeicherten Analysen einer Woche"""
+    st.markdown("### 🗓️ Wochenüberblick")
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        day = st.date_input("Woche (beliebiger Tag)", value=date.today() - timedelta(days=7), key="digest_week")
+    with col2:
+        force = st.checkbox("Neu erzeugen", key="digest_force",
+                            help="Auch dann neu erzeugen, wenn seit dem letzten Mal keine Ausgabe dazugekommen ist")
+    date_from, date_to = week_bounds(day)
+    
+    if st.button(f"🗓️ Überblick {date_from:%d.%m.} - {date_to:%d.%m.%Y} erstellen", key="digest_build"):
+        try:
+            with st.spinner("🧵 Bündle Geschichten der Woche..."), \
+                    perf_run(f"Wochenüberblick {digest_period(date_from, date_to)}", 'digest'):
+                st.session_state['weekly_digest'] = build_digest(date_from, date_to, get_gemini_api_key(), force)
+        except Exception as e:
+            st.error(f"❌ Wochenüberblick fehlgeschlagen: {str(e)}")
+            return
+        if st.session_state['weekly_digest'] is None:
+            st.info("📭 Für diese Woche sind keine Analysen gespeichert.")
+    
+    digest = st.session_state.get('weekly_digest')
+    if not digest:
+        return
+    
+    if digest.get('cached'):
+        st.caption(f"♻️ Aus dem Cache (erstellt {pd.to_datetime(digest['created_at']):%d.%m.%Y %H:%M}) - "
+                   f"keine neuen Ausgaben seitdem")
+    else:
+        st.caption(f"🧵 {digest['issue_count']} Ausgaben · {digest['article_count']} Artikel → "
+                   f"{len(digest['stories'])} Geschichten · {digest['prompt_tokens']} Prompt-Tokens")
+    
+    for section in iter_digest_report(digest):
+        st.markdown(section)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            label="📥 Überblick als Markdown",
+            data=lambda: spool_export(lambda out: write_markdown_export(iter_digest_report(digest), out)),
+            file_name=f"JL_Woche_{digest['period']}.md",
+            mime="text/markdown",
+            key="digest_md",
+            use_container_width=True
+        )
+    with col2:
+        st.download_button(
+            label="📄 Überblick als PDF",
+            data=pdf_export(lambda: iter_digest_report(digest)),
+            file_name=f"JL_Woche_{digest['period']}.pdf",
+            mime="application/pdf",
+            key="digest_pdf",
+            use_container_width=True
+        )
+
+def snapshot_section():
+    """Ad-hoc-Auswertungen über das ganze Archiv aus dem lokalen Parquet-Snapshot"""
+    st.markdown("### 🗄️ Auswertung über das Archiv")
+    
+    if importlib.util.find_spec('pyarrow') is None:
+        st.info("ℹ️ Für den lokalen Snapshot wird `pyarrow` benötigt.")
+        return
+    
+    refresh = st.button("🔄 Snapshot aktualisieren", key="snapshot_refresh")
+    if refresh or snapshot_is_stale():
+        try:
+            with st.spinner("🗄️ Hole neue Artikel seit dem letzten Stand..."):
+                result = refresh_article_snapshot()
+            if result['added']:
+                st.caption(f"🗄️ {result['added']} neue Artikel übernommen ({', '.join(result['months'])})")
+        except Exception as e:
+            st.warning(f"⚠️ Snapshot nicht aktualisiert, zeige letzten Stand: {e}")
+    
+    watermark = load_snapshot_watermark()
+    if not watermark['rows']:
+        st.info("📭 Der Snapshot ist noch leer.")
+        return
+    st.caption(f"{watermark['rows']} Artikel bis {pd.to_datetime(watermark['created_at']):%d.%m.%Y %H:%M} · "
+               f"aktualisiert {pd.to_datetime(watermark['refreshed_at']):%d.%m.%Y %H:%M}")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        group_by = st.selectbox("Gruppieren nach", ["Monat", "Woche", "Wochentag", "PDF"], key="snapshot_group")
+    with col2:
+        date_label = st.selectbox("Datum", ["Erscheinungsdatum", "Analysezeitpunkt"], key="snapshot_date")
+    with col3:
+        text = st.text_input("Analyse enthält", key="snapshot_text", placeholder="z.B. Radweg")
+    date_range = st.date_input("Zeitraum", value=(), key="snapshot_range")
+    date_from, date_to = (list(date_range) + [None, None])[:2]
+    
+    started = time.perf_counter()
+    result = aggregate_snapshot(group_by, {'Erscheinungsdatum': 'pdf_date', 'Analysezeitpunkt': 'created_at'}[date_label],
+                                text.strip() or None, date_from, date_to or date_from)
+    st.caption(f"⚡ Lokal ausgewertet in {(time.perf_counter() - started) * 1000:.0f} ms")
+    
+    if result.empty:
+        st.info("Keine Artikel für diese Auswahl.")
+        return
+    if group_by != 'PDF':
+        st.bar_chart(result[['Höchste Priorität', 'Hohe Priorität']])
+    st.dataframe(result, use_container_width=True)
+    export_buttons(result.reset_index(), f"JL_Auswertung_{group_by}", key="snapshot_export")
+
+def performance_dashboard():
+    """Stufen-Zeiten, Token und Kosten pro Lauf mit Verlauf"""
+    st.subheader("⏱️ Performance")
+    
+    if IMPORT_TIMES:
+        loaded = " · ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in IMPORT_TIMES.items())
+        st.caption(f"🚀 Nachgeladene Module in diesem Prozess: {loaded}")
+    
+    days = st.selectbox("Zeitraum:", [7, 30, 90], index=1, format_func=lambda d: f"Letzte {d} Tage")
+    
+    try:
+        runs = load_perf_runs(days)
+    except Exception as e:
+        st.error(f"❌ Messdaten konnten nicht geladen werden: {e}")
+        return
+    
+    if not runs:
+        st.info("Noch keine Messläufe gespeichert.")
+        return
+    
+    runs_df = pd.DataFrame([{
+        'run_id': run['run_id'],
+        'Start': pd.to_datetime(run['started_at']),
+        'Datei': run['label'],
+        'Quelle': run['source'],
+        'Status': run['status'],
+        'Dauer (s)': run['duration_ms'] / 1000,
+        'LLM (s)': run['totals']['llm_ms'] / 1000,
+        'Prompt-Tokens': run['totals']['prompt_tokens'],
+        'Antwort-Tokens': run['totals']['output_tokens'],
+        'Retries': run['totals']['retries'],
+        'Kosten ($)': run['totals']['cost_usd'],
+    } for run in runs]).sort_values('Start')
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Läufe", len(runs_df))
+    with col2:
+        st.metric("Ø Dauer", f"{runs_df['Dauer (s)'].mean():.1f} s")
+    with col3:
+        st.metric("Tokens gesamt", f"{int(runs_df['Prompt-Tokens'].sum() + runs_df['Antwort-Tokens'].sum()):,}")
+    with col4:
+        st.metric("Kosten gesamt", f"${runs_df['Kosten ($)'].sum():.3f}")
     
-    return report
+    # Wo geht die Zeit hin? Summe pro Stufe
+    spans_df = pd.DataFrame([
+        {'run_id': run['run_id'], **span} for run in runs for span in run['spans']
+    ])
+    if not spans_df.empty:
+        st.markdown("**Zeit pro Stufe (Ø pro Lauf, s)**")
+        per_stage = spans_df.groupby(['run_id', 'stage'])['duration_ms'].sum().reset_index()
+        stage_avg = per_stage.groupby('stage')['duration_ms'].mean().sort_values(ascending=False) / 1000
+        st.bar_chart(stage_avg)
+    
+    # Verlauf pro Tag - langsame Tage hervorheben
+    runs_df['Tag'] = runs_df['Start'].dt.date
+    daily = runs_df.groupby('Tag').agg({'Dauer (s)': 'mean', 'Kosten ($)': 'sum', 'run_id': 'count'})
+    daily = daily.rename(columns={'run_id': 'Läufe'})
+    st.markdown("**Ø Dauer pro Tag (s)**")
+    st.line_chart(daily['Dauer (s)'])
+    
+    median = daily['Dauer (s)'].median()
+    slow_days = daily[daily['Dauer (s)'] > median * 1.5]
+    if not slow_days.empty:
+        st.warning(f"🐢 {len(slow_days)} langsame Tage (> 1,5× Median von {median:.1f} s)")
+        st.dataframe(slow_days, use_container_width=True)
+    
+    with st.expander("📋 Alle Läufe"):
+        st.dataframe(runs_df.drop(columns=['run_id', 'Tag']).sort_values('Start', ascending=False),
+                     use_container_width=True)
+    
+    # Einzelnen Lauf im Detail
+    labels = {run['run_id']: f"{run['started_at'][:16]} · {run['label']}" for run in runs}
+    selected = st.selectbox("Lauf im Detail:", list(labels), format_func=labels.get)
+    if selected:
+        run = next(r for r in runs if r['run_id'] == selected)
+        if run['spans']:
+            st.dataframe(pd.DataFrame(run['spans']), use_container_width=True)
+        if run['llm_calls']:
+            st.dataframe(pd.DataFrame(run['llm_calls']), use_container_width=True)
 
 def admin_tab():
     """Admin-Tab für Datenmigration und Wartung"""
@@ -1530,14 +5785,12 @@ def admin_tab():
     st.subheader("📊 Database Status")
     
     try:
-        supabase = init_supabase()
-        
-        # Teste Verbindung
-        test_response = supabase.table('jl_articles').select("count", count='exact').limit(1).execute()
+        # Teste Verbindung (Zählwerte kommen gecacht aus dem Statistik-Service)
+        counts = fetch_article_counts()
         
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Gesamt Artikel", test_response.count if hasattr(test_response, 'count') else 0)
+            st.metric("Gesamt Artikel", counts['total'])
         with col2:
             st.metric("Supabase Status", "✅ Verbunden")
         with col3:
@@ -1546,6 +5799,93 @@ def admin_tab():
     except Exception as e:
         st.error(f"❌ Supabase Fehler: {str(e)}")
         st.info("Überprüfe deine Secrets!")
+    
+    # Entitäten-Index
+    st.subheader("🏷️ Entitäten-Index")
+    st.markdown("Personen, Parteien, Schulen, Firmen und Straßen aus allen gespeicherten Analysen neu erkennen - "
+                "z.B. nach der Migration oder wenn der Gazetteer erweitert wurde.")
+    if st.button("🔄 Index neu aufbauen"):
+        with st.spinner("Erkenne Entitäten..."):
+            try:
+                show_bulk_report(rebuild_entity_index(), "Entitäten-Einträge")
+            except Exception as e:
+                st.error(f"❌ Index-Fehler: {str(e)}")
+    
+    # Themen-Zeitreihe
+    st.subheader("📈 Themen-Zeitreihe")
+    st.markdown("Themen-Erwähnungen aller gespeicherten Analysen nach Erscheinungsdatum neu zählen - "
+                "z.B. nach der Migration oder wenn sich die Themen-Stichwörter geändert haben.")
+    if st.button("🔄 Zeitreihe neu aufbauen"):
+        with st.spinner("Zähle Themen..."):
+            try:
+                show_bulk_report(rebuild_theme_series(), "Themen-Einträge")
+            except Exception as e:
+                st.error(f"❌ Zeitreihen-Fehler: {str(e)}")
+    
+    # Performance-Dashboard
+    performance_dashboard()
+    
+    # Prompt-Cache
+    st.subheader("🧠 Prompt-Cache")
+    
+    st.caption(f"Gemini cacht Anweisungen erst ab {get_config('CONTEXT_CACHE_MIN_TOKENS', 32768, int):,} Tokens "
+               f"(CONTEXT_CACHE_MIN_TOKENS) - kürzere laufen als 'local' ohne Rabatt.")
+    cache_entries = list(get_context_cache_registry()['entries'].values())
+    if cache_entries:
+        cache_df = pd.DataFrame([{
+            'Vorlage': entry['template'],
+            'Modell': entry['model'],
+            'Art': entry['kind'],
+            'Anweisungs-Tokens': entry['tokens'],
+            'Aufrufe': entry['hits'],
+            'Läuft ab': datetime.fromtimestamp(entry['expires_at']).strftime('%H:%M'),
+            'Hinweis': entry.get('error', ''),
+        } for entry in cache_entries])
+        st.dataframe(cache_df, use_container_width=True)
+    else:
+        st.info("Noch keine gecachten Anweisungen in diesem Prozess.")
+    
+    # Kaskaden-Kennzahlen
+    st.subheader("💰 Kaskaden-Modus")
+    
+    config = get_model_config()
+    st.caption(
+        f"Triage: `{config['triage_model']}` ({config['triage_mode']}) · "
+        f"Volle Analyse: `{config['full_model']}` · Stichprobe: {config['audit_rate']:.0%}"
+    )
+    
+    cascade_metrics = st.session_state.get('cascade_metrics', [])
+    if cascade_metrics:
+        metrics_df = pd.DataFrame(cascade_metrics)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Tokens gespart", f"{metrics_df['tokens_saved'].sum():,}")
+        with col2:
+            st.metric("Seiten voll analysiert", f"{metrics_df['pages_selected'].sum()}/{metrics_df['pages_total'].sum()}")
+        with col3:
+            st.metric("Verpasste Artikel (hochgerechnet)", f"{metrics_df['estimated_missed'].sum():.1f}")
+        st.dataframe(metrics_df, use_container_width=True)
+    else:
+        st.info("Noch keine Kaskaden-Läufe in dieser Sitzung.")
+    
+    # Seiten-Cache
+    st.subheader("♻️ Seiten-Cache")
+    st.caption(f"Ähnlichkeitsschwelle: {get_config('PAGE_CACHE_SIMILARITY', 0.85, float):.0%} · "
+               f"Prompt-Version: `{page_cache_version(config['full_model'])}`")
+    
+    page_metrics = st.session_state.get('page_cache_metrics', [])
+    if page_metrics:
+        page_df = pd.DataFrame(page_metrics)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Seiten wiederverwendet", f"{page_df['pages_reused'].sum()}/{page_df['pages_total'].sum()}")
+        with col2:
+            st.metric("Ø Wiederverwendung", f"{page_df['reuse_ratio'].mean():.0%}")
+        with col3:
+            st.metric("Artikel aus dem Cache", int(page_df['articles_reused'].sum()))
+        st.dataframe(page_df, use_container_width=True)
+    else:
+        st.info("Noch keine Analysen mit Seiten-Cache in dieser Sitzung.")
 
 def main_app():
     """Hauptanwendung nach Login"""
@@ -1558,10 +5898,11 @@ def main_app():
         st.markdown(f"👤 {st.session_state.get('username', 'User')}")
         if st.button("🚪 Logout", use_container_width=True):
             st.session_state.logged_in = False
+            st.session_state.pop('feed_since', None)
             st.rerun()
     
     # Tab-Navigation
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📤 Neue Analyse", "🔍 Artikel-Suche", "📊 Statistiken", "🤖 Automatisierung", "🔧 Admin"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📤 Neue Analyse", f"🔍 Artikel-Suche{new_articles_badge()}", "📊 Statistiken", "🤖 Automatisierung", "🔧 Admin"])
     
     with tab1:
         analyze_tab()
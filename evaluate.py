@@ -0,0 +1,321 @@
+"""
+Evaluation von Prompt-, Modell- und Chunking-Varianten gegen einen Gold-Satz.
+
+Jede Variante (eval/variants.json) analysiert alle Ausgaben des Gold-Satzes
+(eval/gold.json) - parallel, live gegen Gemini oder mit aufgezeichneten
+Antworten (LLM_BACKEND=record/replay). Pro Variante werden Precision, Recall,
+Seiten-Treffer, Tokens und Zeit ausgegeben, dazu die günstigste Variante, die den
+geforderten Recall hält.
+
+Ohne --backend läuft der lokale Gemini-Ersatz: schnell und ohne Schlüssel, aber
+seine Zahlen sagen nichts über Prompt-Qualität - dafür record/replay verwenden.
+
+Beispiel:
+    python evaluate.py                                  # Pipeline-Check mit dem Ersatz
+    python evaluate.py --backend record --workers 4     # einmal live aufnehmen
+    python evaluate.py --backend replay --min-recall 0.9
+    python evaluate.py --only standard,chunks-20k --details --json eval.json
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark import percentile, quiet_streamlit
+
+EVAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eval')
+
+# Varianten-Felder, die direkt in get_model_config() übernommen werden
+CONFIG_OVERRIDES = ['triage_model', 'triage_mode', 'local_min_hits', 'triage_page_chars', 'triage_batch_pages']
+
+# Mindestanteil der Titelwörter eines Gold-Artikels, die im gefundenen Titel vorkommen müssen
+TITLE_MATCH_THRESHOLD = 0.5
+
+# ---------------------------------------------------------------------------
+# Gold-Satz und Varianten
+# ---------------------------------------------------------------------------
+
+def load_json(path: str):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def load_variants(path: str, only: str = None) -> list:
+    """Varianten laden - Prompt-Dateien relativ zur Varianten-Datei auflösen"""
+    variants = load_json(path)
+    if only:
+        wanted = {name.strip() for name in only.split(',')}
+        unknown = wanted - {variant['name'] for variant in variants}
+        if unknown:
+            raise SystemExit(f"Unbekannte Varianten: {', '.join(sorted(unknown))}")
+        variants = [variant for variant in variants if variant['name'] in wanted]
+
+    base = os.path.dirname(os.path.abspath(path))
+    for variant in variants:
+        variant['prompts'] = {
+            template_name: os.path.join(base, prompt_path)
+            for template_name, prompt_path in variant.get('prompts', {}).items()
+        }
+    return variants
+
+def issue_text(app, issue: dict) -> str:
+    """Seiten einer Gold-Ausgabe wie nach der Textextraktion mit [SEITE n] markieren"""
+    return app.join_pages(list(enumerate(issue['pages'], 1)))
+
+# ---------------------------------------------------------------------------
+# Varianten ausführen
+# ---------------------------------------------------------------------------
+
+class TrackedModel:
+    """Modell-Hülle, die Fehler mitschreibt - die Pipeline fängt sie pro Chunk ab"""
+
+    def __init__(self, model):
+        self.model = model
+        self.model_name = model.model_name
+        self.errors = []
+
+    def generate_content(self, prompt: str, **kwargs):
+        try:
+            return self.model.generate_content(prompt, **kwargs)
+        except Exception as e:
+            self.errors.append(str(e))
+            raise
+
+def variant_model(app, variant: dict, template_name: str, model_name: str, api_key: str) -> TrackedModel:
+    """Prompt-Modell einer Variante - eigene Anweisungen werden wie die Vorlagen aus dem Profil gefüllt"""
+    instructions = None
+    prompt_path = variant['prompts'].get(template_name)
+    if prompt_path:
+        with open(prompt_path, encoding='utf-8') as f:
+            instructions = f.read().format(**app.profile_prompt_values(app.get_active_profile()))
+    return TrackedModel(app.create_prompt_model(template_name, model_name, api_key, instructions=instructions))
+
+def analyze_text(app, variant: dict, text: str, model_name: str, api_key: str, usage: dict, models: list) -> list:
+    """Wie analyze_full: komplett oder in Chunks, je nach Modus und chunk_size"""
+    mode = variant.get('mode', 'auto')
+    chunk_size = variant.get('chunk_size', 50000)
+
+    if mode == 'complete' or (mode != 'chunked' and len(text) <= chunk_size):
+        model = variant_model(app, variant, 'complete', model_name, api_key)
+        models.append(model)
+        return app.parse_analysis_articles(app.analyze_complete_text(text, model, usage))
+
+    model = variant_model(app, variant, 'chunk', model_name, api_key)
+    models.append(model)
+    return app.collect_chunk_articles(text, model, chunk_size, usage)
+
+def run_variant(app, variant: dict, issue: dict, api_key: str) -> dict:
+    """Eine Variante auf eine Gold-Ausgabe anwenden"""
+    config = {**app.get_model_config(), **{key: variant[key] for key in CONFIG_OVERRIDES if key in variant}}
+    model_name = variant.get('model', config['full_model'])
+    text = issue_text(app, issue)
+    usage = {}
+    models = []
+    error = None
+
+    start = time.perf_counter()
+    try:
+        if variant.get('mode') == 'cascade':
+            # Kaskade ohne Stichprobe verworfener Seiten - die ist zufällig und nicht vergleichbar
+            pages = app.split_pages(text)
+            relevant = app.triage_pages(pages, api_key, config, usage)
+            selected = [(n, t) for n, t in pages if n in relevant]
+            articles = analyze_text(app, variant, app.join_pages(selected), model_name, api_key,
+                                    usage, models) if selected else []
+        else:
+            articles = analyze_text(app, variant, text, model_name, api_key, usage, models)
+    except Exception as e:
+        articles = []
+        error = str(e)
+    elapsed = time.perf_counter() - start
+
+    errors = [message for model in models for message in model.errors]
+    if error:
+        errors.append(error)
+
+    return {
+        'variant': variant['name'],
+        'issue': issue['id'],
+        'articles': articles,
+        'usage': usage,
+        'seconds': elapsed,
+        'errors': sorted(set(errors)),
+    }
+
+# ---------------------------------------------------------------------------
+# Bewertung
+# ---------------------------------------------------------------------------
+
+def title_words(text: str) -> set:
+    return {word for word in re.findall(r'\w+', text.lower()) if len(word) > 3}
+
+def match_articles(app, expected: list, found: list) -> list:
+    """Gold-Artikel den gefundenen zuordnen (je höchstens einmal) -> [(gold, gefunden oder None)]"""
+    unused = list(found)
+    pairs = []
+    for gold in expected:
+        words = title_words(gold['titel'])
+        best, best_score = None, 0.0
+        for article in unused:
+            overlap = len(words & title_words(article.get('titel', ''))) / max(1, len(words))
+            # Bei gleicher Wortüberdeckung gewinnt der Artikel auf der richtigen Seite
+            score = overlap + (0.01 if app.article_page_number(article) == gold['seite'] else 0)
+            if overlap >= TITLE_MATCH_THRESHOLD and score > best_score:
+                best, best_score = article, score
+        if best is not None:
+            unused.remove(best)
+        pairs.append((gold, best))
+    return pairs
+
+def score_run(app, run: dict, issue: dict) -> dict:
+    """Treffer einer Ausführung zählen"""
+    pairs = match_articles(app, issue['expected'], run['articles'])
+    matched = [(gold, article) for gold, article in pairs if article is not None]
+    return {
+        'expected': len(issue['expected']),
+        'found': len(run['articles']),
+        'matched': len(matched),
+        'page_correct': sum(1 for gold, article in matched if app.article_page_number(article) == gold['seite']),
+        'missed': [gold['titel'] for gold, article in pairs if article is None],
+        'extra': [
+            article.get('titel', '') for article in run['articles']
+            if not any(article is found for _, found in matched)
+        ],
+    }
+
+def summarize(variant: dict, runs: list, scores: list) -> dict:
+    """Kennzahlen einer Variante über alle Ausgaben (Mikro-Mittel)"""
+    expected = sum(score['expected'] for score in scores)
+    found = sum(score['found'] for score in scores)
+    matched = sum(score['matched'] for score in scores)
+    prompt_tokens = sum(run['usage'].get('prompt_tokens', 0) for run in runs)
+    output_tokens = sum(run['usage'].get('output_tokens', 0) for run in runs)
+    seconds = [run['seconds'] for run in runs]
+
+    return {
+        'name': variant['name'],
+        'variant': variant,
+        'precision': matched / found if found else 0.0,
+        'recall': matched / expected if expected else 0.0,
+        'page_accuracy': sum(score['page_correct'] for score in scores) / matched if matched else 0.0,
+        'prompt_tokens': prompt_tokens,
+        'output_tokens': output_tokens,
+        'cached_tokens': sum(run['usage'].get('cached_tokens', 0) for run in runs),
+        'calls': sum(run['usage'].get('calls', 0) for run in runs),
+        'total_tokens': prompt_tokens + output_tokens,
+        'seconds_total': sum(seconds),
+        'seconds_p50': percentile(seconds, 0.5),
+        'errors': sorted({message for run in runs for message in run['errors']}),
+        'issues': {
+            run['issue']: {'missed': score['missed'], 'extra': score['extra']}
+            for run, score in zip(runs, scores)
+        },
+    }
+
+def pick_cheapest(results: list, min_recall: float):
+    """Günstigste fehlerfreie Variante (Tokens, dann Zeit), die den Mindest-Recall hält"""
+    eligible = [result for result in results if result['recall'] >= min_recall and not result['errors']]
+    if not eligible:
+        return None
+    return min(eligible, key=lambda result: (result['total_tokens'], result['seconds_total']))
+
+# ---------------------------------------------------------------------------
+# Ablauf
+# ---------------------------------------------------------------------------
+
+def run_evaluation(args) -> dict:
+    os.environ.update({
+        'LLM_BACKEND': args.backend,
+        'LLM_FAKE_LATENCY': str(args.latency),
+        'STREAMLIT_LOGGER_LEVEL': 'error',
+    })
+
+    import app
+    quiet_streamlit()
+    for module in app.LAZY_MODULES:
+        module.load()
+
+    gold = load_json(args.gold)
+    variants = load_variants(args.variants, args.only)
+    api_key = app.get_gemini_api_key()
+    if not api_key:
+        raise SystemExit("GEMINI_API_KEY fehlt - für Offline-Läufe --backend replay oder fake verwenden")
+
+    jobs = [(variant, issue) for variant in variants for issue in gold['issues']]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        runs = list(pool.map(lambda job: run_variant(app, job[0], job[1], api_key), jobs))
+    elapsed = time.perf_counter() - started
+
+    issues = {issue['id']: issue for issue in gold['issues']}
+    results = []
+    for variant in variants:
+        variant_runs = [run for run in runs if run['variant'] == variant['name']]
+        scores = [score_run(app, run, issues[run['issue']]) for run in variant_runs]
+        results.append(summarize(variant, variant_runs, scores))
+
+    cheapest = pick_cheapest(results, args.min_recall)
+    return {
+        'config': vars(args),
+        'elapsed_s': elapsed,
+        'issues': len(gold['issues']),
+        'expected_articles': sum(len(issue['expected']) for issue in gold['issues']),
+        'results': results,
+        'cheapest': cheapest['name'] if cheapest else None,
+    }
+
+def print_report(report: dict, details: bool = False):
+    print(f"\n🧪 {len(report['results'])} Varianten × {report['issues']} Ausgaben "
+          f"({report['expected_articles']} Gold-Artikel) in {report['elapsed_s']:.2f}s\n")
+    print(f"   {'Variante':<22}{'Precision':>10}{'Recall':>8}{'Seite ok':>10}{'Prompt-Tok':>12}"
+          f"{'Output-Tok':>12}{'Aufrufe':>9}{'Zeit s':>8}{'p50 s':>8}")
+    for result in sorted(report['results'], key=lambda result: result['total_tokens']):
+        marker = " ✅" if result['name'] == report['cheapest'] else ""
+        print(f"   {result['name']:<22}{result['precision']:>10.2f}{result['recall']:>8.2f}"
+              f"{result['page_accuracy']:>10.2f}{result['prompt_tokens']:>12}{result['output_tokens']:>12}"
+              f"{result['calls']:>9}{result['seconds_total']:>8.2f}{result['seconds_p50']:>8.2f}{marker}")
+
+    for result in report['results']:
+        if result['errors']:
+            print(f"\n   ⚠️ {result['name']}: {len(result['errors'])} Fehler, z.B. {result['errors'][0]}")
+        if not details:
+            continue
+        for issue_id, issue in result['issues'].items():
+            for title in issue['missed']:
+                print(f"   - {result['name']} / {issue_id}: verpasst „{title}“")
+            for title in issue['extra']:
+                print(f"   + {result['name']} / {issue_id}: zusätzlich „{title}“")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Prompt-/Modell-/Chunking-Varianten gegen den Gold-Satz bewerten")
+    parser.add_argument('--gold', default=os.path.join(EVAL_DIR, 'gold.json'), help="Gold-Satz (JSON)")
+    parser.add_argument('--variants', default=os.path.join(EVAL_DIR, 'variants.json'), help="Varianten (JSON)")
+    parser.add_argument('--only', help="Nur diese Varianten (Namen, kommagetrennt)")
+    parser.add_argument('--backend', choices=['gemini', 'record', 'replay', 'fake'], default='fake',
+                        help="LLM-Backend: lokaler Ersatz (Standard, prüft nur die Pipeline), live, live mit "
+                             "Aufnahme oder aufgezeichnete Antworten (LLM_REPLAY_DIR)")
+    parser.add_argument('--workers', type=int, default=4, help="Parallele Läufe")
+    parser.add_argument('--latency', type=float, default=0.0, help="Grundlatenz des Gemini-Ersatzes (s)")
+    parser.add_argument('--min-recall', type=float, default=0.9,
+                        help="Mindest-Recall für die Empfehlung der günstigsten Variante")
+    parser.add_argument('--details', action='store_true', help="Verpasste und zusätzliche Artikel auflisten")
+    parser.add_argument('--json', help="Ergebnis als JSON speichern")
+    args = parser.parse_args(argv)
+
+    report = run_evaluation(args)
+    print_report(report, args.details)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if report['cheapest'] is None:
+        print(f"\n❌ Keine Variante erreicht Recall {args.min_recall:.2f} ohne Fehler")
+        return 1
+    print(f"\n✅ Günstigste Variante mit Recall ≥ {args.min_recall:.2f}: {report['cheapest']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
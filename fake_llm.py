@@ -0,0 +1,114 @@
+"""Lokaler Gemini-Ersatz für Benchmark, Evaluation und Tests (LLM_BACKEND=fake, siehe create_model in app.py)"""
+import re
+import time
+from types import SimpleNamespace
+
+
+def estimate_tokens(text: str) -> int:
+    """Grobe Token-Schätzung (~4 Zeichen pro Token) - wie estimate_tokens in app.py"""
+    return max(1, len(text) // 4)
+
+
+def split_pages(text: str) -> list:
+    """[(Seite, Text)] anhand der [SEITE n] Markierungen im Prompt - wie split_pages in app.py"""
+    markers = list(re.finditer(r'\[SEITE (\d+)\]', text))
+    if not markers:
+        return [(1, text.strip())] if text.strip() else []
+
+    pages = []
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+        pages.append((int(marker.group(1)), text[marker.end():end].strip()))
+    return pages
+
+
+class FakeResponse:
+    """Antwort-Objekt mit derselben Form wie bei google.generativeai"""
+
+    def __init__(self, text: str, prompt_tokens: int, output_tokens: int, stream: bool = False):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            cached_content_token_count=0,
+        )
+        self._pieces = [text[i:i + 200] for i in range(0, len(text), 200)] if stream else [text]
+
+    def __iter__(self):
+        return iter(SimpleNamespace(text=piece) for piece in self._pieces)
+
+
+class FakeModel:
+    """Deterministische Antworten im erwarteten Format, ohne Netzwerk - erkennt die Stufe am Prompt"""
+
+    def __init__(self, model_name: str, keywords: list, latency: float = 0.0, seconds_per_1k_tokens: float = 0.0):
+        self.model_name = model_name
+        # Regionale Stichwörter des aktiven Profils - Zeilen mit Treffern gelten als relevant
+        self.keywords = keywords
+        self.latency = latency
+        self.seconds_per_1k_tokens = seconds_per_1k_tokens
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        text = self.answer(prompt)
+        output_tokens = estimate_tokens(text)
+        if self.latency or self.seconds_per_1k_tokens:
+            time.sleep(self.latency + output_tokens / 1000 * self.seconds_per_1k_tokens)
+        return FakeResponse(text, estimate_tokens(prompt), output_tokens, stream)
+
+    def relevance_hits(self, text: str, keywords: list = None) -> int:
+        lowered = text.lower()
+        return sum(lowered.count(keyword) for keyword in (keywords or self.keywords))
+
+    def answer(self, prompt: str) -> str:
+        pages = split_pages(prompt)
+
+        # Mehrprofil-Bewertung: ein Artikel passt zu einem Profil, wenn er eine seiner Regionen nennt
+        if 'ARTIKEL <Nummer> | <Profil-ID>' in prompt:
+            profiles = [
+                (profile_id, [word.lower() for word in re.split(r'[\s,-]+', regions) if len(word) > 3])
+                for profile_id, regions in re.findall(r'^PROFIL (\S+) .*\n- Regionen: (.*)$', prompt, re.MULTILINE)
+            ]
+            return "\n".join(
+                f"ARTIKEL {num} | {profile_id}: {'HÖCHSTE' if self.relevance_hits(line, keywords) else 'KEINE'}"
+                f" | Regionaler Bezug."
+                for num, line in re.findall(r'^ARTIKEL (\d+): (.*)$', prompt, re.MULTILINE)
+                for profile_id, keywords in profiles
+            )
+
+        # Wochenüberblick: jede gelieferte Geschichte als Thema übernehmen
+        if 'WOCHENÜBERBLICK' in prompt:
+            stories = re.findall(r'^GESCHICHTE \d+ \[(\w+)\] \((.*?)\): (.*)$', prompt, re.MULTILINE)
+            top = [story for story in stories if story[0] == 'Höchste'] or stories[:3]
+            output = f"## 🗓️ Die Woche in Kürze\n{len(stories)} Geschichten aus der Region.\n\n## 🔥 Top-Themen\n"
+            for _, seen, text in top:
+                output += f"### {text.split(' - ')[0]}\n**Verlauf:** {seen}.\n\n"
+            output += "## ⚡ Weitere Themen\n"
+            for _, _, text in (story for story in stories if story not in top):
+                output += f"- **{text.split(' - ')[0]}**\n"
+            return output
+
+        # Triage: Ja/Nein pro Seite
+        if 'SEITE <Nummer>: JA' in prompt:
+            return "\n".join(
+                f"SEITE {num}: {'JA' if self.relevance_hits(body) else 'NEIN'}" for num, body in pages
+            )
+
+        # Kurze Zeilen mit regionalem Bezug gelten als Überschriften relevanter Artikel
+        structured = 'TITEL:' in prompt
+        blocks = []
+        for num, body in pages:
+            for line in body.splitlines():
+                line = line.strip()
+                if not line or len(line) > 90 or line.endswith('.') or not self.relevance_hits(line):
+                    continue
+                if structured:
+                    blocks.append(
+                        f"TITEL: {line}\nSEITE: {num}\nKATEGORIE: Höchste Priorität\n"
+                        f"INHALT: {line}.\nRELEVANZ: Lokalpolitisch relevant.\n==="
+                    )
+                else:
+                    blocks.append(
+                        f"### 🔥 {line}\n**Seite:** {num}\n**Kernaussage:** {line}.\n"
+                        f"**JuLi-Relevanz:** Lokalpolitisch relevant.\n\n---\n"
+                    )
+        return "\n".join(blocks) or "Keine relevanten lokalen Artikel gefunden."
@@ -0,0 +1,15 @@
+"""OCR für einzelne PDF-Seiten - läuft in eigenen Prozessen (siehe get_ocr_pool in app.py)"""
+
+def ocr_page(pdf_path: str, page_index: int, dpi: int = 300, lang: str = "deu") -> str:
+    """Seite rendern und mit Tesseract erkennen"""
+    # Erst hier importieren: das Modul muss auch ohne OCR-Pakete importierbar bleiben
+    import pypdfium2
+    import pytesseract
+
+    document = pypdfium2.PdfDocument(pdf_path)
+    try:
+        image = document[page_index].render(scale=dpi / 72).to_pil()
+        # Graustufen reichen für Zeitungsdruck und sparen Zeit
+        return pytesseract.image_to_string(image.convert("L"), lang=lang)
+    finally:
+        document.close()
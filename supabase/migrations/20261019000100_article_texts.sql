@@ -0,0 +1,44 @@
+-- Komplette Zeitungstexte getrennt von jl_articles speichern.
+-- jl_articles.full_text enthält nur noch eine kurze Vorschau für Listen-Abfragen.
+-- Seit 20261019001600 schickt der Client nur den Klartext (Spalte body, von Postgres per
+-- TOAST komprimiert); codec/data unten gelten nur noch für den Altbestand.
+
+create table if not exists public.jl_article_texts (
+    article_hash  text primary key,
+    codec         text not null,            -- 'zstd' oder 'gzip' (ab 001600: 'text')
+    data          text not null,            -- Base64 der komprimierten UTF-8-Bytes (Altbestand, ab 001600 null)
+    page_count    integer,
+    char_count    integer,
+    search_vector tsvector,                 -- Suchindex über den kompletten Text
+    created_at    timestamptz not null default now()
+);
+
+create index if not exists jl_article_texts_search_idx
+    on public.jl_article_texts using gin (search_vector);
+
+-- Gebündeltes Speichern (ursprüngliche Fassung, ersetzt durch 20261019001600): der Klartext
+-- (plain) wurde nur für den Suchindex verwendet, abgelegt wurden die komprimierten Bytes.
+create or replace function public.store_article_texts(p_rows jsonb)
+returns integer
+language sql
+as $$
+    insert into public.jl_article_texts
+        (article_hash, codec, data, page_count, char_count, search_vector)
+    select
+        r->>'article_hash',
+        r->>'codec',
+        r->>'data',
+        (r->>'page_count')::integer,
+        (r->>'char_count')::integer,
+        to_tsvector('german', coalesce(r->>'plain', ''))
+    from jsonb_array_elements(p_rows) as r
+    on conflict (article_hash) do update set
+        codec         = excluded.codec,
+        data          = excluded.data,
+        page_count    = excluded.page_count,
+        char_count    = excluded.char_count,
+        search_vector = excluded.search_vector,
+        created_at    = now();
+
+    select jsonb_array_length(p_rows);
+$$;
@@ -0,0 +1,16 @@
+-- Messläufe pro analysierter Ausgabe: Stufen-Zeiten, Gemini-Aufrufe, Token und Kosten.
+
+create table if not exists public.jl_perf_runs (
+    run_id       uuid primary key,
+    label        text,
+    source       text,                      -- upload, drive_newest, drive_batch, manual_batch, ...
+    started_at   timestamptz not null,
+    duration_ms  double precision,
+    status       text not null default 'ok',
+    spans        jsonb not null default '[]'::jsonb,
+    llm_calls    jsonb not null default '[]'::jsonb,
+    totals       jsonb not null default '{}'::jsonb
+);
+
+create index if not exists jl_perf_runs_started_idx
+    on public.jl_perf_runs (started_at desc);
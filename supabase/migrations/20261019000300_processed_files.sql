@@ -0,0 +1,10 @@
+-- Index bereits verarbeiteter PDFs nach Inhalt (MD5 wie Drive's md5Checksum),
+-- damit unveränderte oder umbenannte Dateien vor dem Download übersprungen werden.
+
+create table if not exists public.jl_processed_files (
+    md5_checksum  text primary key,
+    size          bigint,
+    pdf_name      text not null,
+    article_hash  text,
+    processed_at  timestamptz not null default now()
+);
@@ -0,0 +1,11 @@
+-- Claims für laufende Analysen, damit mehrere Instanzen der App
+-- dieselbe PDF nicht gleichzeitig analysieren.
+
+create table if not exists public.jl_analysis_claims (
+    file_key      text primary key,
+    claimed_by    text not null,
+    claimed_at    timestamptz not null default now(),
+    expires_at    timestamptz not null,
+    status        text not null default 'running' check (status in ('running', 'done', 'failed')),
+    article_hash  text
+);
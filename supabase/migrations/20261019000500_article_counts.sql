@@ -0,0 +1,30 @@
+-- Zählwerte für die Metriken in einem einzigen Aufruf,
+-- damit die App dafür keine Artikelzeilen laden muss.
+
+create index if not exists jl_articles_created_at_idx on public.jl_articles (created_at);
+
+create or replace function public.jl_article_counts(p_days integer default 90)
+returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'total',            count(*),
+        'pdfs',             count(distinct pdf_name),
+        'last_created_at',  max(created_at),
+        'highest_articles', count(*) filter (where highest_priority_count > 0),
+        'high_articles',    count(*) filter (where high_priority_count > 0),
+        'highest_mentions', coalesce(sum(highest_priority_count), 0),
+        'high_mentions',    coalesce(sum(high_priority_count), 0),
+        'daily', coalesce((
+            select jsonb_agg(jsonb_build_object('tag', tag, 'anzahl', anzahl) order by tag)
+            from (
+                select created_at::date as tag, count(*) as anzahl
+                from public.jl_articles
+                where created_at >= now() - make_interval(days => p_days)
+                group by 1
+            ) daily
+        ), '[]'::jsonb)
+    )
+    from public.jl_articles;
+$$;
@@ -0,0 +1,8 @@
+-- Pro Nutzer der zuletzt gesehene Artikel (created_at),
+-- damit der "Neu seit deinem letzten Besuch"-Feed nur neuere Zeilen abfragt.
+
+create table if not exists public.jl_user_watermarks (
+    username      text primary key,
+    last_seen_at  timestamptz not null,
+    updated_at    timestamptz not null default now()
+);
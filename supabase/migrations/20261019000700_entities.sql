@@ -0,0 +1,48 @@
+-- Invertierter Index: erkannte Entität (Person, Partei, Schule, ...) -> Artikel.
+-- Wird beim Speichern aus der Analyse befüllt und speist die Facetten der Suche.
+
+create table if not exists public.jl_entities (
+    entity_key    text not null,            -- '<typ>:<name in Kleinbuchstaben>'
+    entity_type   text not null,
+    name          text not null,
+    article_hash  text not null,
+    mentions      integer not null default 1,
+    primary key (entity_key, article_hash)
+);
+
+create index if not exists jl_entities_article_idx on public.jl_entities (article_hash);
+
+-- Facetten-Zähler: Anzahl Artikel und Erwähnungen pro Entität
+create or replace view public.jl_entity_facets as
+select
+    entity_key,
+    entity_type,
+    min(name)      as name,
+    count(*)       as article_count,
+    sum(mentions)  as mentions
+from public.jl_entities
+group by entity_key, entity_type;
+
+-- Entitäten eines Artikels ersetzen (alte Einträge bei Neu-Analyse entfernen)
+create or replace function public.store_article_entities(p_rows jsonb)
+returns integer
+language sql
+as $$
+    delete from public.jl_entities
+    where article_hash in (select r->>'article_hash' from jsonb_array_elements(p_rows) as r);
+
+    insert into public.jl_entities (entity_key, entity_type, name, article_hash, mentions)
+    select
+        e->>'key',
+        e->>'type',
+        e->>'name',
+        r->>'article_hash',
+        (e->>'mentions')::integer
+    from jsonb_array_elements(p_rows) as r,
+         jsonb_array_elements(r->'entities') as e
+    on conflict (entity_key, article_hash) do update set
+        name     = excluded.name,
+        mentions = excluded.mentions;
+
+    select jsonb_array_length(p_rows);
+$$;
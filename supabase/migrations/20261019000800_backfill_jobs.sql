@@ -0,0 +1,10 @@
+-- Checkpoints für den Archiv-Backfill: Dateiliste, Fortschritt pro Datei
+-- und Token-Verbrauch pro Tag, nach jeder Datei aktualisiert.
+
+create table if not exists public.jl_backfill_jobs (
+    job_id      text primary key,
+    status      text not null check (status in ('running', 'paused', 'waiting_budget', 'done')),
+    state       jsonb not null,
+    created_at  timestamptz not null default now(),
+    updated_at  timestamptz not null default now()
+);
@@ -0,0 +1,17 @@
+-- Seiten-Cache: Ergebnisse pro Zeitungsseite, damit Mantelseiten von Regionalausgaben,
+-- Beilagen und Nachdrucke nicht erneut analysiert werden.
+
+create table if not exists public.jl_page_cache (
+    fingerprint     text not null,          -- sha256 des normalisierten Seitentexts
+    prompt_version  text not null,          -- Modell + Prompt, für die das Ergebnis gilt
+    minhash         bigint[] not null default '{}',
+    bands           text[] not null default '{}',   -- LSH-Bänder für fast identische Seiten
+    articles        jsonb not null default '[]'::jsonb,
+    source          text not null default 'full',   -- 'full' oder 'triage:<Konfig-Hash>' (verworfen)
+    page_chars      integer,
+    created_at      timestamptz not null default now(),
+    primary key (fingerprint, prompt_version)
+);
+
+create index if not exists jl_page_cache_bands_idx
+    on public.jl_page_cache using gin (bands);
@@ -0,0 +1,15 @@
+-- Mehrprofil-Modus: eine Analyse pro Ausgabe und Interessenprofil.
+-- jl_articles.analysis enthält weiterhin die Analyse des aktiven Profils.
+
+create table if not exists public.jl_profile_analyses (
+    article_hash            text not null,
+    profile_id              text not null,
+    analysis                text not null,
+    highest_priority_count  integer not null default 0,
+    high_priority_count     integer not null default 0,
+    created_at              timestamptz not null default now(),
+    primary key (article_hash, profile_id)
+);
+
+create index if not exists jl_profile_analyses_profile_idx
+    on public.jl_profile_analyses (profile_id, created_at desc);
@@ -0,0 +1,23 @@
+-- Wochenüberblick: aus den gespeicherten Analysen einer Woche erzeugt und pro
+-- Zeitraum und Profil gecacht. source_hash ändert sich mit jeder neuen Ausgabe,
+-- mit Modell und Prompt - nur dann wird neu erzeugt.
+
+create table if not exists public.jl_weekly_digests (
+    period          text not null,
+    profile_id      text not null,
+    date_from       date not null,
+    date_to         date not null,
+    source_hash     text not null,
+    digest          text not null,
+    stories         jsonb not null default '[]'::jsonb,
+    issue_count     integer not null default 0,
+    article_count   integer not null default 0,
+    prompt_tokens   integer not null default 0,
+    output_tokens   integer not null default 0,
+    created_at      timestamptz not null default now(),
+    primary key (period, profile_id)
+);
+
+-- load_digest_sources filtert jl_articles nach Ausgabedatum
+create index if not exists jl_articles_pdf_date_idx
+    on public.jl_articles (pdf_date);
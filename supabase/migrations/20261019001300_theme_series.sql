@@ -0,0 +1,91 @@
+-- Themen-Zeitreihe nach Erscheinungsdatum (jl_articles.pdf_date) statt Analysezeitpunkt.
+-- jl_article_themes hält die Erwähnungen pro Ausgabe; der Trigger schreibt die
+-- Tagessummen in jl_theme_daily fort (alte Werte ab, neue dazu), sodass Diagramme
+-- nie über alle Analysen rechnen müssen. Thema '*' zählt alle Ausgaben eines Tages.
+
+create table if not exists public.jl_article_themes (
+    article_hash  text primary key,
+    issue_date    date not null,
+    themes        jsonb not null default '{}'::jsonb,   -- {"Verkehr": 3, ...}
+    updated_at    timestamptz not null default now()
+);
+
+create table if not exists public.jl_theme_daily (
+    issue_date  date not null,
+    theme       text not null,
+    mentions    integer not null default 0,
+    issues      integer not null default 0,            -- Ausgaben mit diesem Thema
+    primary key (issue_date, theme)
+);
+
+create or replace function public.jl_apply_theme_delta(p_date date, p_themes jsonb, p_sign integer)
+returns void
+language sql
+as $$
+    insert into public.jl_theme_daily (issue_date, theme, mentions, issues)
+    select p_date, t.key, p_sign * t.value::integer, p_sign
+    from jsonb_each_text(p_themes || '{"*": 0}'::jsonb) as t
+    on conflict (issue_date, theme) do update set
+        mentions = public.jl_theme_daily.mentions + excluded.mentions,
+        issues   = public.jl_theme_daily.issues + excluded.issues;
+
+    delete from public.jl_theme_daily
+    where issue_date = p_date and mentions = 0 and issues = 0;
+$$;
+
+create or replace function public.jl_article_themes_changed()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform public.jl_apply_theme_delta(old.issue_date, old.themes, -1);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform public.jl_apply_theme_delta(new.issue_date, new.themes, 1);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists jl_article_themes_daily on public.jl_article_themes;
+create trigger jl_article_themes_daily
+    after insert or update or delete on public.jl_article_themes
+    for each row execute function public.jl_article_themes_changed();
+
+-- Dichte Tages-Arrays ab dem ersten Erscheinungsdatum:
+-- {"start": "2024-01-02", "issues": [1, 0, ...], "themes": {"Verkehr": [3, 0, ...], ...}}
+create or replace function public.jl_theme_series()
+returns jsonb
+language sql
+stable
+as $$
+    with bounds as (
+        select min(issue_date) as first_day, max(issue_date) as last_day
+        from public.jl_theme_daily
+    ),
+    days as (
+        select generate_series(first_day, last_day, interval '1 day')::date as day
+        from bounds
+        where first_day is not null
+    ),
+    themes as (
+        select distinct theme from public.jl_theme_daily where theme <> '*'
+    ),
+    theme_arrays as (
+        select t.theme, jsonb_agg(coalesce(d.mentions, 0) order by days.day) as counts
+        from themes t
+        cross join days
+        left join public.jl_theme_daily d on d.issue_date = days.day and d.theme = t.theme
+        group by t.theme
+    )
+    select jsonb_build_object(
+        'start',  (select first_day from bounds),
+        'issues', coalesce((
+            select jsonb_agg(coalesce(d.issues, 0) order by days.day)
+            from days
+            left join public.jl_theme_daily d on d.issue_date = days.day and d.theme = '*'
+        ), '[]'::jsonb),
+        'themes', coalesce((select jsonb_object_agg(theme, counts) from theme_arrays), '{}'::jsonb)
+    );
+$$;
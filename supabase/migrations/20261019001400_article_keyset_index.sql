@@ -0,0 +1,5 @@
+-- Keyset-Paginierung über (created_at, id): der Feed blättert absteigend,
+-- Zeilen mit gleichem created_at (Batch-Upserts) werden eindeutig sortiert.
+
+create index if not exists jl_articles_created_at_id_idx
+    on public.jl_articles (created_at, id);
@@ -0,0 +1,128 @@
+-- Zählwerte für die Metriken per Trigger fortschreiben, statt sie bei jedem Aufruf
+-- von jl_article_counts über alle Artikelzeilen zu berechnen.
+-- jl_article_totals hält eine einzige Zeile mit den Summen, jl_article_daily die
+-- Artikel pro Tag, jl_article_pdfs die Zeilen pro PDF (für die Anzahl verschiedener PDFs).
+
+create table if not exists public.jl_article_totals (
+    id                boolean primary key default true check (id),
+    total             bigint not null default 0,
+    pdfs              bigint not null default 0,
+    highest_articles  bigint not null default 0,
+    high_articles     bigint not null default 0,
+    highest_mentions  bigint not null default 0,
+    high_mentions     bigint not null default 0
+);
+
+create table if not exists public.jl_article_daily (
+    tag     date primary key,
+    anzahl  integer not null default 0
+);
+
+create table if not exists public.jl_article_pdfs (
+    pdf_name  text primary key,
+    articles  integer not null default 0
+);
+
+create or replace function public.jl_apply_article_delta(p_row public.jl_articles, p_sign integer)
+returns void
+language plpgsql
+as $$
+declare
+    pdf_rows integer;
+begin
+    if p_row.pdf_name is not null then
+        insert into public.jl_article_pdfs (pdf_name, articles) values (p_row.pdf_name, p_sign)
+        on conflict (pdf_name) do update set articles = public.jl_article_pdfs.articles + excluded.articles
+        returning articles into pdf_rows;
+        delete from public.jl_article_pdfs where pdf_name = p_row.pdf_name and articles = 0;
+    end if;
+
+    update public.jl_article_totals set
+        total            = total + p_sign,
+        -- Ein PDF zählt, sobald es die erste Zeile bekommt, und fällt mit der letzten weg
+        pdfs             = pdfs + case
+                               when p_sign = 1 and pdf_rows = 1 then 1
+                               when p_sign = -1 and pdf_rows = 0 then -1
+                               else 0
+                           end,
+        highest_articles = highest_articles + p_sign * (coalesce(p_row.highest_priority_count, 0) > 0)::integer,
+        high_articles    = high_articles + p_sign * (coalesce(p_row.high_priority_count, 0) > 0)::integer,
+        highest_mentions = highest_mentions + p_sign * coalesce(p_row.highest_priority_count, 0),
+        high_mentions    = high_mentions + p_sign * coalesce(p_row.high_priority_count, 0)
+    where id;
+
+    insert into public.jl_article_daily (tag, anzahl) values (p_row.created_at::date, p_sign)
+    on conflict (tag) do update set anzahl = public.jl_article_daily.anzahl + excluded.anzahl;
+    delete from public.jl_article_daily where tag = p_row.created_at::date and anzahl = 0;
+end;
+$$;
+
+create or replace function public.jl_articles_counted()
+returns trigger
+language plpgsql
+as $$
+begin
+    -- Upserts ohne Änderung an gezählten Spalten lassen die Summen in Ruhe
+    if tg_op = 'UPDATE' and (old.pdf_name, old.created_at::date, old.highest_priority_count, old.high_priority_count)
+            is not distinct from (new.pdf_name, new.created_at::date, new.highest_priority_count, new.high_priority_count) then
+        return null;
+    end if;
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform public.jl_apply_article_delta(old, -1);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform public.jl_apply_article_delta(new, 1);
+    end if;
+    return null;
+end;
+$$;
+
+-- Einmalig aus dem Bestand füllen - Schreibzugriffe warten so lange
+lock table public.jl_articles in share mode;
+
+truncate public.jl_article_totals, public.jl_article_daily, public.jl_article_pdfs;
+
+insert into public.jl_article_pdfs (pdf_name, articles)
+select pdf_name, count(*) from public.jl_articles where pdf_name is not null group by pdf_name;
+
+insert into public.jl_article_daily (tag, anzahl)
+select created_at::date, count(*) from public.jl_articles group by 1;
+
+insert into public.jl_article_totals (id, total, pdfs, highest_articles, high_articles, highest_mentions, high_mentions)
+select
+    true,
+    count(*),
+    (select count(*) from public.jl_article_pdfs),
+    count(*) filter (where highest_priority_count > 0),
+    count(*) filter (where high_priority_count > 0),
+    coalesce(sum(highest_priority_count), 0),
+    coalesce(sum(high_priority_count), 0)
+from public.jl_articles;
+
+drop trigger if exists jl_articles_counters on public.jl_articles;
+create trigger jl_articles_counters
+    after insert or update or delete on public.jl_articles
+    for each row execute function public.jl_articles_counted();
+
+-- Gleiche Rückgabe wie bisher, aber nur noch Zählertabellen und ein Index-Zugriff für max(created_at)
+create or replace function public.jl_article_counts(p_days integer default 90)
+returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'total',            t.total,
+        'pdfs',             t.pdfs,
+        'last_created_at',  (select max(created_at) from public.jl_articles),
+        'highest_articles', t.highest_articles,
+        'high_articles',    t.high_articles,
+        'highest_mentions', t.highest_mentions,
+        'high_mentions',    t.high_mentions,
+        'daily', coalesce((
+            select jsonb_agg(jsonb_build_object('tag', tag, 'anzahl', anzahl) order by tag)
+            from public.jl_article_daily
+            where tag >= (now() - make_interval(days => p_days))::date
+        ), '[]'::jsonb)
+    )
+    from public.jl_article_totals t;
+$$;
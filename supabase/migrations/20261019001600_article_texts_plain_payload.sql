@@ -0,0 +1,37 @@
+-- Volltexte nur noch einmal übertragen: bisher schickte der Client den Klartext (für den
+-- Suchindex) und zusätzlich Base64 der komprimierten Bytes - zusammen mehr als der Text allein.
+-- Jetzt kommt nur der Klartext; Postgres komprimiert ihn selbst (TOAST) und baut daraus den
+-- Suchindex. Bestehende Zeilen behalten codec/data und werden beim Lesen wie bisher entpackt.
+
+alter table public.jl_article_texts add column if not exists body text;
+alter table public.jl_article_texts alter column data drop not null;
+
+comment on column public.jl_article_texts.codec is
+    '''text'' = Klartext in body (von Postgres komprimiert), ''zstd''/''gzip'' = Altbestand in data';
+
+create or replace function public.store_article_texts(p_rows jsonb)
+returns integer
+language sql
+as $$
+    insert into public.jl_article_texts
+        (article_hash, codec, data, body, page_count, char_count, search_vector)
+    select
+        r->>'article_hash',
+        'text',
+        null,
+        r->>'text',
+        (r->>'page_count')::integer,
+        (r->>'char_count')::integer,
+        to_tsvector('german', coalesce(r->>'text', ''))
+    from jsonb_array_elements(p_rows) as r
+    on conflict (article_hash) do update set
+        codec         = excluded.codec,
+        data          = null,
+        body          = excluded.body,
+        page_count    = excluded.page_count,
+        char_count    = excluded.char_count,
+        search_vector = excluded.search_vector,
+        created_at    = now();
+
+    select jsonb_array_length(p_rows);
+$$;
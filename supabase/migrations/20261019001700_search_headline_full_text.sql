@@ -0,0 +1,84 @@
+-- Suchausschnitt aus dem kompletten Text statt aus der 500-Zeichen-Vorschau: Treffer, die nur
+-- in jl_article_texts stehen, bekamen sonst einen Ausschnitt ohne Markierung. Seit
+-- 20261019001600 liegt der Klartext in jl_article_texts.body; ältere Zeilen (codec zstd/gzip)
+-- haben keinen und fallen auf jl_articles.full_text zurück.
+
+create or replace function public.jl_search_articles(
+    p_query  text,
+    p_limit  integer default 100,
+    p_offset integer default 0
+)
+returns table (
+    id                     public.jl_articles.id%type,
+    article_hash           public.jl_articles.article_hash%type,
+    created_at             public.jl_articles.created_at%type,
+    pdf_name               public.jl_articles.pdf_name%type,
+    pdf_date               public.jl_articles.pdf_date%type,
+    highest_priority_count public.jl_articles.highest_priority_count%type,
+    high_priority_count    public.jl_articles.high_priority_count%type,
+    rank                   real,
+    headline               text,
+    total_count            bigint
+)
+language sql
+stable
+as $$
+    with q as (
+        -- Eingabe wie in Suchmaschinen: Wörter, "Phrasen", or, -ausschließen
+        select websearch_to_tsquery('german', p_query) as query
+    ),
+    matches as (
+        -- Je Tabelle eine eigene Abfrage, damit beide GIN-Indizes genutzt werden
+        select a.article_hash
+        from public.jl_articles a, q
+        where a.search_vector @@ q.query
+        union
+        select t.article_hash
+        from public.jl_article_texts t, q
+        where t.search_vector @@ q.query
+    ),
+    ranked as (
+        select
+            a.id,
+            a.article_hash,
+            a.created_at,
+            a.pdf_name,
+            a.pdf_date,
+            a.highest_priority_count,
+            a.high_priority_count,
+            -- Treffer in der Analyse zählen doppelt so viel wie Treffer nur im Volltext
+            (coalesce(ts_rank(a.search_vector, q.query), 0)
+             + 0.5 * coalesce(ts_rank(t.search_vector, q.query), 0))::real as rank,
+            count(*) over () as total_count,
+            a.analysis,
+            -- Ausschnitt aus dem kompletten Text; Altbestand (zstd/gzip) hat nur die Vorschau
+            coalesce(t.body, a.full_text) as headline_text
+        from matches m
+        join public.jl_articles a on a.article_hash = m.article_hash
+        left join public.jl_article_texts t on t.article_hash = m.article_hash
+        cross join q
+        order by rank desc, a.created_at desc
+        limit greatest(p_limit, 0)
+        offset greatest(p_offset, 0)
+    )
+    -- ts_headline ist teuer: nur für die ausgelieferte Seite berechnen
+    select
+        r.id,
+        r.article_hash,
+        r.created_at,
+        r.pdf_name,
+        r.pdf_date,
+        r.highest_priority_count,
+        r.high_priority_count,
+        r.rank,
+        ts_headline(
+            'german',
+            coalesce(r.analysis, '') || E'\n' || coalesce(r.headline_text, ''),
+            q.query,
+            'StartSel=**, StopSel=**, MaxWords=35, MinWords=15, MaxFragments=2, FragmentDelimiter=" … "'
+        ) as headline,
+        r.total_count
+    from ranked r
+    cross join q
+    order by r.rank desc, r.created_at desc;
+$$;
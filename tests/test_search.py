@@ -0,0 +1,123 @@
+"""Lokaler Ersatz für jl_search_articles: Anfrage-Syntax, Rangfolge, Ausschnitte, Volltexte"""
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import app
+
+
+def article(article_hash, analysis="", full_text="", volltext=None, created_at="2026-03-01T08:00:00+00:00"):
+    row = {'id': len(article_hash), 'article_hash': article_hash, 'created_at': created_at,
+           'pdf_name': f"{article_hash}.pdf", 'pdf_date': created_at[:10], 'analysis': analysis,
+           'full_text': full_text, 'highest_priority_count': 0, 'high_priority_count': 0}
+    if volltext is not None:
+        row['volltext'] = volltext
+    return row
+
+
+class FakeArticlesTable:
+    """Gerade genug PostgREST für load_search_candidates"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def select(self, columns):
+        return self
+
+    def order(self, column, desc=False):
+        self.rows = sorted(self.rows, key=lambda row: row[column], reverse=desc)
+        return self
+
+    def limit(self, count):
+        self.rows = self.rows[:count]
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=[dict(row) for row in self.rows])
+
+
+def test_parse_websearch_query():
+    clauses = app.parse_websearch_query('"neue Buslinie" or Straßenbahn -Schulen')
+    stem = app.stem_word
+    assert clauses == [
+        {'negate': False, 'alternatives': [(stem('neue'), stem('Buslinie')), (stem('Straßenbahn'),)]},
+        {'negate': True, 'alternatives': [(stem('Schulen'),)]},
+    ]
+    # Flexionsformen landen auf demselben Stamm
+    assert stem('Schulen') == stem('Schule')
+
+
+def test_analysis_counts_double():
+    rows = [
+        article('nur-text', analysis="Stadtrat tagt", volltext="Der Radweg wird gebaut"),
+        article('analyse', analysis="Neuer Radweg am Ring", volltext="Nichts dazu"),
+    ]
+    ranked = app.rank_articles_locally(rows, "Radweg", limit=10)
+    assert [row['article_hash'] for row in ranked] == ['analyse', 'nur-text']
+    assert ranked[0]['rank'] == pytest.approx(2 * ranked[1]['rank'])
+    assert ranked[0]['total_count'] == 2
+
+
+def test_full_text_beyond_preview_is_found():
+    rows = [article('lang', analysis="Haushalt", full_text="Vorschau ohne Treffer",
+                    volltext="Vorschau ohne Treffer ... Seite 12: Der Radweg an der Elbe")]
+    assert [row['article_hash'] for row in app.rank_articles_locally(rows, "Radweg", limit=10)] == ['lang']
+
+
+def test_headline_from_full_text():
+    rows = [article('lang', analysis="Haushalt beschlossen", full_text="Vorschau ohne Treffer",
+                    volltext="Vorschau ohne Treffer ... Seite 12: Der Radweg an der Elbe wird verlängert")]
+    ranked = app.rank_articles_locally(rows, "Radweg", limit=10)
+    assert "**Radweg**" in ranked[0]['headline']
+    # Ohne Volltext (Altbestand) bleibt die Vorschau
+    legacy = app.rank_articles_locally([article('alt', analysis="Radweg", full_text="Vorschau")], "Radweg", limit=10)
+    assert "Vorschau" in legacy[0]['headline']
+
+
+def test_negation_phrase_and_alternatives():
+    rows = [
+        article('bus', analysis="Neue Buslinie für Roßlau"),
+        article('bahn', analysis="Straßenbahn fährt wieder"),
+        article('schule', analysis="Neue Buslinie zu den Schulen"),
+        article('wort', analysis="Linie neue Bus"),
+    ]
+    ranked = app.rank_articles_locally(rows, '"neue Buslinie" or Straßenbahn -Schulen', limit=10)
+    assert {row['article_hash'] for row in ranked} == {'bus', 'bahn'}
+    assert app.rank_articles_locally(rows, "-Schulen", limit=10) == []
+
+
+def test_paging_and_headline():
+    rows = [article(f"a{i}", analysis=f"Radweg Nummer {i}", created_at=f"2026-03-0{i + 1}T08:00:00+00:00")
+            for i in range(5)]
+    first = app.rank_articles_locally(rows, "Radweg", limit=2)
+    second = app.rank_articles_locally(rows, "Radweg", limit=2, offset=2)
+    # Gleicher Rang: neueste zuerst, Seiten überschneiden sich nicht
+    assert [row['article_hash'] for row in first + second] == ['a4', 'a3', 'a2', 'a1']
+    assert "**Radweg**" in first[0]['headline']
+
+
+def test_candidates_carry_decompressed_full_text(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCAL_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("TEXT_STORE", "local")
+    full_text = "Vorschau " + "Füllwort " * 2000 + "Radweg an der Elbe"
+    rows = [article('h1', analysis="Haushalt", full_text=full_text[:100])]
+    monkeypatch.setattr(app, 'init_supabase', lambda: SimpleNamespace(table=lambda name: FakeArticlesTable(rows)))
+    app.store_full_texts([app.build_text_record('h1', full_text)])
+    app.load_full_text.clear()
+    app.load_search_candidates.clear()
+
+    candidates = app.load_search_candidates(10)
+    assert candidates[0]['volltext'] == full_text
+    assert [row['article_hash'] for row in app.rank_articles_locally(candidates, "Elbe", limit=10)] == ['h1']
+    app.load_search_candidates.clear()
+
+
+def test_export_keeps_analysis(monkeypatch):
+    hits = pd.DataFrame({'article_hash': ['b', 'a'], 'rank': [0.2, 0.1]})
+    loaded = pd.DataFrame({'article_hash': ['a', 'b'], 'analysis': ["Analyse A", "Analyse B"]})
+    monkeypatch.setattr(app, 'load_articles_by_hashes', lambda hashes: loaded)
+
+    exported = app.with_analysis(hits)
+    assert exported['analysis'].tolist() == ["Analyse B", "Analyse A"]
+    assert app.with_analysis(exported) is exported